@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark exact vs bounded (Space-Saving) word aggregation.
+
+Feeds the same weighted word stream through word_tally.ExactTally and
+word_tally.SpaceSaving (railway-api/word_tally.py) and reports wall time,
+peak traced memory and top-K agreement. Uses the real per-song bags from the
+word-bag store when it exists, otherwise a synthetic Zipf-distributed
+vocabulary.
+
+Usage:
+    python bench_topk.py [--songs N] [--vocab V] [--error E] [--k K]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import time
+import tracemalloc
+
+from update_wordcloud import BAGS_DIR, TOP_WORDS_OUT, ExactTally, SpaceSaving, compare_topk
+
+
+def _real_stream():
+    bags = []
+    for name in sorted(os.listdir(BAGS_DIR)) if os.path.isdir(BAGS_DIR) else []:
+        if name.endswith('.json'):
+            with open(os.path.join(BAGS_DIR, name), 'r', encoding='utf-8') as f:
+                bags.extend(rec['words'] for rec in (json.load(f).get('songs') or {}).values())
+    return bags
+
+
+def _synthetic_stream(songs, vocab, words_per_song=250, seed=7):
+    rng = random.Random(seed)
+    weights = [1.0 / (r + 1) for r in range(vocab)]
+    out = []
+    for _ in range(songs):
+        bag = {}
+        for i in rng.choices(range(vocab), weights=weights, k=words_per_song):
+            w = f'w{i}'
+            bag[w] = bag.get(w, 0) + 1
+        out.append(bag)
+    return out
+
+
+def _run(tally, bags, plays):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for bag, p in zip(bags, plays):
+        for w, c in bag.items():
+            tally.add(w, c * p)
+    dt = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return dt, peak
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--songs', type=int, default=5000)
+    ap.add_argument('--vocab', type=int, default=200_000)
+    ap.add_argument('--error', type=float, default=0.0005)
+    ap.add_argument('--k', type=int, default=TOP_WORDS_OUT)
+    args = ap.parse_args()
+
+    bags = _real_stream()
+    source = f'word-bag files ({len(bags)} songs)'
+    if not bags:
+        bags = _synthetic_stream(args.songs, args.vocab)
+        source = f'synthetic zipf ({args.songs} songs, vocab {args.vocab})'
+    rng = random.Random(11)
+    plays = [rng.randint(1, 60) for _ in bags]
+
+    exact = ExactTally()
+    approx = SpaceSaving(error=args.error)
+    t_exact, m_exact = _run(exact, bags, plays)
+    t_approx, m_approx = _run(approx, bags, plays)
+    diff = compare_topk(exact, approx, args.k)
+
+    print(f'stream: {source}, total weight {exact.total():,}')
+    print(f'{"mode":<10}{"time (s)":>10}{"peak (KiB)":>14}{"counters":>12}')
+    print(f'{"exact":<10}{t_exact:>10.3f}{m_exact / 1024:>14.0f}{len(exact):>12,}')
+    print(f'{"bounded":<10}{t_approx:>10.3f}{m_approx / 1024:>14.0f}{len(approx):>12,}')
+    print(f'top-{diff["k"]}: {diff["missing"]} missing, max abs error {diff["max_abs_error"]}, '
+          f'guaranteed bound {diff["bound"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Content-hashed, precompressed copies of the JSON the page fetches.
+
+Run after update_spotify_data.py and update_wordcloud.py. Every artifact in
+ARTIFACTS is copied to dist/ under a name that embeds a hash of its bytes,
+with .gz (and .br when the brotli package is installed) siblings next to it:
+
+    dist/spotify-trends/basic_stats.3f1c0a9e2b7d.json
+    dist/spotify-trends/basic_stats.3f1c0a9e2b7d.json.gz
+    dist/spotify-trends/basic_stats.3f1c0a9e2b7d.json.br
+    dist/manifest.json   {"format": 1, "files": {"spotify-trends/basic_stats.json":
+                          {"path": "dist/spotify-trends/basic_stats.3f1c0a9e2b7d.json", ...}}}
+
+A hashed file never changes, so it can be cached forever; only the small
+manifest needs revalidating. The page resolves logical paths through the
+manifest and falls back to the plain file when an entry is missing.
+
+Output is deterministic (gzip mtime is pinned), so an unchanged artifact
+produces no diff. Hashed files referenced by neither the new nor the
+previous manifest are pruned; keeping the previous generation means a page
+loaded just before a deploy can still fetch what its manifest pointed at.
+
+Usage:
+    python build_artifacts.py
+"""
+from __future__ import annotations
+
+import glob
+import gzip
+import hashlib
+import json
+import os
+import sys
+
+import json_store
+
+try:
+    import brotli
+except ImportError:  # .br variants are skipped without it
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DIST_DIR = os.path.join(BASE_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+FORMAT = 1
+HASH_LEN = 12
+
+# Globs relative to the repo root.
+ARTIFACTS = [
+    'benchmark-data.json',
+    'spotify-trends/basic_stats.json',
+    'spotify-trends/artist_evolution.json',
+    'spotify-trends/monthly_trends.json',
+    'spotify-trends/last_updated.json',
+    'spotify-trends/top_songs/[0-9][0-9][0-9][0-9].json',
+    'spotify-trends/wordclouds/[0-9][0-9][0-9][0-9].json',
+    'spotify-trends/wordclouds/index.json',
+]
+
+
+def _hashed_name(logical: str, digest: str) -> str:
+    stem, ext = os.path.splitext(logical)
+    return f'dist/{stem}.{digest[:HASH_LEN]}{ext}'
+
+
+def _load_manifest() -> dict:
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'format': FORMAT, 'files': {}}
+
+
+def _variants(path: str) -> list[str]:
+    return [path, path + '.gz', path + '.br']
+
+
+def build_one(logical: str) -> dict:
+    with open(os.path.join(BASE_DIR, logical), 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    rel = _hashed_name(logical, digest)
+    out = os.path.join(BASE_DIR, rel)
+    entry = {'path': rel, 'sha256': digest, 'bytes': len(data)}
+
+    json_store.write_bytes(out, data)
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    json_store.write_bytes(out + '.gz', gz)
+    entry['gz_bytes'] = len(gz)
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        json_store.write_bytes(out + '.br', br)
+        entry['br_bytes'] = len(br)
+    return entry
+
+
+def prune(keep: set[str]) -> int:
+    """Delete hashed files under dist/ that no kept manifest entry points at."""
+    removed = 0
+    for root, _dirs, names in os.walk(DIST_DIR):
+        for name in names:
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, BASE_DIR).replace(os.sep, '/')
+            if path.startswith(MANIFEST_PATH) or rel in keep:
+                continue
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+def build() -> dict:
+    previous = _load_manifest()
+    files = {}
+    for pattern in ARTIFACTS:
+        for path in sorted(glob.glob(os.path.join(BASE_DIR, pattern))):
+            logical = os.path.relpath(path, BASE_DIR).replace(os.sep, '/')
+            files[logical] = build_one(logical)
+
+    manifest = {'format': FORMAT, 'files': files}
+    if previous.get('files') != files:
+        # Remember the generation being replaced so prune() leaves it alone.
+        manifest['previous'] = sorted({e['path'] for e in previous.get('files', {}).values()})
+    else:
+        manifest['previous'] = previous.get('previous', [])
+    text = json_store.dumps(manifest)
+    json_store.write_text(MANIFEST_PATH, text)
+    json_store.write_bytes(MANIFEST_PATH + '.gz', gzip.compress(text.encode('utf-8'), 9, mtime=0))
+    if brotli is not None:
+        json_store.write_bytes(MANIFEST_PATH + '.br', brotli.compress(text.encode('utf-8'), quality=11))
+
+    keep = set()
+    for p in [e['path'] for e in files.values()] + manifest['previous']:
+        keep.update(_variants(p))
+    removed = prune(keep)
+    return {'artifacts': len(files), 'bytes': sum(e['bytes'] for e in files.values()),
+            'gz_bytes': sum(e['gz_bytes'] for e in files.values()),
+            'br_bytes': sum(e.get('br_bytes', 0) for e in files.values()) if brotli else None,
+            'pruned': removed}
+
+
+def main() -> int:
+    stats = build()
+    print(f"Built {stats['artifacts']} artifacts: {stats['bytes']:,} bytes, "
+          f"{stats['gz_bytes']:,} gzipped"
+          + (f", {stats['br_bytes']:,} brotli" if stats['br_bytes'] is not None else ' (brotli not installed)')
+          + f"; pruned {stats['pruned']} stale files")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
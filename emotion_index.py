@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Emotion-dimension scoring over word bags.
+
+EMOTION_LEXICON is compiled once into an inverted index (word -> dimension
+ids), so a bag of any size is scored in one pass over its words instead of
+one membership test per word per dimension. A score is a vector with one
+entry per dimension, in DIMENSIONS order, holding the weighted number of
+words in that dimension's vocabulary (a word in two vocabularies counts in
+both).
+
+Vectors add: a year's, month's or playlist's mood is the play-weighted sum
+of its songs' vectors, with no re-tokenizing. For the word-bag store,
+score_store() scores every song at once from the memory-mapped arrays.
+
+Usage:
+    python emotion_index.py 2020-01      # mood of one month of top songs
+"""
+from __future__ import annotations
+
+import sys
+
+import numpy as np
+
+EMOTION_LEXICON = {
+    'joy': {'happy','smile','smiling','laugh','laughing','fun','bright','shine','shining','alive','celebrate','light','sunny','glow','magic','good','better','best','loud','lit','happiness'},
+    'love': {'love','loving','lover','kiss','kisses','hold','held','heart','together','touch','arms','close','sweet','tender','darling','dear','yours','ours','us','romance'},
+    'melancholy': {'sad','tears','cry','crying','cried','blue','slow','quiet','quietly','grey','gray','empty','hurt','ache','aching','sore','sigh','low','tired','sleep','fade','faded'},
+    'longing': {'miss','missed','missing','wait','waiting','want','wanted','wanting','need','needed','gone','without','again','still','someday','maybe','hope','wish','wishing','somewhere'},
+    'anger': {'hate','hated','burn','burning','break','broken','scream','screaming','fight','fighting','rage','blood','cruel','mad','angry','wrong','punch','shout'},
+    'hope': {'rise','new','morning','believe','future','begin','beginning','start','starts','open','soon','tomorrow','gonna','someday','forward','light','sun','wake'},
+    'nostalgia': {'remember','remembering','used','back','home','young','old','always','forever','first','childhood','years','memory','memories','past','kid','teenage'},
+    'escape': {'run','running','leave','leaving','away','high','free','drive','driving','wild','road','gone','fly','flying','out','beyond'},
+    'loneliness': {'alone','lonely','without','empty','cold','silent','solo','myself','nobody','noone','solitary','abandoned'},
+}
+
+DIMENSIONS = tuple(EMOTION_LEXICON)
+
+
+class EmotionIndex:
+    def __init__(self, lexicon: dict[str, set[str]] = EMOTION_LEXICON):
+        self.dimensions = tuple(lexicon)
+        index: dict[str, list[int]] = {}
+        for d, vocab in enumerate(lexicon.values()):
+            for w in vocab:
+                index.setdefault(w, []).append(d)
+        self.word_dims: dict[str, tuple[int, ...]] = {w: tuple(ds) for w, ds in index.items()}
+
+    def __len__(self) -> int:
+        return len(self.dimensions)
+
+    def zeros(self) -> np.ndarray:
+        return np.zeros(len(self.dimensions), dtype=np.float64)
+
+    def score(self, bag: dict[str, float]) -> np.ndarray:
+        """Vector for one bag of word -> weight (counts, or counts x plays)."""
+        dims: list[int] = []
+        weights: list[float] = []
+        get = self.word_dims.get
+        for w, c in bag.items():
+            ds = get(w)
+            if ds:
+                dims.extend(ds)
+                weights.extend([c] * len(ds))
+        if not dims:
+            return self.zeros()
+        return np.bincount(dims, weights=weights, minlength=len(self.dimensions)).astype(np.float64)
+
+    def membership(self, vocab: list[str]) -> np.ndarray:
+        """0/1 matrix (len(vocab) x dimensions) for a term-id vocabulary."""
+        m = np.zeros((len(vocab), len(self.dimensions)), dtype=np.float64)
+        for t, w in enumerate(vocab):
+            for d in self.word_dims.get(w, ()):
+                m[t, d] = 1.0
+        return m
+
+    def score_store(self, store) -> np.ndarray:
+        """(songs x dimensions) vectors for every song in a WordBagStore."""
+        n = len(store)
+        out = np.zeros((n, len(self.dimensions)), dtype=np.float64)
+        if n == 0:
+            return out
+        member = self.membership(store.vocab)
+        terms = np.asarray(store.terms)
+        hit = member.any(axis=1)[terms]
+        offsets = np.asarray(store.offsets, dtype=np.int64)
+        song_of = np.repeat(np.arange(n, dtype=np.int64), np.diff(offsets))[hit]
+        contrib = member[terms[hit]] * np.asarray(store.counts, dtype=np.float64)[hit, None]
+        for d in range(len(self.dimensions)):
+            out[:, d] = np.bincount(song_of, weights=contrib[:, d], minlength=n)
+        return out
+
+    def compose(self, weights: dict[str, float], vectors: dict[str, np.ndarray]) -> np.ndarray:
+        """Weighted sum of per-song vectors; keys without a vector are skipped."""
+        total = self.zeros()
+        for key, w in weights.items():
+            v = vectors.get(key)
+            if v is not None and w:
+                total += w * np.asarray(v, dtype=np.float64)
+        return total
+
+    def as_dict(self, vec) -> dict[str, int]:
+        return {d: int(round(v)) for d, v in zip(self.dimensions, vec)}
+
+    def top(self, vec, n: int = 3) -> list[str]:
+        ranked = sorted(zip(self.dimensions, vec), key=lambda x: -x[1])
+        return [d for d, v in ranked if v > 0][:n]
+
+
+INDEX = EmotionIndex()
+
+
+def main(argv: list[str]) -> int:
+    import wordbag_store
+
+    if not argv:
+        print(__doc__)
+        return 2
+    store = wordbag_store.WordBagStore.open()
+    if store is None:
+        print(f'No word-bag store at {wordbag_store.STORE_DIR}; run update_wordcloud.py first')
+        return 1
+    vectors = INDEX.score_store(store)
+    weights = wordbag_store.weights_for_period(argv[0])
+    rows = [store.row_of[k] for k in weights if k in store]
+    vec = np.asarray([weights[store.keys[i]] for i in rows], dtype=np.float64) @ vectors[rows] \
+        if rows else INDEX.zeros()
+    for d, v in sorted(INDEX.as_dict(vec).items(), key=lambda x: -x[1]):
+        print(f'{v:>8}  {d}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
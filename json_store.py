@@ -0,0 +1,145 @@
+"""
+Atomic, change-aware JSON writes for the spotify-trends data files.
+
+Every write goes to a temp file in the target directory, is fsynced and then
+renamed over the original, so a crash mid-write can never leave a truncated
+file behind for the dashboard. Writes whose bytes hash the same as what is
+already on disk are skipped entirely, which keeps the daily Action's commit
+limited to files that actually changed.
+
+patch_json_key() replaces a single top-level key of an indented JSON object
+by splicing just that value's text, so the rest of the document keeps its
+exact bytes (and git diff stays one hunk).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+
+_DECODER = json.JSONDecoder()
+_WS = ' \t\r\n'
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _file_digest(path: str) -> str | None:
+    try:
+        with open(path, 'rb') as f:
+            return _digest(f.read())
+    except OSError:
+        return None
+
+
+def write_text(path: str, text: str) -> bool:
+    """Atomically write `text` to `path`. Returns False if content was unchanged."""
+    return write_bytes(path, text.encode('utf-8'))
+
+
+def write_bytes(path: str, data: bytes) -> bool:
+    """Atomically write `data` to `path`. Returns False if content was unchanged."""
+    if _file_digest(path) == _digest(data):
+        return False
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return True
+
+
+def dumps(data, indent: int | None = 2, ensure_ascii: bool = False) -> str:
+    if indent is None:
+        return json.dumps(data, ensure_ascii=ensure_ascii, separators=(',', ':'))
+    return json.dumps(data, ensure_ascii=ensure_ascii, indent=indent)
+
+
+def write_json(path: str, data, indent: int | None = 2, ensure_ascii: bool = False) -> bool:
+    """Atomically write `data` as JSON (compact when indent is None)."""
+    return write_text(path, dumps(data, indent, ensure_ascii))
+
+
+def _skip_ws(text: str, i: int) -> int:
+    while i < len(text) and text[i] in _WS:
+        i += 1
+    return i
+
+
+def _top_level_spans(text: str) -> tuple[dict[str, tuple[int, int]], int]:
+    """Map each top-level key to the (start, end) of its value text.
+
+    Also returns the index of the object's closing brace.
+    """
+    i = _skip_ws(text, 0)
+    if i >= len(text) or text[i] != '{':
+        raise ValueError('not a JSON object')
+    spans: dict[str, tuple[int, int]] = {}
+    i = _skip_ws(text, i + 1)
+    while text[i] != '}':
+        if text[i] != '"':
+            raise ValueError(f'expected key at offset {i}')
+        key, i = json.decoder.scanstring(text, i + 1)
+        i = _skip_ws(text, i)
+        if text[i] != ':':
+            raise ValueError(f'expected ":" at offset {i}')
+        start = _skip_ws(text, i + 1)
+        _, end = _DECODER.raw_decode(text, start)
+        spans[key] = (start, end)
+        i = _skip_ws(text, end)
+        if text[i] == ',':
+            i = _skip_ws(text, i + 1)
+    return spans, i
+
+
+def patch_json_key(path: str, key: str, value, indent: int = 2) -> bool:
+    """Set top-level `key` of the JSON object in `path` to `value`.
+
+    Only the value's own text is re-serialized; the rest of the file is kept
+    byte for byte. A missing file is created as a one-key object; a valid
+    object the splicer cannot follow is loaded, updated and rewritten in
+    full. Raises ValueError if the file is not valid JSON or its top level is
+    not an object, rather than replacing it. Returns False when nothing
+    changed.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+    except FileNotFoundError:
+        return write_json(path, {key: value}, indent)
+    try:
+        spans, close = _top_level_spans(text)
+    except (ValueError, IndexError):
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            raise ValueError(f'{path}: top level is not a JSON object')
+        data[key] = value
+        return write_json(path, data, indent)
+
+    pad = ' ' * indent
+    body = json.dumps(value, ensure_ascii=False, indent=indent).replace('\n', '\n' + pad)
+    if key in spans:
+        start, end = spans[key]
+        if text[start:end] == body:
+            return False
+        new_text = text[:start] + body + text[end:]
+    elif spans:
+        last_end = max(end for _, end in spans.values())
+        entry = f',\n{pad}{json.dumps(key, ensure_ascii=False)}: {body}'
+        new_text = text[:last_end] + entry + text[last_end:]
+    else:
+        entry = f'\n{pad}{json.dumps(key, ensure_ascii=False)}: {body}\n'
+        new_text = text[:close] + entry + text[close:]
+    return write_text(path, new_text)
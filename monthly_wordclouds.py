@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Monthly and rolling-window word clouds.
+
+Builds one cloud per YYYY-MM period in the top_songs/ shards plus rolling
+3/6/12-month clouds ending at each month, all composed from the per-song
+word-bag store (no lyric fetching happens here).
+
+The work is incremental:
+  * A month's word vector is one sparse sum over the store, so vectors are
+    rebuilt every run rather than kept on disk; only the last 12 months'
+    are held in memory at once.
+  * Rolling windows slide over the month vectors, adding the month entering
+    the window and subtracting the one leaving it.
+  * Each month's mood (see emotion_index.py) is the play-weighted sum of
+    its songs' emotion vectors. Moods are kept in wordclouds/monthly/
+    state.json with a fingerprint of the month's song list, and the store
+    is only scored (in one pass) when some fingerprint changed, normally
+    just the current month's, which update_spotify_data.py rewrites daily.
+  * Output files are only rewritten when their content changes.
+
+Output: spotify-trends/wordclouds/monthly/<YYYY-MM>.json and index.json.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+
+import emotion_index
+import json_store
+import top_songs_shards
+import wordbag_store
+
+log = logging.getLogger('monthly-wordclouds')
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, 'spotify-trends')
+MONTHLY_DIR = os.path.join(DATA_DIR, 'wordclouds', 'monthly')
+STATE_PATH = os.path.join(MONTHLY_DIR, 'state.json')
+
+ROLLING_WINDOWS = (3, 6, 12)
+TOP_WORDS_OUT = 80
+
+
+def _month_weights(items) -> dict[str, int]:
+    weights: dict[str, int] = {}
+    for it in items or []:
+        artist = (it.get('artist') or '').strip()
+        track = (it.get('track') or '').strip()
+        if not artist or not track:
+            continue
+        k = wordbag_store.song_key(artist, track)
+        weights[k] = weights.get(k, 0) + int(it.get('play_count') or 1)
+    return weights
+
+
+def _fingerprint(weights: dict[str, int], store) -> str:
+    rows = sorted([k, w, k in store] for k, w in weights.items())
+    return hashlib.sha256(json.dumps(rows, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+
+def _month_emotions(weights: dict[str, int], store, song_vectors) -> list[int]:
+    rows = [store.row_of[k] for k in weights if k in store]
+    if not rows:
+        return [0] * len(emotion_index.INDEX)
+    w = [weights[store.keys[i]] for i in rows]
+    return [int(round(v)) for v in w @ song_vectors[rows]]
+
+
+def _calendar(first: str, last: str) -> list[str]:
+    y, m = int(first[:4]), int(first[5:7])
+    out = []
+    while True:
+        p = f'{y:04d}-{m:02d}'
+        out.append(p)
+        if p >= last:
+            return out
+        m += 1
+        if m > 12:
+            y, m = y + 1, 1
+
+
+def _load_state() -> dict:
+    try:
+        with open(STATE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'months': {}}
+
+
+def update_monthly_clouds(top_songs_by_period: dict, store) -> dict:
+    """Recompute changed months and all rolling windows. Returns run stats."""
+    os.makedirs(MONTHLY_DIR, exist_ok=True)
+    state = _load_state()
+    months_state: dict = state.setdefault('months', {})
+
+    periods = sorted(p for p in top_songs_by_period if len(p) == 7 and p[4] == '-')
+    weights_of = {p: _month_weights(top_songs_by_period[p]) for p in periods}
+    recomputed = 0
+    song_vectors = None
+    for p in periods:
+        weights = weights_of[p]
+        fp = _fingerprint(weights, store)
+        prev = months_state.get(p)
+        if prev and prev.get('fp') == fp and 'emotions' in prev:
+            prev.pop('words', None)  # word vectors kept by earlier versions of the state
+            continue
+        if song_vectors is None:
+            song_vectors = emotion_index.INDEX.score_store(store)
+        months_state[p] = {
+            'fp': fp,
+            'songs': len(weights),
+            'songs_with_lyrics': sum(1 for k in weights if k in store),
+            'emotions': _month_emotions(weights, store, song_vectors),
+        }
+        recomputed += 1
+    for p in [p for p in months_state if p not in top_songs_by_period]:
+        del months_state[p]
+
+    written = 0
+    index = []
+    if periods:
+        windows = {n: np.zeros(len(store.vocab), dtype=np.float64) for n in ROLLING_WINDOWS}
+        recent: dict[str, np.ndarray] = {}
+        cal = _calendar(periods[0], periods[-1])
+        for i, p in enumerate(cal):
+            vec = recent[p] = store.vector(weights_of.get(p) or {})
+            for n, win in windows.items():
+                win += vec
+                if i >= n:
+                    win -= recent[cal[i - n]]
+            if i >= max(ROLLING_WINDOWS):
+                del recent[cal[i - max(ROLLING_WINDOWS)]]
+            ms = months_state.get(p)
+            if not ms:
+                continue
+            doc = {
+                'ok': True, 'period': p,
+                'words': store.top_words(vec, TOP_WORDS_OUT),
+                'sentiment': {'dimensions': emotion_index.INDEX.as_dict(ms['emotions']),
+                              'top_dimensions': emotion_index.INDEX.top(ms['emotions'])},
+                'rolling': {str(n): store.top_words(windows[n], TOP_WORDS_OUT) for n in ROLLING_WINDOWS},
+                'stats': {
+                    'songs_considered': ms['songs'],
+                    'lyrics_found': ms['songs_with_lyrics'],
+                    'unique_words': int(np.count_nonzero(vec)),
+                },
+            }
+            if json_store.write_json(os.path.join(MONTHLY_DIR, f'{p}.json'), doc, indent=None):
+                written += 1
+            index.append({'period': p, 'file': f'wordclouds/monthly/{p}.json',
+                          'songs_considered': ms['songs'], 'lyrics_found': ms['songs_with_lyrics']})
+
+    json_store.write_json(STATE_PATH, state, indent=None)
+    json_store.write_json(os.path.join(MONTHLY_DIR, 'index.json'), {
+        'windows': list(ROLLING_WINDOWS), 'months': index,
+    }, indent=None)
+    stats = {'months': len(index), 'recomputed': recomputed, 'files_written': written,
+             'updated_at': datetime.now(timezone.utc).isoformat()}
+    log.info('Monthly clouds: %d months, %d recomputed, %d files written',
+             stats['months'], recomputed, written)
+    return stats
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    store = wordbag_store.WordBagStore.open()
+    if store is None:
+        log.error('No word-bag store at %s; run update_wordcloud.py first', wordbag_store.STORE_DIR)
+        return 1
+    update_monthly_clouds(top_songs_shards.load_top_songs(), store)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
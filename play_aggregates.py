@@ -0,0 +1,196 @@
+"""
+Incremental listening aggregates for monthly_trends.json and basic_stats.json.
+
+Both files were originally produced by a one-off full-history analysis. This
+module folds newly fetched plays into them instead: only the months the new
+plays fall in are touched, and the all-time totals are adjusted by the
+delta. A cursor (the newest played_at seen, in epoch ms) is kept in
+spotify-trends/play_cursor.json so each run only asks Spotify for plays
+after it, making a run O(new plays).
+
+A play is a dict with:
+    ts         datetime (UTC) the play started
+    track      track name
+    artist     primary artist name
+    uri        Spotify track URI ('' if unknown)
+    ms_played  milliseconds listened
+    skipped    True if listened for less than SKIP_THRESHOLD_MS
+
+unique_tracks / unique_artists are counted exactly from the play log (see
+log_uniques) once it reaches back to the start of the history, e.g. after
+`play_log.py import` of a data export. Until then the top-N lists left by the
+original analysis can't tell a new name from an old one, so the counts are
+left as they are rather than guessed.
+"""
+from __future__ import annotations
+
+import json
+import os
+from collections import Counter
+from datetime import datetime, timezone
+
+import json_store
+import play_log
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, 'spotify-trends')
+MONTHLY_PATH = os.path.join(DATA_DIR, 'monthly_trends.json')
+STATS_PATH = os.path.join(DATA_DIR, 'basic_stats.json')
+CURSOR_PATH = os.path.join(DATA_DIR, 'play_cursor.json')
+
+SKIP_THRESHOLD_MS = 30_000
+MONTH_TOP_ARTISTS = 5
+MONTH_TOP_TRACKS = 10
+ALL_TIME_TOP = 20
+
+
+def _load(path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def load_cursor() -> dict:
+    return _load(CURSOR_PATH, {'after': 0})
+
+
+def log_uniques(since: str | None) -> tuple[int, int] | None:
+    """Exact (unique_tracks, unique_artists) from the play log.
+
+    None when the log is empty or starts after `since` (YYYY-MM-DD, the start
+    of the history the aggregates cover), i.e. it doesn't hold every play.
+    """
+    months = play_log.months()
+    if not months or (since and months[0] > since[:7]):
+        return None
+    first = play_log.read_month(months[0])['ts']
+    if not len(first) or (since and datetime.fromtimestamp(int(first.min()) / 1000, timezone.utc)
+                          .strftime('%Y-%m-%d') > since):
+        return None
+    cols = play_log.scan()
+    track_ids = play_log.group(cols['track'], cols)[0]
+    artist_ids = play_log.group(cols['artist'], cols)[0]
+    # Same-named tracks by different artists count once, as in play_log.build_outputs.
+    tracks = play_log.TrackDictionary().rows
+    return len({tracks[int(t)][1] for t in track_ids}), len(artist_ids)
+
+
+def plays_from_recently_played(items: list[dict]) -> list[dict]:
+    """Normalize me/player/recently-played items into play dicts.
+
+    The endpoint only reports when a track was played, not for how long, so
+    ms_played is the track duration capped by the gap to the next play.
+    """
+    rows = []
+    for it in items or []:
+        tr = it.get('track') or {}
+        played_at = it.get('played_at')
+        if not played_at or not tr.get('name'):
+            continue
+        ts = datetime.fromisoformat(played_at.replace('Z', '+00:00'))
+        artists = tr.get('artists') or []
+        rows.append({
+            'ts': ts,
+            'track': tr['name'],
+            'artist': artists[0]['name'] if artists else 'Unknown',
+            'uri': tr.get('uri') or '',
+            'duration_ms': int(tr.get('duration_ms') or 0),
+        })
+    rows.sort(key=lambda r: r['ts'])
+    plays = []
+    for i, r in enumerate(rows):
+        ms = r.pop('duration_ms')
+        if i + 1 < len(rows):
+            gap = int((rows[i + 1]['ts'] - r['ts']).total_seconds() * 1000)
+            ms = min(ms, max(gap, 0)) if ms else max(gap, 0)
+        r['ms_played'] = ms
+        r['skipped'] = ms < SKIP_THRESHOLD_MS
+        plays.append(r)
+    return plays
+
+
+def _top(counter: Counter, n: int) -> dict[str, int]:
+    return dict(counter.most_common(n))
+
+
+def fold_plays(plays: list[dict], monthly: list[dict], stats: dict, cursor: dict,
+               uniques: tuple[int, int] | None = None) -> list[str]:
+    """Fold `plays` into `monthly`, `stats` and `cursor` in place.
+
+    Plays at or before cursor['after'] are ignored. `uniques` is the exact
+    (unique_tracks, unique_artists) when known (see log_uniques); otherwise
+    the unique counts are left alone. Returns the sorted list of YYYY-MM
+    months that changed.
+    """
+    after = int(cursor.get('after') or 0)
+    fresh = [p for p in plays if int(p['ts'].timestamp() * 1000) > after]
+    if not fresh:
+        return []
+
+    by_month: dict[str, list[dict]] = {}
+    for p in fresh:
+        by_month.setdefault(p['ts'].strftime('%Y-%m'), []).append(p)
+
+    index = {m['year_month']: m for m in monthly}
+    for ym, month_plays in by_month.items():
+        m = index.get(ym)
+        if m is None:
+            m = index[ym] = {'year_month': ym, 'minutes_played': 0.0, 'play_count': 0,
+                             'top_artists': {}, 'top_tracks': {}, 'skip_rate': 0.0}
+            monthly.append(m)
+        old_plays = m['play_count']
+        skips = m['skip_rate'] * old_plays / 100.0 + sum(1 for p in month_plays if p['skipped'])
+        m['play_count'] = old_plays + len(month_plays)
+        m['minutes_played'] += sum(p['ms_played'] for p in month_plays) / 60_000
+        m['skip_rate'] = 100.0 * skips / m['play_count']
+        m['top_artists'] = _top(Counter(m['top_artists']) + Counter(p['artist'] for p in month_plays),
+                                MONTH_TOP_ARTISTS)
+        m['top_tracks'] = _top(Counter(m['top_tracks']) + Counter(p['track'] for p in month_plays),
+                               MONTH_TOP_TRACKS)
+    monthly.sort(key=lambda m: m['year_month'])
+
+    old_total = int(stats.get('total_plays') or 0)
+    new_skips = sum(1 for p in fresh if p['skipped'])
+    stats['total_plays'] = old_total + len(fresh)
+    stats['total_hours'] = float(stats.get('total_hours') or 0.0) + sum(p['ms_played'] for p in fresh) / 3_600_000
+    stats['avg_skip_rate'] = (float(stats.get('avg_skip_rate') or 0.0) * old_total + 100.0 * new_skips) / stats['total_plays']
+    if uniques is not None:
+        stats['unique_tracks'], stats['unique_artists'] = uniques
+
+    dr = stats.setdefault('date_range', {})
+    first = min(p['ts'] for p in fresh).strftime('%Y-%m-%d')
+    last = max(p['ts'] for p in fresh).strftime('%Y-%m-%d')
+    dr['start'] = min(dr.get('start') or first, first)
+    dr['end'] = max(dr.get('end') or last, last)
+
+    stats['top_artists_all_time'] = _top(
+        Counter(stats.get('top_artists_all_time') or {}) + Counter(p['artist'] for p in fresh), ALL_TIME_TOP)
+    tracks_all = Counter({(t['track'], t['artist']): t['play_count'] for t in stats.get('top_tracks_all_time') or []})
+    tracks_all.update((p['track'], p['artist']) for p in fresh)
+    stats['top_tracks_all_time'] = [{'track': t, 'artist': a, 'play_count': c}
+                                    for (t, a), c in tracks_all.most_common(ALL_TIME_TOP)]
+
+    cursor['after'] = max(int(p['ts'].timestamp() * 1000) for p in fresh)
+    # Name sets kept by earlier versions of the cursor; the counts no longer need them.
+    for key in ('known_tracks', 'known_artists', 'baseline'):
+        cursor.pop(key, None)
+    return sorted(by_month)
+
+
+def apply_plays(plays: list[dict]) -> list[str]:
+    """Load the aggregates, fold `plays` in and write back what changed."""
+    monthly = _load(MONTHLY_PATH, [])
+    stats = _load(STATS_PATH, {})
+    cursor = load_cursor()
+    since = (stats.get('date_range') or {}).get('start')
+    months = fold_plays(plays, monthly, stats, cursor, log_uniques(since))
+    if months:
+        # Both files were first written with json.dump's default \u escapes;
+        # keep that so the daily diff only shows the changed months.
+        json_store.write_json(MONTHLY_PATH, monthly, ensure_ascii=True)
+        json_store.write_json(STATS_PATH, stats, ensure_ascii=True)
+        cursor['updated_at'] = datetime.now(timezone.utc).isoformat()
+        json_store.write_json(CURSOR_PATH, cursor, indent=None)
+    return months
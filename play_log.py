@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Append-only columnar play log.
+
+Every play is stored once, column by column, in a per-month segment under
+spotify-trends/playlog/:
+
+    playlog/tracks.json          track id -> [uri, track, artist]
+    playlog/artists.json         artist id -> name
+    playlog/<YYYY-MM>/ts.i64     play start, epoch ms (little-endian int64)
+    playlog/<YYYY-MM>/track.i32  track id
+    playlog/<YYYY-MM>/artist.i32 artist id
+    playlog/<YYYY-MM>/ms.i32     milliseconds played
+    playlog/<YYYY-MM>/skip.u8    1 if the play was skipped
+
+Live plays come from me/player/recently-played (update_spotify_data.py);
+the full history can be loaded once from a Spotify data export with
+`import`. A play costs 21 bytes on disk. Segments are opened with
+np.memmap, so scan() over the whole history only pages in the columns a
+query touches, and group-bys are bincounts over integer ids.
+
+Plays are deduplicated on (ts, track) against the target month, so
+overlapping polls and re-imports are harmless. Columns are appended one
+file at a time; if a crash leaves them at different lengths, readers use
+the shortest common prefix and the next append truncates the torn tail.
+
+`regenerate` rebuilds monthly_trends.json, basic_stats.json,
+artist_evolution.json and the top_songs/ shards from the log. Only run it
+once the log holds the full history (i.e. after importing an export),
+otherwise those files shrink to whatever the log has seen.
+
+Usage:
+    python play_log.py import <endsong_*.json | StreamingHistory*.json> ...
+    python play_log.py regenerate [--dry-run]
+    python play_log.py stats
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import json_store
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, 'spotify-trends')
+LOG_DIR = os.path.join(DATA_DIR, 'playlog')
+TRACKS_PATH = os.path.join(LOG_DIR, 'tracks.json')
+ARTISTS_PATH = os.path.join(LOG_DIR, 'artists.json')
+
+COLUMNS = {'ts': '<i8', 'track': '<i4', 'artist': '<i4', 'ms': '<i4', 'skip': 'u1'}
+_EXT = {'<i8': 'i64', '<i4': 'i32', 'u1': 'u8'}
+
+SKIP_THRESHOLD_MS = 30_000
+MONTH_TOP_ARTISTS = 5
+MONTH_TOP_TRACKS = 10
+ALL_TIME_TOP = 20
+YEAR_TOP_ARTISTS = 10
+PERIOD_TOP_SONGS = 25
+
+
+def _col_path(month: str, name: str) -> str:
+    return os.path.join(LOG_DIR, month, f'{name}.{_EXT[COLUMNS[name]]}')
+
+
+def months() -> list[str]:
+    if not os.path.isdir(LOG_DIR):
+        return []
+    return sorted(d for d in os.listdir(LOG_DIR)
+                  if len(d) == 7 and d[4] == '-' and os.path.isdir(os.path.join(LOG_DIR, d)))
+
+
+def _map(path: str, dtype: str) -> np.ndarray:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r')
+
+
+def read_month(month: str) -> dict[str, np.ndarray]:
+    """Memory-map one month's columns (empty arrays if the segment doesn't exist)."""
+    cols = {name: _map(_col_path(month, name), dtype) for name, dtype in COLUMNS.items()}
+    n = min(len(c) for c in cols.values())
+    return {k: v[:n] for k, v in cols.items()}
+
+
+def scan(start: str | None = None, end: str | None = None) -> dict[str, np.ndarray]:
+    """All plays in the inclusive YYYY-MM range as contiguous columns."""
+    segs = [read_month(m) for m in months()
+            if (start is None or m >= start) and (end is None or m <= end)]
+    if not segs:
+        return {name: np.zeros(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+    if len(segs) == 1:
+        return segs[0]
+    return {name: np.concatenate([s[name] for s in segs]) for name in COLUMNS}
+
+
+def high_water_mark() -> int:
+    """Newest play timestamp in the log (epoch ms), 0 when empty."""
+    for month in reversed(months()):
+        ts = read_month(month)['ts']
+        if len(ts):
+            return int(ts.max())
+    return 0
+
+
+class _Dictionary:
+    """Append-only string table persisted as a JSON list."""
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.rows: list = json.load(f)
+        except (OSError, ValueError):
+            self.rows = []
+        self._ids = {self._key(r): i for i, r in enumerate(self.rows)}
+        self.dirty = False
+
+    def _key(self, row) -> str:
+        return row
+
+    def _add(self, row) -> int:
+        key = self._key(row)
+        i = self._ids.get(key)
+        if i is None:
+            i = self._ids[key] = len(self.rows)
+            self.rows.append(row)
+            self.dirty = True
+        return i
+
+    def save(self) -> None:
+        if self.dirty:
+            json_store.write_json(self.path, self.rows, indent=None)
+            self.dirty = False
+
+
+class TrackDictionary(_Dictionary):
+    def __init__(self):
+        super().__init__(TRACKS_PATH)
+
+    def _key(self, row) -> str:
+        uri, track, artist = row
+        return uri or f'{artist.lower()}||{track.lower()}'
+
+    def id_for(self, uri: str, track: str, artist: str) -> int:
+        return self._add([uri, track, artist])
+
+
+class ArtistDictionary(_Dictionary):
+    def __init__(self):
+        super().__init__(ARTISTS_PATH)
+
+    def id_for(self, name: str) -> int:
+        return self._add(name)
+
+
+def append(plays: list[dict]) -> list[dict]:
+    """Append plays (see play_aggregates.plays_from_recently_played).
+
+    Returns the plays that were actually new, in timestamp order.
+    """
+    if not plays:
+        return []
+    tracks, artists = TrackDictionary(), ArtistDictionary()
+    by_month: dict[str, list[dict]] = {}
+    for p in plays:
+        by_month.setdefault(p['ts'].strftime('%Y-%m'), []).append(p)
+
+    new_plays = []
+    pending = []
+    for month, month_plays in sorted(by_month.items()):
+        existing = read_month(month)
+        seen = set(zip(existing['ts'].tolist(), existing['track'].tolist()))
+        rows = []
+        for p in sorted(month_plays, key=lambda p: p['ts']):
+            ts = int(p['ts'].timestamp() * 1000)
+            tid = tracks.id_for(p.get('uri') or '', p['track'], p['artist'])
+            if (ts, tid) in seen:
+                continue
+            seen.add((ts, tid))
+            ms = int(p['ms_played'])
+            skipped = p.get('skipped')
+            if skipped is None:
+                skipped = ms < SKIP_THRESHOLD_MS
+            rows.append((ts, tid, artists.id_for(p['artist']), ms, int(bool(skipped))))
+            new_plays.append(p)
+        if rows:
+            pending.append((month, len(existing['ts']), rows))
+
+    # New ids must be on disk before any column refers to them.
+    tracks.save()
+    artists.save()
+    for month, n_existing, rows in pending:
+        os.makedirs(os.path.join(LOG_DIR, month), exist_ok=True)
+        for i, (name, dtype) in enumerate(COLUMNS.items()):
+            arr = np.asarray([r[i] for r in rows], dtype=dtype)
+            path = _col_path(month, name)
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                f.truncate(n_existing * arr.itemsize)  # drop any torn tail first
+                f.seek(0, os.SEEK_END)
+                arr.tofile(f)
+    return new_plays
+
+
+# -- queries -----------------------------------------------------------------
+
+def month_keys(ts: np.ndarray) -> np.ndarray:
+    """Months since 1970-01 for each epoch-ms timestamp."""
+    return ts.astype('datetime64[ms]').astype('datetime64[M]').astype(np.int64)
+
+
+def month_label(key: int) -> str:
+    return str(np.datetime64(int(key), 'M'))
+
+
+def group(keys: np.ndarray, cols: dict[str, np.ndarray]) -> tuple[np.ndarray, ...]:
+    """Group plays by `keys`: (unique keys, plays, ms played, skips)."""
+    if not len(keys):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, empty
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    plays = np.bincount(inverse)
+    ms = np.bincount(inverse, weights=cols['ms']).astype(np.int64)
+    skips = np.bincount(inverse, weights=cols['skip']).astype(np.int64)
+    return uniq, plays, ms, skips
+
+
+def _top_ids(ids: np.ndarray, weights: np.ndarray, n: int, ms: np.ndarray | None = None) -> np.ndarray:
+    """Indexes of the n largest weights (ties broken by ms, then id)."""
+    tie = ms if ms is not None else np.zeros(len(ids), dtype=np.int64)
+    order = np.lexsort((ids, -tie, -weights))
+    return order[:n]
+
+
+def _pair_group(outer: np.ndarray, inner: np.ndarray, cols: dict[str, np.ndarray]):
+    """Group by (outer, inner) pairs; returns outer, inner, plays, ms sorted by outer."""
+    if not len(outer):
+        e = np.zeros(0, dtype=np.int64)
+        return e, e, e, e
+    width = int(inner.max()) + 1
+    keys, plays, ms, _ = group(outer.astype(np.int64) * width + inner, cols)
+    return keys // width, keys % width, plays, ms
+
+
+def _top_per_outer(outer, inner, plays, ms, n):
+    """{outer: [(inner, plays, ms), ...]} keeping the n best per outer key."""
+    order = np.lexsort((inner, -ms, -plays, outer))
+    out: dict[int, list] = {}
+    bounds = np.flatnonzero(np.diff(outer[order])) + 1
+    for chunk in np.split(order, bounds):
+        if len(chunk):
+            sel = chunk[:n]
+            out[int(outer[sel[0]])] = list(zip(inner[sel].tolist(), plays[sel].tolist(), ms[sel].tolist()))
+    return out
+
+
+def month_track_totals(month: str) -> dict[int, tuple[int, int]]:
+    """track id -> (plays, ms played) for one month."""
+    cols = read_month(month)
+    ids, plays, ms, _ = group(cols['track'], cols)
+    return {int(t): (int(c), int(m)) for t, c, m in zip(ids, plays, ms)}
+
+
+def top_songs_for_month(month: str, limit: int = PERIOD_TOP_SONGS) -> list[dict]:
+    """Exact top songs for a month in the top_songs shard row shape."""
+    cols = read_month(month)
+    ids, plays, ms, _ = group(cols['track'], cols)
+    if not len(ids):
+        return []
+    tracks = TrackDictionary().rows
+    return [_song_row(tracks[int(ids[i])], int(plays[i]), int(ms[i]))
+            for i in _top_ids(ids, plays, limit, ms)]
+
+
+def _song_row(track: list[str], plays: int, ms: int) -> dict:
+    uri, name, artist = track
+    return {'track': name, 'artist': artist, 'spotify_uri': uri,
+            'play_count': plays, 'total_minutes': round(ms / 60_000, 4)}
+
+
+def artist_counts_for_month(month: str) -> Counter:
+    """artist name -> plays for one month."""
+    cols = read_month(month)
+    ids, plays, _, _ = group(cols['artist'], cols)
+    names = ArtistDictionary().rows
+    return Counter({names[int(a)]: int(c) for a, c in zip(ids, plays)})
+
+
+# -- regeneration of the dashboard JSON ---------------------------------------
+
+def build_outputs(cols: dict[str, np.ndarray] | None = None) -> dict:
+    """Compute every derived dashboard file from the log in one pass over the columns."""
+    cols = scan() if cols is None else cols
+    tracks = TrackDictionary().rows
+    artists = ArtistDictionary().rows
+    track_names = [t[1] for t in tracks]
+    if not len(cols['ts']):
+        return {}
+
+    mkey = month_keys(cols['ts'])
+    ykey = cols['ts'].astype('datetime64[ms]').astype('datetime64[Y]').astype(np.int64) + 1970
+
+    # monthly_trends.json
+    m_ids, m_plays, m_ms, m_skips = group(mkey, cols)
+    m_art = _top_per_outer(*_pair_group(mkey, cols['artist'], cols), MONTH_TOP_ARTISTS)
+    m_trk = _top_per_outer(*_pair_group(mkey, cols['track'], cols), MONTH_TOP_TRACKS)
+    monthly = []
+    for k, plays, ms, skips in zip(m_ids.tolist(), m_plays.tolist(), m_ms.tolist(), m_skips.tolist()):
+        top_tracks: dict[str, int] = {}
+        for t, c, _ in m_trk.get(k, []):
+            # Same-named tracks by different artists share a key, as they always have.
+            top_tracks[track_names[t]] = top_tracks.get(track_names[t], 0) + c
+        monthly.append({
+            'year_month': month_label(k),
+            'minutes_played': ms / 60_000,
+            'play_count': plays,
+            'top_artists': {artists[a]: c for a, c, _ in m_art.get(k, [])},
+            'top_tracks': top_tracks,
+            'skip_rate': 100.0 * skips / plays,
+        })
+
+    # basic_stats.json
+    a_ids, a_plays, a_ms, _ = group(cols['artist'], cols)
+    t_ids, t_plays, t_ms, _ = group(cols['track'], cols)
+    first = datetime.fromtimestamp(int(cols['ts'].min()) / 1000, timezone.utc)
+    last = datetime.fromtimestamp(int(cols['ts'].max()) / 1000, timezone.utc)
+    total = len(cols['ts'])
+    stats = {
+        'total_plays': total,
+        'total_hours': int(cols['ms'].sum(dtype=np.int64)) / 3_600_000,
+        'unique_tracks': len(set(track_names[int(t)] for t in t_ids)),
+        'unique_artists': len(a_ids),
+        'date_range': {'start': first.strftime('%Y-%m-%d'), 'end': last.strftime('%Y-%m-%d')},
+        'avg_skip_rate': 100.0 * int(cols['skip'].sum(dtype=np.int64)) / total,
+        'top_artists_all_time': {artists[int(a_ids[i])]: int(a_plays[i])
+                                 for i in _top_ids(a_ids, a_plays, ALL_TIME_TOP, a_ms)},
+        'top_tracks_all_time': [{'track': tracks[int(t_ids[i])][1], 'artist': tracks[int(t_ids[i])][2],
+                                 'play_count': int(t_plays[i])}
+                                for i in _top_ids(t_ids, t_plays, ALL_TIME_TOP, t_ms)],
+    }
+
+    # artist_evolution.json
+    y_art = _top_per_outer(*_pair_group(ykey, cols['artist'], cols), YEAR_TOP_ARTISTS)
+    evolution = {str(y): [{'artist': artists[a], 'play_count': c} for a, c, _ in rows]
+                 for y, rows in sorted(y_art.items())}
+
+    # top_songs/ shards
+    p_trk = _top_per_outer(*_pair_group(mkey, cols['track'], cols), PERIOD_TOP_SONGS)
+    top_songs = {month_label(k): [_song_row(tracks[t], c, ms) for t, c, ms in rows]
+                 for k, rows in sorted(p_trk.items())}
+
+    return {'monthly_trends': monthly, 'basic_stats': stats,
+            'artist_evolution': evolution, 'top_songs': top_songs}
+
+
+def regenerate(write: bool = True) -> dict:
+    """Rebuild the dashboard files from the log; returns timings and sizes."""
+    import top_songs_shards
+
+    t0 = time.perf_counter()
+    cols = scan()
+    t_scan = time.perf_counter() - t0
+    outputs = build_outputs(cols)
+    t_build = time.perf_counter() - t0 - t_scan
+    if write and outputs:
+        # monthly_trends/basic_stats keep json.dump's \u escapes (see play_aggregates).
+        json_store.write_json(os.path.join(DATA_DIR, 'monthly_trends.json'),
+                              outputs['monthly_trends'], ensure_ascii=True)
+        json_store.write_json(os.path.join(DATA_DIR, 'basic_stats.json'),
+                              outputs['basic_stats'], ensure_ascii=True)
+        json_store.write_json(os.path.join(DATA_DIR, 'artist_evolution.json'), outputs['artist_evolution'])
+        top_songs_shards.save_all(outputs['top_songs'])
+    return {'plays': len(cols['ts']), 'months': len(outputs.get('monthly_trends', [])),
+            'scan_s': round(t_scan, 4), 'build_s': round(t_build, 4),
+            'total_s': round(time.perf_counter() - t0, 4)}
+
+
+# -- Spotify data export import ------------------------------------------------
+
+def plays_from_export(records: list[dict]) -> list[dict]:
+    """Normalize Spotify data-export records into play dicts.
+
+    Handles both the extended streaming history (endsong_*.json /
+    Streaming_History_Audio_*.json: ts is when playback *ended*) and the
+    basic account export (StreamingHistory*.json: endTime, minute precision).
+    Podcast episodes and records without a track name are dropped.
+    """
+    plays = []
+    for r in records:
+        if 'master_metadata_track_name' in r or 'spotify_track_uri' in r:
+            track, artist = r.get('master_metadata_track_name'), r.get('master_metadata_album_artist_name')
+            end = datetime.fromisoformat(r['ts'].replace('Z', '+00:00'))
+            uri = r.get('spotify_track_uri') or ''
+            skipped = r.get('skipped')
+        else:
+            track, artist = r.get('trackName'), r.get('artistName')
+            end = datetime.strptime(r['endTime'], '%Y-%m-%d %H:%M').replace(tzinfo=timezone.utc)
+            uri, skipped = '', None
+        if not track:
+            continue
+        ms = int(r.get('ms_played', r.get('msPlayed')) or 0)
+        plays.append({
+            'ts': end - timedelta(milliseconds=ms),
+            'track': track,
+            'artist': artist or 'Unknown',
+            'uri': uri,
+            'ms_played': ms,
+            'skipped': bool(skipped) if skipped is not None else ms < SKIP_THRESHOLD_MS,
+        })
+    return plays
+
+
+def import_export(paths: list[str]) -> tuple[int, int]:
+    """Append every play in the given export files. Returns (read, new)."""
+    plays = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            plays.extend(plays_from_export(json.load(f)))
+    return len(plays), len(append(plays))
+
+
+def main(argv: list[str]) -> int:
+    cmd = argv[0] if argv else ''
+    if cmd == 'import' and len(argv) > 1:
+        read, new = import_export(argv[1:])
+        print(f'Read {read} plays, appended {new} new ({len(months())} months in log)')
+        return 0
+    if cmd == 'regenerate':
+        print(json.dumps(regenerate(write='--dry-run' not in argv)))
+        return 0
+    if cmd == 'stats':
+        cols = scan()
+        print(json.dumps({'plays': len(cols['ts']), 'months': len(months()),
+                          'tracks': len(TrackDictionary().rows), 'artists': len(ArtistDictionary().rows),
+                          'bytes': sum(c.nbytes for c in cols.values())}))
+        return 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -4,7 +4,8 @@ Reddit + Hacker News sentiment workflow — real backend.
 Drop-in replacement for railway-api/app.py. This version runs the ENTIRE
 workflow on demand when the form on coryziller.github.io is submitted:
 
-    1. Live-scrape last 24h of NVIDIA GPU mentions from Reddit + HN
+    1. Live-scrape last 24h of mentions of a topic (default: NVIDIA GPU)
+       from Reddit + HN
     2. Score sentiment with OpenAI (with a deterministic fallback if no key)
     3. Generate a ~30-second audio briefing with gTTS
     4. Email the report + MP3 attachment via Brevo
@@ -16,49 +17,280 @@ Optional:
     OPENAI_API_KEY     — if set, uses gpt-4o-mini for sentiment; otherwise
                          uses a built-in lexicon scorer so the demo still works
     ALLOWED_ORIGIN     — CORS origin (default: https://coryziller.github.io)
+    DEFAULT_TOPIC      — topic used when a request doesn't name one
+                         (default: nvidia gpu); /preview?topic= and the
+                         send-demo body's "topic" pick another
+    SCRAPE_PREFETCH_TOPICS — how many of the most requested topics to keep
+                         warm in the background (default 3, 0 disables)
+    SCRAPE_DEEP=1      — page through the full 24h window on each source
+                         (incrementally, from a stored high-water mark)
+
+gTTS and the Brevo SDK are imported on first use, not at boot;
+bench_startup.py measures cold-start time against a budget.
 """
 
 from __future__ import annotations
 
+import atexit
 import base64
+import bisect
+import fcntl
+import gzip
+import hashlib
+import heapq
+import importlib
 import io
 import json
 import logging
 import os
 import re
+import sys
 import time
 import urllib.error
 import urllib.parse
 import urllib.request
+from array import array
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
-from threading import Lock
+from threading import Event, Lock, Thread
 from typing import Any
 
-from flask import Flask, jsonify, request
-from flask_cors import CORS
-from gtts import gTTS
-import sib_api_v3_sdk
-from sib_api_v3_sdk.rest import ApiException
+from flask import Flask, Response, jsonify, request
+
+import sentiment_history
+import word_tally
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
 log = logging.getLogger('sentiment-demo')
 
 app = Flask(__name__)
 ALLOWED_ORIGIN = os.environ.get('ALLOWED_ORIGIN', 'https://coryziller.github.io')
-CORS(app, resources={r'/*': {'origins': [ALLOWED_ORIGIN, 'http://localhost:*']}})
+_LOCALHOST_ORIGIN = re.compile(r'^http://localhost(:\d+)?$')
+
+
+@app.after_request
+def _cors(resp):
+    # The two origin rules flask-cors was configured with; not worth a
+    # dependency (and its import cost) on every boot.
+    origin = request.headers.get('Origin')
+    if origin and (origin == ALLOWED_ORIGIN or _LOCALHOST_ORIGIN.match(origin)):
+        resp.headers['Access-Control-Allow-Origin'] = origin
+        if request.method == 'OPTIONS':
+            resp.headers['Access-Control-Allow-Methods'] = resp.headers.get('Allow') or 'GET, POST, OPTIONS'
+            wanted = request.headers.get('Access-Control-Request-Headers')
+            if wanted:
+                resp.headers['Access-Control-Allow-Headers'] = wanted
+    resp.vary.add('Origin')
+    return resp
+
+
+# ---------------------------------------------------------------------------
+# Heavy integrations (gTTS, the Brevo SDK) are imported on first use rather
+# than at boot: most requests never send an email, and the SDK alone costs
+# more to import than Flask. bench_startup.py guards the difference.
+# ---------------------------------------------------------------------------
+
+class _Provider:
+    """A module imported the first time something asks for it."""
+
+    def __init__(self, module: str):
+        self.module = module
+        self._mod = None
+        self._lock = Lock()
+
+    def get(self):
+        if self._mod is None:
+            with self._lock:
+                if self._mod is None:
+                    t0 = time.perf_counter()
+                    self._mod = importlib.import_module(self.module)
+                    log.info('loaded %s in %.0fms', self.module, (time.perf_counter() - t0) * 1000)
+        return self._mod
+
+    @property
+    def loaded(self) -> bool:
+        return self._mod is not None
+
+
+TTS = _Provider('gtts')
+BREVO = _Provider('sib_api_v3_sdk')
+
+
+class EmailProviderError(Exception):
+    """Brevo rejected the send (wraps the SDK's ApiException)."""
 
-QUERY = 'nvidia gpu'
 USER_AGENT = 'coryziller-portfolio/2.0 (contact: coryziller@gmail.com)'
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(BASE_DIR, '.cache'))
+
+
+def _atomic_write_json(path: str, data: Any) -> None:
+    """Write JSON via a temp file + rename so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+
 # ---------------------------------------------------------------------------
-# Scrape cache — avoids hammering Reddit/HN on every form submission.
-# Results are reused for SCRAPE_CACHE_TTL seconds. On a 429 we fall back
-# to cached data rather than surfacing a raw HTTP error.
+# Topics — the scrape/score/report pipeline is parameterized by a free-text
+# topic (normalized to lowercase words). TOPIC_LABELS gives known topics a
+# display name for the report, audio and email; anything else is shown as
+# typed. DEFAULT_TOPIC is what the site's form uses.
 # ---------------------------------------------------------------------------
-SCRAPE_CACHE_TTL = 300  # 5 minutes
+DEFAULT_TOPIC = os.environ.get('DEFAULT_TOPIC', 'nvidia gpu')
+TOPIC_LABELS = {'nvidia gpu': 'NVIDIA GPU', 'nvidia': 'NVIDIA', 'amd gpu': 'AMD GPU'}
+
+
+def normalize_topic(raw: str | None) -> str:
+    """Canonical cache key for a topic; ValueError if it isn't usable."""
+    return sentiment_history.normalize_topic(raw or DEFAULT_TOPIC)
+
+
+def topic_label(topic: str) -> str:
+    return TOPIC_LABELS.get(topic, topic)
 
-_scrape_cache: dict[str, Any] = {'reddit': [], 'hn': [], 'ts': 0.0}
+
+# ---------------------------------------------------------------------------
+# Scrape cache — one entry per (topic, source), reused for SCRAPE_CACHE_TTL
+# seconds. On a 429 we fall back to cached data (even if stale) rather than
+# surfacing a raw HTTP error. All topics share one LRU bounded by the
+# approximate JSON size of the cached posts (SCRAPE_CACHE_MAX_BYTES), so a
+# burst of one-off topics cannot grow memory without limit.
+# ---------------------------------------------------------------------------
+SCRAPE_CACHE_TTL = 300  # 5 minutes
+SCRAPE_CACHE_MAX_BYTES = int(os.environ.get('SCRAPE_CACHE_MAX_BYTES', 2 * 1024 * 1024))
+SCRAPE_WARM_MAX_AGE = int(os.environ.get('SCRAPE_WARM_MAX_AGE', 6 * 3600))
+# Request counts per topic, for picking prefetch topics. Once more than twice
+# this many topics are tracked, only the most requested half is kept.
+SCRAPE_TOPIC_HITS_MAX = 256
+
+_scrape_cache: OrderedDict[tuple[str, str], dict[str, Any]] = OrderedDict()
+_scrape_cache_bytes = 0
 _scrape_lock = Lock()
+_topic_hits: Counter = Counter()
+
+
+def _cache_get(topic: str, source: str, max_age: float | None = SCRAPE_CACHE_TTL) -> list[dict] | None:
+    with _scrape_lock:
+        entry = _scrape_cache.get((topic, source))
+        if entry is None:
+            return None
+        age = time.time() - entry['ts']
+        if max_age is not None and age >= max_age:
+            return None
+        _scrape_cache.move_to_end((topic, source))
+        log.info('%s [%s]: cache hit (age %.0fs)', source, topic, age)
+        return list(entry['posts'])
+
+
+def _cache_put(topic: str, source: str, posts: list[dict], ts: float | None = None,
+               restored: bool = False) -> None:
+    global _scrape_cache_bytes
+    size = len(json.dumps(posts, ensure_ascii=False))
+    with _scrape_lock:
+        old = _scrape_cache.pop((topic, source), None)
+        if old is not None:
+            _scrape_cache_bytes -= old['bytes']
+        _scrape_cache[(topic, source)] = {'posts': posts, 'ts': ts if ts is not None else time.time(),
+                                          'bytes': size, 'restored': restored}
+        _scrape_cache_bytes += size
+        while _scrape_cache_bytes > SCRAPE_CACHE_MAX_BYTES and len(_scrape_cache) > 1:
+            (t, src), evicted = _scrape_cache.popitem(last=False)
+            _scrape_cache_bytes -= evicted['bytes']
+            log.info('scrape cache: evicted %s [%s]', src, t)
+
+
+def _cache_stats() -> dict:
+    now = time.time()
+    with _scrape_lock:
+        topics: dict[str, dict] = {}
+        for (topic, source), entry in _scrape_cache.items():
+            topics.setdefault(topic, {})[source] = {'posts': len(entry['posts']),
+                                                    'age_seconds': round(now - entry['ts'], 1)}
+        return {'bytes': _scrape_cache_bytes, 'max_bytes': SCRAPE_CACHE_MAX_BYTES, 'topics': topics}
+
+
+# ---------------------------------------------------------------------------
+# Shared fetch scheduling — every topic's requests to a host go through one
+# pacer per source (a minimum gap between request starts), and concurrent
+# requests for the same (topic, source) collapse into a single fetch.
+# ---------------------------------------------------------------------------
+SOURCE_MIN_INTERVAL = {'reddit': 2.0, 'hn': 0.5}
+
+_pacer_lock = Lock()
+_next_slot: dict[str, float] = {}
+_inflight: dict[tuple[str, str], Event] = {}
+_inflight_lock = Lock()
+
+
+def _wait_for_slot(source: str) -> None:
+    with _pacer_lock:
+        now = time.monotonic()
+        slot = max(now, _next_slot.get(source, 0.0))
+        _next_slot[source] = slot + SOURCE_MIN_INTERVAL.get(source, 0.0)
+    if slot > now:
+        time.sleep(slot - now)
+
+
+def _warm_get(topic: str, source: str) -> list[dict] | None:
+    """An expired entry restored at boot, if still young enough to serve while refreshing."""
+    with _scrape_lock:
+        entry = _scrape_cache.get((topic, source))
+        if entry is None or not entry.get('restored') or time.time() - entry['ts'] >= SCRAPE_WARM_MAX_AGE:
+            return None
+        return list(entry['posts'])
+
+
+def _scheduled_fetch(topic: str, source: str, fetch, max_age: float = SCRAPE_CACHE_TTL) -> list[dict]:
+    """Serve (topic, source) from cache, or fetch it once for all waiting callers.
+
+    Right after a cold start, entries restored from the snapshot are served
+    even past the TTL while a background fetch replaces them.
+    """
+    cached = _cache_get(topic, source, max_age)
+    if cached is not None:
+        return cached
+    warm = _warm_get(topic, source)
+    if warm is not None:
+        log.info('%s [%s]: serving restored data while refreshing', source, topic)
+        Thread(target=_refresh_quietly, args=(topic, source, fetch), daemon=True).start()
+        return warm
+    return _fetch_once(topic, source, fetch)
+
+
+def _refresh_quietly(topic: str, source: str, fetch) -> None:
+    try:
+        _fetch_once(topic, source, fetch)
+    except Exception as e:
+        log.warning('background refresh %s [%s] failed: %s', source, topic, e)
+
+
+def _fetch_once(topic: str, source: str, fetch) -> list[dict]:
+    key = (topic, source)
+    with _inflight_lock:
+        event = _inflight.get(key)
+        leader = event is None
+        if leader:
+            event = _inflight[key] = Event()
+    if not leader:
+        event.wait(timeout=60)
+        cached = _cache_get(topic, source, max_age=None)
+        if cached is not None:
+            return cached
+    try:
+        _wait_for_slot(source)
+        posts = fetch(topic)
+        _cache_put(topic, source, posts)
+        return list(posts)
+    finally:
+        if leader:
+            with _inflight_lock:
+                _inflight.pop(key, None)
+            event.set()
+
 
 # ---------------------------------------------------------------------------
 # Per-IP rate limiter for /send-demo (max 1 request per 60s per IP)
@@ -91,87 +323,239 @@ def _http_get_json(url: str, timeout: int = 15) -> dict:
         return json.loads(r.read().decode('utf-8'))
 
 
-def fetch_reddit(limit: int = 25) -> list[dict]:
-    now = time.time()
-    with _scrape_lock:
-        cache_age = now - _scrape_cache['ts']
-        if _scrape_cache['ts'] and cache_age < SCRAPE_CACHE_TTL:
-            log.info('Reddit: cache hit (age %.0fs)', cache_age)
-            return list(_scrape_cache['reddit'])
-
-    url = (
-        'https://www.reddit.com/search.json'
-        f'?q={urllib.parse.quote_plus(QUERY)}&sort=new&t=day&limit={limit}'
-    )
+def _stale_or_raise(topic: str, source: str, e: urllib.error.HTTPError, message: str) -> list[dict]:
+    if e.code == 429:
+        cached = _cache_get(topic, source, max_age=None)
+        if cached:
+            log.warning('%s 429 [%s] — using cached data (%d posts)', source, topic, len(cached))
+            return cached
+        raise RuntimeError(message) from e
+    raise e
+
+
+def _reddit_post(p: dict) -> dict:
+    return {
+        'source': 'reddit',
+        'id': p.get('name') or p.get('id'),
+        'created_utc': int(p.get('created_utc') or 0),
+        'title': p.get('title', '').strip(),
+        'text': (p.get('selftext') or '').strip()[:400],
+        'score': p.get('score', 0),
+        'num_comments': p.get('num_comments', 0),
+        'subreddit': p.get('subreddit'),
+        'url': f"https://www.reddit.com{p.get('permalink', '')}",
+    }
+
+
+def _hn_post(h: dict) -> dict:
+    return {
+        'source': 'hn',
+        'id': str(h.get('objectID')),
+        'created_utc': int(h.get('created_at_i') or 0),
+        'title': (h.get('title') or h.get('story_title') or '').strip(),
+        'text': (h.get('comment_text') or h.get('story_text') or '')[:400],
+        'score': h.get('points') or 0,
+        'num_comments': h.get('num_comments') or 0,
+        'url': f"https://news.ycombinator.com/item?id={h.get('objectID')}",
+    }
+
+
+def _reddit_url(topic: str, limit: int, after: str | None = None) -> str:
+    return ('https://www.reddit.com/search.json'
+            f'?q={urllib.parse.quote_plus(topic)}&sort=new&t=day&limit={limit}'
+            + (f'&after={urllib.parse.quote_plus(after)}' if after else ''))
+
+
+def _hn_url(topic: str, since: int, limit: int, page: int = 0) -> str:
+    return ('https://hn.algolia.com/api/v1/search_by_date'
+            f'?query={urllib.parse.quote_plus(topic)}'
+            f'&numericFilters=created_at_i>{since}&hitsPerPage={limit}&page={page}')
+
+
+# ---------------------------------------------------------------------------
+# Deep scrape (SCRAPE_DEEP=1) — instead of one page per source, page through
+# the whole 24h window: Reddit by following `after` cursors (inherently
+# sequential), HN by fetching Algolia pages 1..nbPages concurrently once
+# page 0 reports how many there are. Every page goes through the source's
+# pacer. Each (topic, source) keeps the posts it has already seen in the
+# window plus a high-water mark (newest created_utc) in SCRAPE_STATE_PATH,
+# so a repeat run only asks for posts newer than the mark and merges them
+# into what it already has, deduplicated by post id.
+# ---------------------------------------------------------------------------
+SCRAPE_DEEP = os.environ.get('SCRAPE_DEEP', '0') == '1'
+SCRAPE_DEEP_MAX_PAGES = int(os.environ.get('SCRAPE_DEEP_MAX_PAGES', 10))
+SCRAPE_DEEP_PAGE_SIZE = {'reddit': 100, 'hn': 100}
+SCRAPE_WINDOW = 86_400
+SCRAPE_STATE_PATH = os.path.join(CACHE_DIR, 'scrape_state.json')
+SCRAPE_STATE_MAX_KEYS = 32
+
+_deep_state: dict[str, dict] | None = None
+_deep_state_lock = Lock()
+
+
+def _load_deep_state() -> dict[str, dict]:
+    global _deep_state
+    if _deep_state is None:
+        try:
+            with open(SCRAPE_STATE_PATH, 'r', encoding='utf-8') as f:
+                _deep_state = json.load(f)
+        except (OSError, ValueError):
+            _deep_state = {}
+    return _deep_state
+
+
+def _merge_deep(topic: str, source: str, new_posts: list[dict]) -> tuple[list[dict], int]:
+    """Fold new posts into the stored window; returns (window posts, newly seen count)."""
+    cutoff = int(time.time()) - SCRAPE_WINDOW
+    with _deep_state_lock:
+        state = _load_deep_state()
+        key = f'{source}:{topic}'
+        entry = state.pop(key, None) or {'hwm': 0, 'posts': {}}
+        known = entry['posts']
+        fresh = 0
+        for p in new_posts:
+            if p['id'] and p['id'] not in known:
+                known[p['id']] = p
+                fresh += 1
+        entry['posts'] = {i: p for i, p in known.items() if p['created_utc'] > cutoff}
+        entry['hwm'] = max([entry['hwm']] + [p['created_utc'] for p in new_posts])
+        state[key] = entry  # re-insert so the dict stays in least-recently-used order
+        while len(state) > SCRAPE_STATE_MAX_KEYS:
+            state.pop(next(iter(state)))
+        try:
+            _atomic_write_json(SCRAPE_STATE_PATH, state)
+        except OSError as e:
+            log.warning('scrape state write failed: %s', e)
+        posts = sorted(entry['posts'].values(), key=lambda p: p['created_utc'], reverse=True)
+    return posts, fresh
+
+
+def _deep_since(topic: str, source: str) -> int:
+    with _deep_state_lock:
+        entry = _load_deep_state().get(f'{source}:{topic}') or {}
+    return max(int(time.time()) - SCRAPE_WINDOW, int(entry.get('hwm') or 0))
+
+
+def _deep_reddit(topic: str) -> list[dict]:
+    since = _deep_since(topic, 'reddit')
+    new_posts, after, pages = [], None, 0
+    while pages < SCRAPE_DEEP_MAX_PAGES:
+        if pages:
+            _wait_for_slot('reddit')
+        data = _http_get_json(_reddit_url(topic, SCRAPE_DEEP_PAGE_SIZE['reddit'], after)).get('data', {})
+        pages += 1
+        batch = [_reddit_post(c.get('data', {})) for c in data.get('children', [])]
+        new_posts += [p for p in batch if p['created_utc'] > since]
+        after = data.get('after')
+        # Results are newest-first, so one post at or below the mark means we've caught up.
+        if not after or not batch or any(p['created_utc'] <= since for p in batch):
+            break
+    posts, fresh = _merge_deep(topic, 'reddit', new_posts)
+    log.info('reddit deep [%s]: %d pages, %d new, %d in window', topic, pages, fresh, len(posts))
+    return posts
+
+
+def _deep_hn(topic: str) -> list[dict]:
+    since = _deep_since(topic, 'hn')
+    size = SCRAPE_DEEP_PAGE_SIZE['hn']
+    first = _http_get_json(_hn_url(topic, since, size))
+    pages = [first]
+    n_pages = min(int(first.get('nbPages') or 1), SCRAPE_DEEP_MAX_PAGES)
+
+    def page(i: int) -> dict:
+        _wait_for_slot('hn')
+        return _http_get_json(_hn_url(topic, since, size, i))
+
+    if n_pages > 1:
+        with ThreadPoolExecutor(max_workers=min(4, n_pages - 1)) as pool:
+            pages += list(pool.map(page, range(1, n_pages)))
+    new_posts = [p for data in pages for p in map(_hn_post, data.get('hits', [])) if p['title']]
+    posts, fresh = _merge_deep(topic, 'hn', new_posts)
+    log.info('hn deep [%s]: %d pages, %d new, %d in window', topic, n_pages, fresh, len(posts))
+    return posts
+
+
+def fetch_reddit(limit: int = 25, topic: str = DEFAULT_TOPIC, max_age: float = SCRAPE_CACHE_TTL) -> list[dict]:
+    def fetch(topic: str) -> list[dict]:
+        if SCRAPE_DEEP:
+            return _deep_reddit(topic)
+        data = _http_get_json(_reddit_url(topic, limit))
+        return [_reddit_post(c.get('data', {})) for c in data.get('data', {}).get('children', [])]
+
     try:
-        data = _http_get_json(url)
+        return _scheduled_fetch(topic, 'reddit', fetch, max_age)
     except urllib.error.HTTPError as e:
-        if e.code == 429:
-            with _scrape_lock:
-                cached = list(_scrape_cache['reddit'])
-            if cached:
-                log.warning('Reddit 429 — using cached data (%d posts)', len(cached))
-                return cached
-            raise RuntimeError(
-                'Reddit is temporarily rate-limiting requests. '
-                'Please wait 60 seconds and try again.'
-            ) from e
-        raise
-
-    out = []
-    for c in data.get('data', {}).get('children', []):
-        p = c.get('data', {})
-        out.append({
-            'source': 'reddit',
-            'title': p.get('title', '').strip(),
-            'text': (p.get('selftext') or '').strip()[:400],
-            'score': p.get('score', 0),
-            'num_comments': p.get('num_comments', 0),
-            'subreddit': p.get('subreddit'),
-            'url': f"https://www.reddit.com{p.get('permalink', '')}",
-        })
-    with _scrape_lock:
-        _scrape_cache['reddit'] = out
-        _scrape_cache['ts'] = time.time()
-    return out
+        return _stale_or_raise(topic, 'reddit', e,
+                               'Reddit is temporarily rate-limiting requests. '
+                               'Please wait 60 seconds and try again.')
 
 
-def fetch_hackernews(limit: int = 25) -> list[dict]:
-    since = int(time.time()) - 86_400
-    url = (
-        'https://hn.algolia.com/api/v1/search_by_date'
-        f'?query={urllib.parse.quote_plus(QUERY)}'
-        f'&numericFilters=created_at_i>{since}&hitsPerPage={limit}'
-    )
+def fetch_hackernews(limit: int = 25, topic: str = DEFAULT_TOPIC, max_age: float = SCRAPE_CACHE_TTL) -> list[dict]:
+    def fetch(topic: str) -> list[dict]:
+        if SCRAPE_DEEP:
+            return _deep_hn(topic)
+        data = _http_get_json(_hn_url(topic, int(time.time()) - SCRAPE_WINDOW, limit))
+        return [p for p in map(_hn_post, data.get('hits', [])) if p['title']]
+
     try:
-        data = _http_get_json(url)
+        return _scheduled_fetch(topic, 'hn', fetch, max_age)
     except urllib.error.HTTPError as e:
-        if e.code == 429:
-            with _scrape_lock:
-                cached = list(_scrape_cache['hn'])
-            if cached:
-                log.warning('HN 429 — using cached data (%d posts)', len(cached))
-                return cached
-            raise RuntimeError(
-                'Hacker News is temporarily rate-limiting. Please wait 60 seconds and try again.'
-            ) from e
-        raise
-
-    out = [
-        {
-            'source': 'hn',
-            'title': (h.get('title') or h.get('story_title') or '').strip(),
-            'text': (h.get('comment_text') or h.get('story_text') or '')[:400],
-            'score': h.get('points') or 0,
-            'num_comments': h.get('num_comments') or 0,
-            'url': f"https://news.ycombinator.com/item?id={h.get('objectID')}",
-        }
-        for h in data.get('hits', [])
-    ]
-    hn_results = [p for p in out if p['title']]
+        return _stale_or_raise(topic, 'hn', e,
+                               'Hacker News is temporarily rate-limiting. Please wait 60 seconds and try again.')
+
+
+def fetch_topic(topic: str) -> list[dict]:
+    """Every source's posts for `topic`, counting the request toward its popularity."""
+    global _topic_hits
+    with _scrape_lock:
+        _topic_hits[topic] += 1
+        if len(_topic_hits) > 2 * SCRAPE_TOPIC_HITS_MAX:
+            _topic_hits = Counter(dict(_topic_hits.most_common(SCRAPE_TOPIC_HITS_MAX)))
+    return fetch_reddit(topic=topic) + fetch_hackernews(topic=topic)
+
+
+# ---------------------------------------------------------------------------
+# Background refresh — keeps the most requested topics warm so /preview and
+# /send-demo rarely wait on Reddit/HN. Started lazily on the first request
+# in each worker (a thread started at import would not survive gunicorn's
+# --preload fork). SCRAPE_PREFETCH_TOPICS=0 disables it.
+# ---------------------------------------------------------------------------
+SCRAPE_PREFETCH_TOPICS = int(os.environ.get('SCRAPE_PREFETCH_TOPICS', 3))
+SCRAPE_PREFETCH_INTERVAL = 60
+_prefetch_started = False
+_prefetch_lock = Lock()
+
+
+def popular_topics(n: int) -> list[str]:
     with _scrape_lock:
-        _scrape_cache['hn'] = hn_results
-    return hn_results
+        ranked = [t for t, _ in _topic_hits.most_common(n)]
+    if DEFAULT_TOPIC not in ranked:
+        ranked = [DEFAULT_TOPIC] + ranked[:max(n - 1, 0)]
+    return ranked
+
+
+def _prefetch_loop() -> None:
+    # Refresh a little before expiry so requests never see a cold entry.
+    max_age = SCRAPE_CACHE_TTL * 0.8
+    while True:
+        for topic in popular_topics(SCRAPE_PREFETCH_TOPICS):
+            for fetch in (fetch_reddit, fetch_hackernews):
+                try:
+                    fetch(topic=topic, max_age=max_age)
+                except Exception as e:
+                    log.warning('prefetch %s [%s] failed: %s', fetch.__name__, topic, e)
+        time.sleep(SCRAPE_PREFETCH_INTERVAL)
+
+
+@app.before_request
+def _start_prefetch() -> None:
+    global _prefetch_started
+    if _prefetch_started or SCRAPE_PREFETCH_TOPICS <= 0:
+        return
+    with _prefetch_lock:
+        if not _prefetch_started:
+            _prefetch_started = True
+            Thread(target=_prefetch_loop, name='scrape-prefetch', daemon=True).start()
 
 
 # ---------------------------------------------------------------------------
@@ -194,24 +578,60 @@ def score_one_lexicon(text: str) -> float:
     return round(100 * pos / max(pos + neg, 1), 1)
 
 
-def score_posts(posts: list[dict]) -> list[dict]:
+# Scores already computed for a (topic, post url), so a refreshed scrape only
+# pays for posts it hasn't seen. Bounded LRU; snapshotted with the caches.
+SCORED_CACHE_MAX = 5000
+_scored_cache: OrderedDict[tuple[str, str], float] = OrderedDict()
+_scored_lock = Lock()
+
+
+def active_scorer() -> str:
+    """The scorer score_posts uses for new posts: 'openai' with a key, else 'lexicon'."""
+    return 'openai' if os.environ.get('OPENAI_API_KEY') else 'lexicon'
+
+
+def score_posts(posts: list[dict], topic: str = DEFAULT_TOPIC) -> list[dict]:
+    """Set each post's 'sentiment' and the 'scorer' that produced it."""
+    todo = []
+    active = active_scorer()
+    with _scored_lock:
+        for p in posts:
+            hit = _scored_cache.get((topic, p['url']))
+            if hit is None:
+                todo.append(p)
+            else:
+                _scored_cache.move_to_end((topic, p['url']))
+                p['sentiment'], p['scorer'] = hit, active
     api_key = os.environ.get('OPENAI_API_KEY')
-    if api_key and posts:
+    scored = False
+    if api_key and todo:
         try:
-            return _score_with_openai(posts, api_key)
+            _score_with_openai(todo, api_key, topic)
+            scored = True
         except Exception as e:
             log.warning('OpenAI scoring failed, using lexicon fallback: %s', e)
-    for p in posts:
-        p['sentiment'] = score_one_lexicon(f"{p['title']} {p['text']}")
+    if not scored:
+        for p in todo:
+            p['sentiment'] = score_one_lexicon(f"{p['title']} {p['text']}")
+    for p in todo:
+        p['scorer'] = 'openai' if scored else 'lexicon'
+    with _scored_lock:
+        # Lexicon fallbacks for a failed OpenAI call aren't cached, so the next
+        # refresh retries them and the cache only holds active_scorer() scores.
+        for p in todo:
+            if p['scorer'] == active:
+                _scored_cache[(topic, p['url'])] = p['sentiment']
+        while len(_scored_cache) > SCORED_CACHE_MAX:
+            _scored_cache.popitem(last=False)
     return posts
 
 
-def _score_with_openai(posts: list[dict], api_key: str) -> list[dict]:
+def _score_with_openai(posts: list[dict], api_key: str, topic: str = DEFAULT_TOPIC) -> list[dict]:
     snippets = [{'i': i, 'text': f"{p['title']}. {p['text']}"[:500]} for i, p in enumerate(posts)]
     body = {
         'model': 'gpt-4o-mini',
         'messages': [{'role': 'user', 'content': (
-            'Score each snippet for NVIDIA/GPU sentiment 0-100. '
+            f'Score each snippet for {topic_label(topic)} sentiment 0-100. '
             'Return ONLY JSON: {"scores":[{"i":0,"s":72},...]}\n\n' + json.dumps(snippets)
         )}],
         'response_format': {'type': 'json_object'},
@@ -234,9 +654,10 @@ def _score_with_openai(posts: list[dict], api_key: str) -> list[dict]:
 # 3. Report + audio
 # ---------------------------------------------------------------------------
 
-def build_report(posts: list[dict]) -> dict:
+def build_report(posts: list[dict], topic: str = DEFAULT_TOPIC) -> dict:
     if not posts:
-        return {'generated_at': datetime.now(timezone.utc).isoformat(), 'total_posts': 0,
+        return {'generated_at': datetime.now(timezone.utc).isoformat(),
+                'topic': topic, 'topic_label': topic_label(topic), 'total_posts': 0,
                 'avg_sentiment': 50.0, 'overall_label': 'No chatter', 'by_source': {},
                 'top_positive': [], 'top_negative': []}
     avg = round(sum(p['sentiment'] for p in posts) / len(posts), 1)
@@ -249,19 +670,21 @@ def build_report(posts: list[dict]) -> dict:
             by_source[src] = {'count': len(sp),
                               'avg_sentiment': round(sum(p['sentiment'] for p in sp) / len(sp), 1)}
     ranked = sorted(posts, key=lambda p: p['sentiment'], reverse=True)
-    return {'generated_at': datetime.now(timezone.utc).isoformat(), 'total_posts': len(posts),
+    return {'generated_at': datetime.now(timezone.utc).isoformat(),
+            'topic': topic, 'topic_label': topic_label(topic), 'total_posts': len(posts),
             'avg_sentiment': avg, 'overall_label': label, 'by_source': by_source,
             'top_positive': ranked[:3], 'top_negative': ranked[-3:][::-1]}
 
 
 def audio_script(name: str, report: dict) -> str:
     total, label, avg = report['total_posts'], report['overall_label'], report['avg_sentiment']
+    subject = report.get('topic_label') or topic_label(DEFAULT_TOPIC)
     if total == 0:
-        return f"Hi {name}, this is Cory with your NVIDIA GPU sentiment briefing. No fresh posts in the last 24 hours."
+        return f"Hi {name}, this is Cory with your {subject} sentiment briefing. No fresh posts in the last 24 hours."
     top = (report['top_positive'] or [None])[0]
     bot = (report['top_negative'] or [None])[0]
     return (
-        f"Hi {name}, this is Cory Ziller with your NVIDIA GPU sentiment briefing. "
+        f"Hi {name}, this is Cory Ziller with your {subject} sentiment briefing. "
         f"In the last 24 hours I analyzed {total} posts across Reddit and Hacker News. "
         f"Overall sentiment is {label}, averaging {avg} out of 100."
         + (f" Most positive: {top['title'][:120]}." if top else '')
@@ -272,7 +695,7 @@ def audio_script(name: str, report: dict) -> str:
 
 def synth_audio(script: str) -> bytes:
     buf = io.BytesIO()
-    gTTS(text=script, lang='en', slow=False).write_to_fp(buf)
+    TTS.get().gTTS(text=script, lang='en', slow=False).write_to_fp(buf)
     return buf.getvalue()
 
 
@@ -284,7 +707,7 @@ def format_email_body(name: str, report: dict, audio_filename: str) -> str:
     now = datetime.now().strftime('%b %d')
     return (
         f"Hi {name},\n\n"
-        f"NVIDIA GPU sentiment, last 24h ({now}):\n"
+        f"{report.get('topic_label') or topic_label(DEFAULT_TOPIC)} sentiment, last 24h ({now}):\n"
         f"  {report['overall_label']} — {report['avg_sentiment']}/100 across {report['total_posts']} posts\n\n"
         f"LISTEN: a 30-second audio briefing is attached as {audio_filename}.\n\n"
         f"— Cory\n"
@@ -295,19 +718,47 @@ def send_email(name: str, email: str, report: dict, audio: bytes) -> str:
     api_key = os.environ.get('BREVO_API_KEY')
     if not api_key:
         raise RuntimeError('BREVO_API_KEY not set')
+    sib_api_v3_sdk = BREVO.get()
     cfg = sib_api_v3_sdk.Configuration()
     cfg.api_key['api-key'] = api_key
     client = sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(cfg))
-    audio_filename = 'nvidia-gpu-audio-briefing.mp3'
+    subject = report.get('topic_label') or topic_label(DEFAULT_TOPIC)
+    slug = re.sub(r'[^a-z0-9]+', '-', (report.get('topic') or DEFAULT_TOPIC).lower()).strip('-')
+    audio_filename = f'{slug}-audio-briefing.mp3'
     msg = sib_api_v3_sdk.SendSmtpEmail(
         to=[{'email': email, 'name': name or email}],
         sender={'email': os.environ.get('SENDER_EMAIL', 'demo@coryziller.com'), 'name': 'Cory Ziller'},
         reply_to={'email': 'coryziller@gmail.com', 'name': 'Cory Ziller'},
-        subject=f"Your NVIDIA GPU sentiment report + audio briefing — {datetime.now().strftime('%b %d, %Y')}",
+        subject=f"Your {subject} sentiment report + audio briefing — {datetime.now().strftime('%b %d, %Y')}",
         text_content=format_email_body(name, report, audio_filename),
         attachment=[{'content': base64.b64encode(audio).decode('utf-8'), 'name': audio_filename}],
     )
-    return getattr(client.send_transac_email(msg), 'message_id', '') or ''
+    try:
+        resp = client.send_transac_email(msg)
+    except sib_api_v3_sdk.rest.ApiException as e:
+        raise EmailProviderError(str(e)) from e
+    return getattr(resp, 'message_id', '') or ''
+
+
+# ---------------------------------------------------------------------------
+# 5. History — every report built from a scrape adds a point to the
+# sentiment time series (see sentiment_history.py); /history reads it back.
+# ---------------------------------------------------------------------------
+_history = sentiment_history.HistoryIndex()
+
+
+def record_history(topic: str, posts: list[dict]) -> None:
+    if not posts:
+        return
+    scorer = active_scorer()
+    # A point averages one scorer's scale; skip requests where OpenAI fell back.
+    if any(p.get('scorer', scorer) != scorer for p in posts):
+        log.info('history point for %r skipped: mixed scorers', topic)
+        return
+    try:
+        sentiment_history.append(sentiment_history.point_from_posts(topic, posts, scorer))
+    except OSError as e:
+        log.warning('history append failed: %s', e)
 
 
 # ---------------------------------------------------------------------------
@@ -316,23 +767,50 @@ def send_email(name: str, email: str, report: dict, audio: bytes) -> str:
 
 @app.route('/health', methods=['GET'])
 def health():
-    with _scrape_lock:
-        cache_age = time.time() - _scrape_cache['ts'] if _scrape_cache['ts'] else None
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now(timezone.utc).isoformat(),
         'has_brevo_key': bool(os.environ.get('BREVO_API_KEY')),
         'has_openai_key': bool(os.environ.get('OPENAI_API_KEY')),
-        'scrape_cache_age_seconds': round(cache_age, 1) if cache_age is not None else None,
-        'scrape_cache_reddit_count': len(_scrape_cache['reddit']),
-        'scrape_cache_hn_count': len(_scrape_cache['hn']),
+        'default_topic': DEFAULT_TOPIC,
+        'scrape_deep': SCRAPE_DEEP,
+        'scrape_cache': _cache_stats(),
+        'prefetch_topics': popular_topics(SCRAPE_PREFETCH_TOPICS) if SCRAPE_PREFETCH_TOPICS > 0 else [],
+        'providers_loaded': [p.module for p in (TTS, BREVO) if p.loaded],
     })
 
 
 @app.route('/preview', methods=['GET'])
 def preview():
-    posts = score_posts(fetch_reddit() + fetch_hackernews())
-    return jsonify(build_report(posts))
+    try:
+        topic = normalize_topic(request.args.get('topic'))
+    except ValueError as e:
+        return jsonify({'ok': False, 'error': str(e)}), 400
+    posts = score_posts(fetch_topic(topic), topic)
+    record_history(topic, posts)
+    return jsonify(build_report(posts, topic))
+
+
+@app.route('/history', methods=['GET'])
+def history():
+    """Sentiment points for ?topic= between ?start= and ?end= (epoch or ISO; default last 30 days).
+
+    ?scorer=lexicon|openai limits the points to one scoring scale.
+    """
+    now = int(time.time())
+    try:
+        topic = normalize_topic(request.args.get('topic'))
+        start = sentiment_history.parse_time(request.args.get('start'), now - 30 * 86_400)
+        end = sentiment_history.parse_time(request.args.get('end'), now + 1)
+        resolution = request.args.get('resolution', 'auto')
+        if resolution not in ('auto', 'raw', 'daily'):
+            raise ValueError('resolution must be auto, raw or daily')
+        scorer = request.args.get('scorer') or None
+        if scorer not in (None, 'lexicon', 'openai'):
+            raise ValueError('scorer must be lexicon or openai')
+    except ValueError as e:
+        return jsonify({'ok': False, 'error': str(e)}), 400
+    return jsonify({'ok': True, **_history.query(topic, start, end, resolution, scorer)})
 
 
 @app.route('/send-demo', methods=['POST', 'OPTIONS'])
@@ -352,22 +830,27 @@ def send_demo():
         return jsonify({'ok': False, 'error': 'Valid email required'}), 400
     if not name:
         name = email.split('@', 1)[0]
+    try:
+        topic = normalize_topic(data.get('topic'))
+    except ValueError as e:
+        return jsonify({'ok': False, 'error': str(e)}), 400
 
     try:
-        log.info('send-demo start: %s', email)
-        reddit_posts = fetch_reddit()
-        hn_posts = fetch_hackernews()
-        log.info('scraped: reddit=%d hn=%d', len(reddit_posts), len(hn_posts))
-        posts = score_posts(reddit_posts + hn_posts)
-        report = build_report(posts)
+        log.info('send-demo start: %s [%s]', email, topic)
+        posts = fetch_topic(topic)
+        log.info('scraped: reddit=%d hn=%d', sum(p['source'] == 'reddit' for p in posts),
+                 sum(p['source'] == 'hn' for p in posts))
+        posts = score_posts(posts, topic)
+        report = build_report(posts, topic)
+        record_history(topic, posts)
         log.info('report: total=%d label=%s avg=%.1f', report['total_posts'], report['overall_label'], report['avg_sentiment'])
         audio = synth_audio(audio_script(name, report))
         log.info('audio: %d bytes', len(audio))
         message_id = send_email(name, email, report, audio)
         log.info('email sent: %s message_id=%s', email, message_id)
-        return jsonify({'ok': True, 'posts_analyzed': report['total_posts'],
+        return jsonify({'ok': True, 'topic': topic, 'posts_analyzed': report['total_posts'],
                        'overall_label': report['overall_label'], 'message_id': message_id})
-    except ApiException as e:
+    except EmailProviderError as e:
         log.exception('brevo api error')
         return jsonify({'ok': False, 'error': 'Email provider error', 'details': str(e)}), 502
     except RuntimeError as e:
@@ -382,8 +865,6 @@ def send_demo():
 # Lyrics word-cloud endpoint
 # ---------------------------------------------------------------------------
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
 _LYRICS_CACHE: dict[str, list[str] | None] = {}
 _LYRICS_LOCK = Lock()
 
@@ -407,6 +888,67 @@ _WORD_RE = re.compile(r"[a-z']+")
 _WORDCLOUD_CACHE: dict[str, dict] = {}
 _WORDCLOUD_CACHE_LOCK = Lock()
 
+# ---------------------------------------------------------------------------
+# Persistent word-cloud cache — keyed by a content hash of the request so
+# every gunicorn worker and every restart agrees on the key. The key includes
+# the word-bag index version, so a deploy with new precomputed bags starts
+# from fresh entries. Only results with no failed live lookup are persisted:
+# a lyrics.ovh miss may be temporary and stays in the in-memory cache only.
+# Entries live as one JSON file each under WORDCLOUD_CACHE_DIR; once the
+# directory grows past WORDCLOUD_CACHE_MAX_BYTES the least recently used
+# files are evicted.
+# ---------------------------------------------------------------------------
+WORDCLOUD_CACHE_DIR = os.path.join(CACHE_DIR, 'wordcloud')
+WORDCLOUD_CACHE_MAX_BYTES = int(os.environ.get('WORDCLOUD_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+
+
+def _wordcloud_cache_key(year: str, songs: list[dict], bags_version: str) -> str:
+    payload = json.dumps({
+        'year': year,
+        'bags': bags_version,
+        'songs': sorted([s['artist'].lower(), s['track'].lower(), s['plays']] for s in songs),
+    }, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _wordcloud_disk_get(key: str) -> dict | None:
+    path = os.path.join(WORDCLOUD_CACHE_DIR, f'{key}.json')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+        os.utime(path)  # bump mtime so eviction is least-recently-used
+        return result
+    except (OSError, ValueError):
+        return None
+
+
+def _wordcloud_disk_put(key: str, result: dict) -> None:
+    try:
+        _atomic_write_json(os.path.join(WORDCLOUD_CACHE_DIR, f'{key}.json'), result)
+        _wordcloud_disk_evict()
+    except OSError as e:
+        log.warning('wordcloud cache write failed: %s', e)
+
+
+def _wordcloud_disk_evict() -> None:
+    entries = []
+    with os.scandir(WORDCLOUD_CACHE_DIR) as it:
+        for e in it:
+            if e.name.endswith('.json'):
+                st = e.stat()
+                entries.append((st.st_mtime, st.st_size, e.path))
+    total = sum(size for _, size, _ in entries)
+    if total <= WORDCLOUD_CACHE_MAX_BYTES:
+        return
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        if total <= WORDCLOUD_CACHE_MAX_BYTES:
+            break
+
 
 def fetch_lyrics_ovh(artist: str, title: str, timeout: int = 12) -> str | None:
     key = f'{artist.lower().strip()}||{title.lower().strip()}'
@@ -427,6 +969,63 @@ def fetch_lyrics_ovh(artist: str, title: str, timeout: int = 12) -> str | None:
     return text
 
 
+# ---------------------------------------------------------------------------
+# Precomputed word bags — update_wordcloud.py writes one bag per song to
+# spotify-trends/wordclouds/bags/<year>.json. Indexed once per process so
+# songs already covered offline never hit lyrics.ovh.
+# ---------------------------------------------------------------------------
+SPOTIFY_DATA_DIR = os.environ.get('SPOTIFY_DATA_DIR', os.path.join(BASE_DIR, '..', 'spotify-trends'))
+BAGS_DIR = os.path.join(SPOTIFY_DATA_DIR, 'wordclouds', 'bags')
+MAX_LIVE_SONGS = 30
+MAX_INDEXED_SONGS = 500
+
+_BAG_INDEX: dict[str, dict[str, int]] | None = None
+_BAG_INDEX_VERSION = ''
+_BAG_INDEX_LOCK = Lock()
+
+
+def _song_key(artist: str, title: str) -> str:
+    return f'{artist.lower().strip()}||{title.lower().strip()}'
+
+
+def _load_bag_index() -> dict[str, dict[str, int]]:
+    global _BAG_INDEX, _BAG_INDEX_VERSION
+    with _BAG_INDEX_LOCK:
+        if _BAG_INDEX is not None:
+            return _BAG_INDEX
+        index: dict[str, dict[str, int]] = {}
+        try:
+            names = sorted(n for n in os.listdir(BAGS_DIR) if n.endswith('.json'))
+        except OSError:
+            names = []
+        parts = []
+        for name in names:  # later years win for songs present in several
+            path = os.path.join(BAGS_DIR, name)
+            try:
+                st = os.stat(path)
+                with open(path, 'r', encoding='utf-8') as f:
+                    doc = json.load(f)
+            except (OSError, ValueError) as e:
+                log.warning('skipping word bags %s: %s', name, e)
+                continue
+            parts.append(f'{name}:{st.st_mtime_ns}:{st.st_size}')
+            for key, rec in (doc.get('songs') or {}).items():
+                index[key] = rec.get('words') or {}
+        _BAG_INDEX_VERSION = hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+        log.info('word-bag index: %d songs from %d files (%s)', len(index), len(names), _BAG_INDEX_VERSION)
+        _BAG_INDEX = index
+        return index
+
+
+# ---------------------------------------------------------------------------
+# Word aggregation — word_tally.py, shared with update_wordcloud.py.
+# WORDCLOUD_TOPK_MODE=bounded caps the cross-song tally at
+# 1/WORDCLOUD_TOPK_ERROR counters; the default 'exact' keeps a plain Counter.
+# ---------------------------------------------------------------------------
+WORDCLOUD_TOPK_MODE = os.environ.get('WORDCLOUD_TOPK_MODE', 'exact').strip().lower()
+WORDCLOUD_TOPK_ERROR = float(os.environ.get('WORDCLOUD_TOPK_ERROR', '0.0005'))
+
+
 def _clean_lyrics_words(text: str) -> list[str]:
     text = re.sub(r'\[[^\]]{0,40}\]', ' ', text)
     words = _WORD_RE.findall(text.lower())
@@ -455,35 +1054,48 @@ def lyrics_wordcloud():
         seen.add(key)
         normalized.append({'artist': artist, 'track': track, 'plays': plays})
     normalized.sort(key=lambda x: x['plays'], reverse=True)
-    normalized = normalized[:30]
+    bag_index = _load_bag_index()
+    indexed = [s for s in normalized if _song_key(s['artist'], s['track']) in bag_index]
+    live = [s for s in normalized if _song_key(s['artist'], s['track']) not in bag_index]
+    normalized = indexed[:MAX_INDEXED_SONGS] + live[:MAX_LIVE_SONGS]
     if not normalized:
         return jsonify({'ok': False, 'error': 'no valid songs provided'}), 400
 
-    fp = '|'.join(f"{s['artist'].lower()}::{s['track'].lower()}" for s in normalized)
-    cache_key = f"{year}:{datetime.now(timezone.utc).strftime('%Y-%m-%d')}:{hash(fp)}"
+    cache_key = _wordcloud_cache_key(year, normalized, _BAG_INDEX_VERSION)
     with _WORDCLOUD_CACHE_LOCK:
         hit = _WORDCLOUD_CACHE.get(cache_key)
-        if hit:
-            return jsonify(hit)
-
-    from collections import Counter
-    counts: Counter = Counter()
+    if hit is None:
+        hit = _wordcloud_disk_get(cache_key)
+        if hit is not None:
+            with _WORDCLOUD_CACHE_LOCK:
+                _WORDCLOUD_CACHE[cache_key] = hit
+    if hit:
+        return jsonify(hit)
+
+    counts = word_tally.new_word_tally(WORDCLOUD_TOPK_MODE, WORDCLOUD_TOPK_ERROR)
     per_song: list[dict] = []
 
-    def do_one(s: dict) -> tuple[dict, list[str]]:
+    def do_one(s: dict) -> tuple[dict, dict[str, int]]:
         text = fetch_lyrics_ovh(s['artist'], s['track'])
         if not text:
-            return {'artist': s['artist'], 'track': s['track'], 'plays': s['plays'], 'found': False}, []
+            return {'artist': s['artist'], 'track': s['track'], 'plays': s['plays'], 'found': False}, {}
         words = _clean_lyrics_words(text)
-        return {'artist': s['artist'], 'track': s['track'], 'plays': s['plays'], 'found': True, 'word_count': len(words)}, words
+        return {'artist': s['artist'], 'track': s['track'], 'plays': s['plays'], 'found': True, 'word_count': len(words)}, Counter(words)
+
+    def add_bag(info: dict, bag: dict[str, int]) -> None:
+        per_song.append(info)
+        for w, c in bag.items():
+            counts.add(w, c * info.get('plays', 1))
 
-    with ThreadPoolExecutor(max_workers=8) as pool:
-        for info, words in [f.result() for f in as_completed([pool.submit(do_one, s) for s in normalized])]:
-            per_song.append(info)
-            if words:
-                bag = Counter(words)
-                for w, c in bag.items():
-                    counts[w] += c * info.get('plays', 1)
+    for s in indexed[:MAX_INDEXED_SONGS]:
+        bag = bag_index[_song_key(s['artist'], s['track'])]
+        add_bag({'artist': s['artist'], 'track': s['track'], 'plays': s['plays'], 'found': True,
+                 'word_count': sum(bag.values()), 'source': 'precomputed'}, bag)
+
+    if live:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            for info, bag in [f.result() for f in as_completed([pool.submit(do_one, s) for s in live[:MAX_LIVE_SONGS]])]:
+                add_bag(info, bag)
 
     found = [p for p in per_song if p.get('found')]
     total_plays = sum(p['plays'] for p in per_song)
@@ -493,14 +1105,455 @@ def lyrics_wordcloud():
         'stats': {
             'songs_considered': len(per_song), 'lyrics_found': len(found),
             'coverage_by_plays': round(100 * found_plays / total_plays, 1) if total_plays else 0.0,
-            'total_words_counted': sum(counts.values()), 'unique_words': len(counts),
+            'total_words_counted': counts.total(), 'unique_words': len(counts),
+            'aggregation': {'mode': WORDCLOUD_TOPK_MODE, 'max_error': counts.max_error},
+            'precomputed_songs': len(indexed[:MAX_INDEXED_SONGS]), 'live_songs': len(live[:MAX_LIVE_SONGS]),
         },
         'songs': sorted(per_song, key=lambda p: p['plays'], reverse=True),
     }
     with _WORDCLOUD_CACHE_LOCK:
         _WORDCLOUD_CACHE[cache_key] = result
+    if len(found) == len(per_song):
+        _wordcloud_disk_put(cache_key, result)
     return jsonify(result)
 
 
+
+# ---------------------------------------------------------------------------
+# Listening-history query endpoints
+#
+# Serve small, already-aggregated slices of spotify-trends/ so a client does
+# not have to download monthly_trends.json and every top_songs shard to draw
+# one chart. The files are indexed in memory once (and re-indexed when any
+# of them changes on disk); per-month rows are kept in order with prefix sums,
+# so a date-range total is two lookups and a range top-N merges at most one
+# small Counter per month. Responses carry an ETag, Cache-Control and gzip.
+#
+# A month's track/artist counts come from the play log (playlog/, see
+# play_log.py) when it holds every play monthly_trends counts for that month;
+# otherwise from the top_songs shards, which only keep each month's top rows.
+# /listening/top is marked approximate when any month in range took the
+# shard path and its rows don't add up to the month's play count.
+# ---------------------------------------------------------------------------
+LISTENING_CACHE_SECONDS = int(os.environ.get('LISTENING_CACHE_SECONDS', 3600))
+LISTENING_MAX_LIMIT = 100
+_LISTENING_RESPONSES_MAX = 256
+_YM_RE = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+PLAYLOG_DIR = os.path.join(SPOTIFY_DATA_DIR, 'playlog')
+_PLAYLOG_COLUMNS = {'ts.i64': 8, 'track.i32': 4, 'artist.i32': 4, 'ms.i32': 4, 'skip.u8': 1}
+
+_LISTENING_INDEX: dict[str, Any] | None = None
+_LISTENING_LOCK = Lock()
+_LISTENING_RESPONSES: dict[tuple, tuple[str, bytes, bytes]] = {}
+
+
+def _listening_sources() -> list[str]:
+    paths = [os.path.join(SPOTIFY_DATA_DIR, n) for n in ('monthly_trends.json', 'basic_stats.json')]
+    shards_dir = os.path.join(SPOTIFY_DATA_DIR, 'top_songs')
+    try:
+        paths += sorted(os.path.join(shards_dir, n) for n in os.listdir(shards_dir)
+                        if n.endswith('.json') and n != 'manifest.json')
+    except OSError:
+        pass
+    return paths
+
+
+def _playlog_sources() -> list[str]:
+    try:
+        months = sorted(d for d in os.listdir(PLAYLOG_DIR) if _YM_RE.match(d))
+    except OSError:
+        return []
+    paths = [os.path.join(PLAYLOG_DIR, n) for n in ('tracks.json', 'artists.json')]
+    for m in months:
+        paths += [os.path.join(PLAYLOG_DIR, m, c) for c in _PLAYLOG_COLUMNS]
+    return paths
+
+
+def _read_i32(path: str, n: int) -> array:
+    a = array('i')
+    with open(path, 'rb') as f:
+        a.frombytes(f.read(n * 4))
+    if sys.byteorder == 'big':
+        a.byteswap()
+    return a
+
+
+def _playlog_month(ym: str, tracks: list, artists: list) -> tuple[Counter, Counter, int] | None:
+    """Exact (track, artist) and artist counts for one play-log month, plus its play count.
+
+    Columns can be torn by a crash mid-append; like play_log.read_month, only
+    the shortest common prefix is read.
+    """
+    month_dir = os.path.join(PLAYLOG_DIR, ym)
+    try:
+        n = min(os.path.getsize(os.path.join(month_dir, c)) // size for c, size in _PLAYLOG_COLUMNS.items())
+        track_ids = _read_i32(os.path.join(month_dir, 'track.i32'), n)
+        artist_ids = _read_i32(os.path.join(month_dir, 'artist.i32'), n)
+        song_counts = Counter()
+        for t, c in Counter(track_ids).items():
+            _uri, name, artist = tracks[t]
+            song_counts[(name, artist)] += c
+        return song_counts, Counter({artists[a]: c for a, c in Counter(artist_ids).items()}), n
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _listening_signature(paths: list[str]) -> str:
+    parts = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            parts.append(f'{os.path.basename(p)}:{st.st_mtime_ns}:{st.st_size}')
+        except OSError:
+            parts.append(f'{os.path.basename(p)}:-')
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def _read_json(path: str, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        log.warning('listening index: cannot read %s: %s', path, e)
+        return default
+
+
+def _build_listening_index(paths: list[str], signature: str) -> dict[str, Any]:
+    monthly = sorted(_read_json(paths[0], []), key=lambda m: m['year_month'])
+    stats = _read_json(paths[1], {})
+
+    songs: dict[str, Counter] = {}
+    for path in paths[2:]:
+        shard = _read_json(path, {})
+        strings = shard.get('strings') or []
+        for period, rows in (shard.get('periods') or {}).items():
+            month = songs.setdefault(period, Counter())
+            for t, a, _u, plays, _m in rows:
+                month[(strings[t], strings[a])] += plays
+
+    log_months, log_tracks, log_artists = set(), [], []
+    if os.path.isdir(PLAYLOG_DIR):
+        log_months = {d for d in os.listdir(PLAYLOG_DIR) if _YM_RE.match(d)}
+        log_tracks = _read_json(os.path.join(PLAYLOG_DIR, 'tracks.json'), [])
+        log_artists = _read_json(os.path.join(PLAYLOG_DIR, 'artists.json'), [])
+
+    months, plays, minutes, skips, partial = [], [0], [0.0], [0.0], [0]
+    artists: list[Counter] = []
+    tracks: list[Counter] = []
+    from_log = 0
+    for m in monthly:
+        ym = m['year_month']
+        months.append(ym)
+        plays.append(plays[-1] + m['play_count'])
+        minutes.append(minutes[-1] + m['minutes_played'])
+        skips.append(skips[-1] + m['skip_rate'] * m['play_count'] / 100.0)
+        logged = _playlog_month(ym, log_tracks, log_artists) if ym in log_months else None
+        if logged is not None and logged[2] == m['play_count']:
+            tracks.append(logged[0])
+            artists.append(logged[1])
+            partial.append(partial[-1])
+            from_log += 1
+            continue
+        # Shard rows are a lower bound on an artist's month; monthly_trends'
+        # own top-5 is exact where it has the artist, so take the larger.
+        month_songs = songs.get(ym, Counter())
+        a = Counter()
+        for (_t, artist), n in month_songs.items():
+            a[artist] += n
+        for artist, n in (m.get('top_artists') or {}).items():
+            a[artist] = max(a[artist], n)
+        artists.append(a)
+        tracks.append(month_songs or Counter({(t, ''): n for t, n in (m.get('top_tracks') or {}).items()}))
+        partial.append(partial[-1] + (sum(month_songs.values()) != m['play_count']))
+
+    log.info('listening index: %d months (%d from the play log), %d song periods (%s)',
+             len(months), from_log, len(songs), signature)
+    return {'signature': signature, 'months': months, 'plays': plays, 'minutes': minutes,
+            'skips': skips, 'partial': partial, 'artists': artists, 'tracks': tracks, 'stats': stats}
+
+
+def _listening_index() -> dict[str, Any]:
+    global _LISTENING_INDEX
+    paths = _listening_sources()
+    signature = _listening_signature(paths + _playlog_sources())
+    with _LISTENING_LOCK:
+        if _LISTENING_INDEX is None or _LISTENING_INDEX['signature'] != signature:
+            _LISTENING_INDEX = _build_listening_index(paths, signature)
+            _LISTENING_RESPONSES.clear()
+        return _LISTENING_INDEX
+
+
+def _month_range(idx: dict[str, Any]) -> tuple[int, int, str, str]:
+    """Resolve ?start=&end= (inclusive YYYY-MM) to a slice of idx['months']."""
+    months = idx['months']
+    start = request.args.get('start') or (months[0] if months else '')
+    end = request.args.get('end') or (months[-1] if months else '')
+    for name, value in (('start', start), ('end', end)):
+        if value and not _YM_RE.match(value):
+            raise ValueError(f'{name} must be YYYY-MM')
+    lo = bisect.bisect_left(months, start)
+    hi = bisect.bisect_right(months, end)
+    return lo, max(lo, hi), start, end
+
+
+def _range_totals(idx: dict[str, Any], lo: int, hi: int) -> dict:
+    plays = idx['plays'][hi] - idx['plays'][lo]
+    skips = idx['skips'][hi] - idx['skips'][lo]
+    return {
+        'play_count': plays,
+        'minutes_played': round(idx['minutes'][hi] - idx['minutes'][lo], 2),
+        'skip_rate': round(100.0 * skips / plays, 2) if plays else 0.0,
+        'months': hi - lo,
+    }
+
+
+def _limit_arg(default: int = 10) -> int:
+    try:
+        return max(1, min(int(request.args.get('limit', default)), LISTENING_MAX_LIMIT))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+
+
+def _cached_response(payload_fn) -> Response:
+    """Serve payload_fn()'s JSON with ETag/Cache-Control/gzip, memoized per query."""
+    try:
+        idx = _listening_index()
+        key = (request.path, tuple(sorted(request.args.items())), idx['signature'])
+        hit = _LISTENING_RESPONSES.get(key)
+        if hit is None:
+            body = json.dumps(payload_fn(idx), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            etag = hashlib.sha256(body).hexdigest()[:32]
+            hit = (etag, body, gzip.compress(body, compresslevel=6))
+            with _LISTENING_LOCK:
+                if len(_LISTENING_RESPONSES) >= _LISTENING_RESPONSES_MAX:
+                    _LISTENING_RESPONSES.pop(next(iter(_LISTENING_RESPONSES)))
+                _LISTENING_RESPONSES[key] = hit
+    except ValueError as e:
+        return jsonify({'ok': False, 'error': str(e)}), 400
+
+    etag, body, gz = hit
+    headers = {
+        'ETag': f'"{etag}"',
+        'Cache-Control': f'public, max-age={LISTENING_CACHE_SECONDS}',
+        'Vary': 'Accept-Encoding',
+    }
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+    if 'gzip' in (request.headers.get('Accept-Encoding') or '') and len(gz) < len(body):
+        headers['Content-Encoding'] = 'gzip'
+        body = gz
+    return Response(body, status=200, mimetype='application/json', headers=headers)
+
+
+@app.route('/listening/summary', methods=['GET'])
+def listening_summary():
+    def build(idx):
+        stats = idx['stats']
+        return {
+            'ok': True,
+            'first_month': idx['months'][0] if idx['months'] else None,
+            'last_month': idx['months'][-1] if idx['months'] else None,
+            **{k: stats.get(k) for k in ('total_plays', 'total_hours', 'unique_tracks',
+                                         'unique_artists', 'date_range', 'avg_skip_rate')},
+        }
+    return _cached_response(build)
+
+
+@app.route('/listening/series', methods=['GET'])
+def listening_series():
+    """Per-month plays, minutes and skip rate for ?start=&end=."""
+    def build(idx):
+        lo, hi, start, end = _month_range(idx)
+        rows = []
+        for i in range(lo, hi):
+            plays = idx['plays'][i + 1] - idx['plays'][i]
+            skips = idx['skips'][i + 1] - idx['skips'][i]
+            rows.append([idx['months'][i], plays, round(idx['minutes'][i + 1] - idx['minutes'][i], 2),
+                         round(100.0 * skips / plays, 2) if plays else 0.0])
+        return {'ok': True, 'start': start, 'end': end,
+                'columns': ['year_month', 'play_count', 'minutes_played', 'skip_rate'],
+                'rows': rows, 'totals': _range_totals(idx, lo, hi)}
+    return _cached_response(build)
+
+
+@app.route('/listening/top', methods=['GET'])
+def listening_top():
+    """Top tracks or artists (?kind=tracks|artists) summed over ?start=&end=."""
+    def build(idx):
+        kind = request.args.get('kind', 'tracks')
+        if kind not in ('tracks', 'artists'):
+            raise ValueError('kind must be tracks or artists')
+        lo, hi, start, end = _month_range(idx)
+        limit = _limit_arg()
+        total: Counter = Counter()
+        for c in idx[kind][lo:hi]:
+            total.update(c)
+        top = heapq.nlargest(limit, total.items(), key=lambda kv: (kv[1], kv[0]))
+        if kind == 'tracks':
+            items = [{'track': t, 'artist': a, 'play_count': n} for (t, a), n in top]
+        else:
+            items = [{'artist': a, 'play_count': n} for a, n in top]
+        return {'ok': True, 'kind': kind, 'start': start, 'end': end, 'items': items,
+                'totals': _range_totals(idx, lo, hi),
+                'approximate': idx['partial'][hi] > idx['partial'][lo]}
+    return _cached_response(build)
+
+
+
+# ---------------------------------------------------------------------------
+# Cache snapshots — on the free Render plan the service sleeps when idle, and
+# the first visitor after a wake-up used to pay for a full scrape + scoring.
+# The scrape, scored-post and lyrics caches are written to SNAPSHOT_PATH every
+# SNAPSHOT_INTERVAL seconds and at exit, and restored at import (before
+# gunicorn's --preload fork, so every worker starts warm). Restored scrape
+# entries keep their original timestamps; _scheduled_fetch serves them for
+# up to SCRAPE_WARM_MAX_AGE while refreshing in the background. If the
+# snapshot has no entry for the nightly latest_report.json's query, that
+# query's topic is seeded from the report's posts. Every worker saves into the same
+# file: under an flock on SNAPSHOT_PATH.lock it merges its caches with what
+# is already on disk (newest scrape entry per topic/source wins), so one
+# worker's exit does not drop what another worker fetched. Word clouds
+# already persist under WORDCLOUD_CACHE_DIR and are not duplicated here.
+# ---------------------------------------------------------------------------
+SNAPSHOT_PATH = os.path.join(CACHE_DIR, 'snapshot.json')
+SNAPSHOT_INTERVAL = int(os.environ.get('SNAPSHOT_INTERVAL', 300))
+SNAPSHOT_LYRICS_MAX = 300
+NIGHTLY_REPORT_PATH = os.path.join(BASE_DIR, 'latest_report.json')
+
+_snapshot_started = False
+_snapshot_lock = Lock()
+_restored_fingerprint: str | None = None
+
+
+def _snapshot_payload() -> dict:
+    with _scrape_lock:
+        scrape = [{'topic': t, 'source': src, 'ts': e['ts'], 'posts': e['posts']}
+                  for (t, src), e in _scrape_cache.items()]
+    with _scored_lock:
+        scored = [[t, url, v] for (t, url), v in _scored_cache.items()]
+    with _LYRICS_LOCK:
+        # Misses (None) stay per process: a lyrics.ovh failure may be temporary.
+        lyrics = [(k, v) for k, v in _LYRICS_CACHE.items() if v is not None][-SNAPSHOT_LYRICS_MAX:]
+    return {'version': 1, 'scrape': scrape, 'scored': scored, 'lyrics': lyrics}
+
+
+def _fingerprint(payload: dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _read_snapshot() -> dict:
+    try:
+        with open(SNAPSHOT_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _merge_snapshots(disk: dict, ours: dict) -> dict:
+    """`ours` merged over the snapshot another worker left on disk."""
+    scrape: dict[tuple[str, str], dict] = {}
+    for e in (disk.get('scrape') or []) + ours['scrape']:
+        key = (e['topic'], e['source'])
+        if key not in scrape or e['ts'] >= scrape[key]['ts']:
+            scrape[key] = e
+    scored = {(t, url): v for t, url, v in disk.get('scored') or []}
+    scored.update(((t, url), v) for t, url, v in ours['scored'])
+    lyrics = {k: v for k, v in disk.get('lyrics') or [] if v is not None}
+    lyrics.update(ours['lyrics'])
+    return dict(ours, scrape=list(scrape.values()),
+                scored=[[t, url, v] for (t, url), v in scored.items()][-SCORED_CACHE_MAX:],
+                lyrics=list(lyrics.items())[-SNAPSHOT_LYRICS_MAX:])
+
+
+def save_snapshot() -> bool:
+    """Merge the caches into SNAPSHOT_PATH; skipped when nothing changed since boot or the last save."""
+    global _restored_fingerprint
+    payload = _snapshot_payload()
+    fp = _fingerprint(payload)
+    # A process that never changed what it restored (e.g. the gunicorn master
+    # exiting after its workers) has nothing to add to a worker's snapshot.
+    if fp == _restored_fingerprint:
+        return False
+    try:
+        os.makedirs(os.path.dirname(SNAPSHOT_PATH), exist_ok=True)
+        with open(f'{SNAPSHOT_PATH}.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                merged = _merge_snapshots(_read_snapshot(), payload)
+                _atomic_write_json(SNAPSHOT_PATH, dict(merged, saved_at=time.time()))
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+    except OSError as e:
+        log.warning('snapshot write failed: %s', e)
+        return False
+    _restored_fingerprint = fp
+    log.info('snapshot saved: %d scrape entries, %d scores, %d lyrics',
+             len(payload['scrape']), len(payload['scored']), len(payload['lyrics']))
+    return True
+
+
+def _seed_from_nightly_report() -> int:
+    """Seed the scrape entries of the report's query from scrape_and_analyze.py's posts."""
+    try:
+        with open(NIGHTLY_REPORT_PATH, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        ts = datetime.fromisoformat(report['timestamp']).replace(tzinfo=timezone.utc).timestamp()
+        query = report.get('query')
+        # The posts answer the report's own query; without one, they can't be keyed.
+        topic = normalize_topic(query) if query else None
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return 0
+    if topic is None:
+        return 0
+    seeded = 0
+    for source in ('reddit', 'hn'):
+        if (topic, source) in _scrape_cache:
+            continue
+        posts = [p for p in report.get('posts') or [] if p.get('source') == source]
+        if posts:
+            _cache_put(topic, source, posts, ts=ts, restored=True)
+            seeded += 1
+    return seeded
+
+
+def restore_snapshot() -> None:
+    global _restored_fingerprint
+    snap = _read_snapshot()
+    for e in snap.get('scrape') or []:
+        _cache_put(e['topic'], e['source'], e['posts'], ts=e['ts'], restored=True)
+    with _scored_lock:
+        for t, url, v in snap.get('scored') or []:
+            _scored_cache[(t, url)] = v
+    with _LYRICS_LOCK:
+        for key, text in snap.get('lyrics') or []:
+            if text is not None:  # snapshots from before misses were left out
+                _LYRICS_CACHE.setdefault(key, text)
+    seeded = _seed_from_nightly_report()
+    _restored_fingerprint = _fingerprint(_snapshot_payload())
+    log.info('snapshot restored: %d scrape entries (+%d from nightly report), %d scores, %d lyrics',
+             len(snap.get('scrape') or []), seeded, len(snap.get('scored') or []), len(snap.get('lyrics') or []))
+
+
+def _snapshot_loop() -> None:
+    while True:
+        time.sleep(SNAPSHOT_INTERVAL)
+        save_snapshot()
+
+
+@app.before_request
+def _start_snapshots() -> None:
+    global _snapshot_started
+    if _snapshot_started or SNAPSHOT_INTERVAL <= 0:
+        return
+    with _snapshot_lock:
+        if not _snapshot_started:
+            _snapshot_started = True
+            Thread(target=_snapshot_loop, name='cache-snapshot', daemon=True).start()
+
+
+restore_snapshot()
+atexit.register(save_snapshot)
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 8000)), debug=False)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Startup-time budget for the API.
+
+Boots app.py in a fresh interpreter (cold, like a gunicorn worker after a
+deploy or an idle spin-down) and measures:
+
+  - per-module import time, from `python -X importtime -c "import app"`
+  - time from interpreter start to the first /health response
+
+and checks that the lazily loaded integrations (gTTS, the Brevo SDK) are
+still unimported after /health. Exits 1 if either check fails, so it can
+gate a deploy.
+
+Usage:
+    python bench_startup.py [--budget-ms 1500] [--runs 3] [--top 15]
+
+STARTUP_BUDGET_MS overrides the default budget.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUDGET_MS = 1500
+LAZY_MODULES = ('gtts', 'sib_api_v3_sdk')
+
+_BOOT = r'''
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t_import = time.perf_counter()
+resp = app.app.test_client().get('/health')
+t_health = time.perf_counter()
+print(json.dumps({
+    'import_ms': (t_import - t0) * 1000,
+    'health_ms': (t_health - t0) * 1000,
+    'status': resp.status_code,
+    'lazy_loaded': [m for m in %r if m in sys.modules],
+}))
+'''
+
+
+def _env(tmp: str) -> dict:
+    # Keep the snapshot, scrape state and history out of the real tree, and
+    # stop the background threads from doing network work during the run.
+    env = dict(os.environ, CACHE_DIR=os.path.join(tmp, 'cache'),
+               SENTIMENT_HISTORY_DIR=os.path.join(tmp, 'history'),
+               SCRAPE_PREFETCH_TOPICS='0', PYTHONDONTWRITEBYTECODE='1')
+    env['PYTHONPATH'] = HERE + os.pathsep + env.get('PYTHONPATH', '')
+    return env
+
+
+def import_times(env: dict, top: int) -> list[tuple[int, str]]:
+    """(cumulative microseconds, module) for the slowest imports made by app.py itself."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                          cwd=HERE, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr[-2000:])
+    # "import time: self [us] | cumulative | imported package". A module's
+    # line follows the lines of everything it imported, indented two spaces
+    # deeper, so app's direct imports are the depth-1 lines just before it.
+    children: list[tuple[int, str]] = []
+    rows: list[tuple[int, str]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _self_us, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative), name.strip()))
+        elif depth == 0:
+            if name.strip() == 'app':
+                rows = [(int(cumulative), 'app (total)')] + children
+            children = []
+    return sorted(rows, reverse=True)[:top]
+
+
+def boot(env: dict) -> dict:
+    proc = subprocess.run([sys.executable, '-c', _BOOT % (LAZY_MODULES,)],
+                          cwd=HERE, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--budget-ms', type=float,
+                    default=float(os.environ.get('STARTUP_BUDGET_MS', DEFAULT_BUDGET_MS)))
+    ap.add_argument('--runs', type=int, default=3)
+    ap.add_argument('--top', type=int, default=15)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _env(tmp)
+        print('slowest imports by app.py (cumulative):')
+        for us, name in import_times(env, args.top):
+            print(f'  {us / 1000:8.1f}ms  {name}')
+        runs = [boot(env) for _ in range(args.runs)]
+
+    best = min(runs, key=lambda r: r['health_ms'])
+    print(f"import app: {best['import_ms']:.0f}ms  first /health: {best['health_ms']:.0f}ms "
+          f"(best of {args.runs}; budget {args.budget_ms:.0f}ms)")
+    ok = True
+    if best['status'] != 200:
+        print(f"FAIL: /health returned {best['status']}")
+        ok = False
+    if best['health_ms'] > args.budget_ms:
+        print(f"FAIL: startup {best['health_ms']:.0f}ms is over budget")
+        ok = False
+    loaded = sorted({m for r in runs for m in r['lazy_loaded']})
+    if loaded:
+        print(f"FAIL: imported at boot but should load on first use: {', '.join(loaded)}")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
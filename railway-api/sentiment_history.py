@@ -0,0 +1,274 @@
+"""
+Append-only sentiment time series.
+
+Every report (from the nightly scrape_and_analyze.py run or a fresh scrape
+in the API) appends one point per topic:
+
+    {"ts": 1760832000, "topic": "nvidia gpu", "scorer": "openai", "posts": 42,
+     "avg": 57.3, "sources": {"reddit": {"posts": 25, "avg": 55.1},
+                              "hn": {"posts": 17, "avg": 60.5}}}
+
+Topics are keyed by normalize_topic(), shared by both writers. `scorer`
+names what produced the scores ('lexicon' or 'openai'); the two use
+different scales, so they are never averaged together.
+
+Points live in HISTORY_DIR/raw.jsonl for RAW_RETENTION_DAYS. Older ones are
+folded into HISTORY_DIR/daily.jsonl, one post-weighted rollup per topic,
+scorer and UTC day (with the day's min/max average and report count), when an append
+finds the oldest raw point past retention. Both files are plain JSON lines,
+so the nightly Action can commit them and diffs stay readable.
+
+HistoryIndex keeps both files in memory as per-topic, per-scorer lists
+sorted by ts and answers range queries with bisect, so a query costs
+O(log n) plus the points it returns. It reloads itself when either file
+changes on disk.
+"""
+from __future__ import annotations
+
+import bisect
+import fcntl
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Any
+
+HISTORY_DIR = os.environ.get('SENTIMENT_HISTORY_DIR',
+                             os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history'))
+RAW_RETENTION_DAYS = 30
+MIN_INTERVAL_SECONDS = 300  # at most one point per topic and scorer per scrape-cache TTL
+DAY = 86_400
+_TOPIC_RE = re.compile(r'^[a-z0-9][a-z0-9 .+#-]{0,47}$')
+
+
+def normalize_topic(raw: str) -> str:
+    """Canonical key for a topic (lowercase, single spaces); ValueError if it isn't usable."""
+    topic = ' '.join((raw or '').lower().split())
+    if not _TOPIC_RE.match(topic):
+        raise ValueError('topic must be 1-48 letters, digits, spaces or .+#-')
+    return topic
+
+
+def _raw_path() -> str:
+    return os.path.join(HISTORY_DIR, 'raw.jsonl')
+
+
+def _daily_path() -> str:
+    return os.path.join(HISTORY_DIR, 'daily.jsonl')
+
+
+@contextmanager
+def _locked():
+    """Exclusive lock across processes (gunicorn workers, the nightly script)."""
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    with open(os.path.join(HISTORY_DIR, '.lock'), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read_jsonl(path: str) -> list[dict]:
+    rows = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        rows.append(json.loads(line))
+                    except ValueError:
+                        continue  # a torn last line from a crash mid-append
+    except OSError:
+        pass
+    return rows
+
+
+def _write_jsonl(path: str, rows: list[dict]) -> None:
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        for r in rows:
+            f.write(json.dumps(r, ensure_ascii=False, separators=(',', ':')) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def point_from_posts(topic: str, posts: list[dict], scorer: str, ts: float | None = None) -> dict:
+    """Build a history point from posts (each with 'source' and 'sentiment') scored by `scorer`."""
+    by_source: dict[str, list[float]] = {}
+    for p in posts:
+        by_source.setdefault(p['source'], []).append(float(p['sentiment']))
+    scores = [s for v in by_source.values() for s in v]
+    return {
+        'ts': int(ts if ts is not None else time.time()),
+        'topic': topic,
+        'scorer': scorer,
+        'posts': len(scores),
+        'avg': round(sum(scores) / len(scores), 2) if scores else None,
+        'sources': {src: {'posts': len(v), 'avg': round(sum(v) / len(v), 2)}
+                    for src, v in sorted(by_source.items())},
+    }
+
+
+def append(point: dict) -> bool:
+    """Append a point; False if its topic and scorer already have one within MIN_INTERVAL_SECONDS."""
+    with _locked():
+        last = _last_ts(point['topic'], point.get('scorer'))
+        if last is not None and point['ts'] - last < MIN_INTERVAL_SECONDS:
+            return False
+        with open(_raw_path(), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(point, ensure_ascii=False, separators=(',', ':')) + '\n')
+        _compact_if_due(point['ts'])
+    return True
+
+
+def _last_ts(topic: str, scorer: str | None) -> int | None:
+    # Scan backwards from the end; recent points are what matter.
+    try:
+        with open(_raw_path(), 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 64 * 1024))
+            tail = f.read().decode('utf-8', errors='ignore').splitlines()
+    except OSError:
+        return None
+    for line in reversed(tail):
+        try:
+            row = json.loads(line)
+        except ValueError:
+            continue
+        if row.get('topic') == topic and row.get('scorer') == scorer:
+            return int(row['ts'])
+    return None
+
+
+def _fold(rollup: dict | None, p: dict, weight_key: str = 'posts') -> dict:
+    """Merge point (or rollup) p into a daily rollup."""
+    reports = p.get('reports', 1)
+    if rollup is None:
+        rollup = {'ts': p['ts'] - p['ts'] % DAY, 'topic': p['topic'], 'scorer': p.get('scorer'),
+                  'reports': 0, 'posts': 0, 'avg': None, 'min': None, 'max': None, 'sources': {}}
+
+    def wavg(a, na, b, nb):
+        if a is None or not na:
+            return b
+        if b is None or not nb:
+            return a
+        return round((a * na + b * nb) / (na + nb), 2)
+
+    rollup['avg'] = wavg(rollup['avg'], rollup['posts'], p.get('avg'), p.get('posts', 0))
+    for bound, pick in (('min', min), ('max', max)):
+        v = p.get(bound, p.get('avg'))
+        if v is not None:
+            rollup[bound] = v if rollup[bound] is None else pick(rollup[bound], v)
+    for src, sv in (p.get('sources') or {}).items():
+        cur = rollup['sources'].setdefault(src, {'posts': 0, 'avg': None})
+        cur['avg'] = wavg(cur['avg'], cur['posts'], sv.get('avg'), sv.get('posts', 0))
+        cur['posts'] += sv.get('posts', 0)
+    rollup['posts'] += p.get('posts', 0)
+    rollup['reports'] += reports
+    return rollup
+
+
+def _compact_if_due(now: int) -> int:
+    """Roll raw points older than the retention window into daily.jsonl."""
+    cutoff = now - RAW_RETENTION_DAYS * DAY
+    cutoff -= cutoff % DAY  # only whole days leave raw
+    try:
+        with open(_raw_path(), 'r', encoding='utf-8') as f:
+            first = json.loads(f.readline() or 'null')
+    except (OSError, ValueError):
+        first = None
+    if not first or first['ts'] >= cutoff:
+        return 0
+    raw = _read_jsonl(_raw_path())
+    old = [p for p in raw if p['ts'] < cutoff]
+    keep = [p for p in raw if p['ts'] >= cutoff]
+    daily = {(r['topic'], r.get('scorer'), r['ts']): r for r in _read_jsonl(_daily_path())}
+    for p in old:
+        key = (p['topic'], p.get('scorer'), p['ts'] - p['ts'] % DAY)
+        daily[key] = _fold(daily.get(key), p)
+    _write_jsonl(_daily_path(), sorted(daily.values(),
+                                       key=lambda r: (r['ts'], r['topic'], r.get('scorer') or '')))
+    _write_jsonl(_raw_path(), keep)
+    return len(old)
+
+
+def parse_time(value: str | None, default: int) -> int:
+    """Epoch seconds from an epoch number, YYYY-MM-DD or ISO-8601 datetime."""
+    if not value:
+        return default
+    if value.isdigit():
+        return int(value)
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+class HistoryIndex:
+    def __init__(self):
+        self._lock = Lock()
+        self._signature: tuple | None = None
+        # (topic, scorer) -> resolution -> (sorted ts, rows)
+        self._series: dict[tuple[str, str | None], dict[str, tuple[list[int], list[dict]]]] = {}
+
+    def _current_signature(self) -> tuple:
+        sig = []
+        for path in (_raw_path(), _daily_path()):
+            try:
+                st = os.stat(path)
+                sig.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                sig.append(None)
+        return tuple(sig)
+
+    def _refresh(self) -> None:
+        sig = self._current_signature()
+        if sig == self._signature:
+            return
+        series: dict[tuple[str, str | None], dict[str, tuple[list[int], list[dict]]]] = {}
+        for resolution, path in (('raw', _raw_path()), ('daily', _daily_path())):
+            by_key: dict[tuple[str, str | None], list[dict]] = {}
+            for r in _read_jsonl(path):
+                by_key.setdefault((r['topic'], r.get('scorer')), []).append(r)
+            for key, rows in by_key.items():
+                rows.sort(key=lambda r: r['ts'])
+                series.setdefault(key, {})[resolution] = ([r['ts'] for r in rows], rows)
+        self._series, self._signature = series, sig
+
+    def topics(self) -> list[str]:
+        with self._lock:
+            self._refresh()
+            return sorted({topic for topic, _ in self._series})
+
+    def query(self, topic: str, start: int, end: int, resolution: str = 'auto',
+              scorer: str | None = None) -> dict[str, Any]:
+        """Points for `topic` with start <= ts < end, optionally from one scorer only.
+
+        Each scorer is its own series. 'auto' returns a series' daily rollups
+        for the part of the range before its oldest raw point and raw points
+        after it; 'raw'/'daily' pick one.
+        """
+        with self._lock:
+            self._refresh()
+            available = {key[1]: s for key, s in self._series.items() if key[0] == topic}
+        matching = [s for sc, s in available.items() if scorer is None or sc == scorer]
+        points: list[dict] = []
+        for s in matching:
+            raw_ts, raw_rows = s.get('raw', ([], []))
+            daily_ts, daily_rows = s.get('daily', ([], []))
+            if resolution in ('auto', 'daily'):
+                daily_end = end if resolution == 'daily' or not raw_ts else min(end, raw_ts[0] - raw_ts[0] % DAY)
+                lo, hi = bisect.bisect_left(daily_ts, start), bisect.bisect_left(daily_ts, daily_end)
+                points += [dict(r, resolution='daily') for r in daily_rows[lo:hi]]
+            if resolution in ('auto', 'raw'):
+                lo, hi = bisect.bisect_left(raw_ts, start), bisect.bisect_left(raw_ts, end)
+                points += [dict(r, resolution='raw') for r in raw_rows[lo:hi]]
+        points.sort(key=lambda r: r['ts'])
+        return {'topic': topic, 'start': start, 'end': end, 'scorer': scorer,
+                'scorers': sorted(sc for sc in available if sc), 'points': points}
@@ -0,0 +1,107 @@
+"""
+Weighted word tallies for the lyric word clouds.
+
+Shared by the API's /lyrics-wordcloud and the offline update_wordcloud.py
+(which imports it from railway-api/, like scrape_and_analyze.py does with
+sentiment_history). Both tallies have the same add / most_common / total /
+max_error surface:
+
+  ExactTally   a Counter; one entry per distinct word.
+  SpaceSaving  a fixed-size heavy-hitters summary. Holds at most `capacity`
+               counters however many distinct words are added; every
+               reported count overestimates by at most max_error.
+
+Only the cross-song tally is bounded: callers still see each song's bag in
+full while adding it.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+from collections import Counter
+
+DEFAULT_ERROR = 0.0005
+
+
+class ExactTally(Counter):
+    """Counter with the same add/most_common/max_error surface as SpaceSaving."""
+
+    def add(self, item: str, weight: int = 1) -> None:
+        self[item] += weight
+
+    @property
+    def max_error(self) -> int:
+        return 0
+
+
+class SpaceSaving:
+    """Weighted Space-Saving heavy-hitters summary with a fixed number of counters.
+
+    Every reported count overestimates the true count by at most
+    total()/capacity, and any word whose true count exceeds that bound is
+    guaranteed to be monitored. Pass `error` (e.g. 0.0005) instead of
+    `capacity` to size the summary from the error bound.
+    """
+
+    def __init__(self, capacity: int | None = None, error: float | None = None):
+        if capacity is None:
+            capacity = int(math.ceil(1.0 / (error or DEFAULT_ERROR)))
+        self.capacity = max(int(capacity), 1)
+        self.counts: dict[str, int] = {}
+        self._heap: list[tuple[int, str]] = []  # (count, item); entries may lag behind counts
+        self._total = 0
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def total(self) -> int:
+        return self._total
+
+    def add(self, item: str, weight: int = 1) -> None:
+        self._total += weight
+        if item in self.counts:
+            self.counts[item] += weight
+            return
+        floor = 0
+        if len(self.counts) >= self.capacity:
+            floor, victim = self._pop_min()
+            del self.counts[victim]
+        self.counts[item] = floor + weight
+        heapq.heappush(self._heap, (self.counts[item], item))
+
+    def _pop_min(self) -> tuple[int, str]:
+        # Increments don't touch the heap, so an entry is only a lower bound;
+        # re-queue it at its current count until the top entry is exact.
+        while True:
+            c, item = heapq.heappop(self._heap)
+            current = self.counts[item]
+            if current == c:
+                return c, item
+            heapq.heappush(self._heap, (current, item))
+
+    @property
+    def max_error(self) -> int:
+        """Upper bound on how far any reported count can be too high."""
+        if len(self.counts) < self.capacity:
+            return 0
+        return self._total // self.capacity
+
+    def most_common(self, n: int | None = None) -> list[tuple[str, int]]:
+        ranked = sorted(self.counts.items(), key=lambda x: -x[1])
+        return ranked if n is None else ranked[:n]
+
+
+def new_word_tally(mode: str, error: float = DEFAULT_ERROR) -> ExactTally | SpaceSaving:
+    """SpaceSaving for mode 'bounded', otherwise ExactTally."""
+    return SpaceSaving(error=error) if mode == 'bounded' else ExactTally()
+
+
+def compare_topk(exact: ExactTally, approx: SpaceSaving, k: int) -> dict[str, int]:
+    """Diff the top-k of an ExactTally against a SpaceSaving summary."""
+    want = exact.most_common(k)
+    got = dict(approx.most_common(k))
+    missing = [w for w, _ in want if w not in got]
+    abs_err = [abs(got[w] - c) for w, c in want if w in got]
+    return {'k': k, 'missing': len(missing),
+            'max_abs_error': max(abs_err) if abs_err else 0,
+            'bound': approx.max_error}
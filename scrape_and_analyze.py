@@ -2,17 +2,40 @@
 """
 Daily Reddit & Hacker News Sentiment Scraper
 Runs via GitHub Actions at 6 AM UTC daily
+
+Usage:
+    python scrape_and_analyze.py                 # default topic (NVIDIA)
+    python scrape_and_analyze.py --topic "AMD"   # any other topic
+
+The default topic writes railway-api/latest_report.json; other topics write
+railway-api/latest_report_<topic-slug>.json alongside it.
 """
 
+import argparse
 import os
+import re
+import sys
 import json
 import requests
 from datetime import datetime
 from openai import OpenAI
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'railway-api'))
+import sentiment_history  # noqa: E402
+
 # Initialize OpenAI client
 client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
 
+DEFAULT_TOPIC = os.environ.get('SENTIMENT_TOPIC', 'NVIDIA')
+
+
+def report_path(topic):
+    """Where a topic's report is written (the default keeps the original name)."""
+    if topic.lower() == DEFAULT_TOPIC.lower():
+        return 'railway-api/latest_report.json'
+    slug = re.sub(r'[^a-z0-9]+', '-', topic.lower()).strip('-')
+    return f'railway-api/latest_report_{slug}.json'
+
 def scrape_reddit(query="NVIDIA", limit=10):
     """Scrape recent posts from Reddit"""
     print(f"🔍 Scraping Reddit for '{query}'...")
@@ -81,7 +104,43 @@ def scrape_hackernews(query="NVIDIA", limit=10):
         print(f"❌ Hacker News scraping failed: {e}")
         return []
 
-def analyze_sentiment(posts):
+# Same word lists as the API's lexicon fallback, so nightly history points
+# are on the API's 0-100 scale.
+POSITIVE_WORDS = {'love', 'great', 'amazing', 'awesome', 'fantastic', 'incredible', 'best', 'excellent',
+                  'fast', 'smooth', 'impressive', 'solid', 'reliable', 'worth', 'happy', 'recommend',
+                  'beats', 'wins', 'upgrade'}
+NEGATIVE_WORDS = {'bad', 'terrible', 'awful', 'worst', 'broken', 'crash', 'crashes', 'fails', 'disappointed',
+                  'slow', 'overpriced', 'scam', 'hate', 'issue', 'issues', 'problem', 'problems', 'bug', 'bugs',
+                  'driver', 'overheat', 'overheats', 'expensive'}
+
+
+def lexicon_score(text):
+    """0-100 score from positive vs negative word counts (50 when neither appears)"""
+    words = re.findall(r"[a-z']+", (text or '').lower())
+    pos = sum(1 for w in words if w in POSITIVE_WORDS)
+    neg = sum(1 for w in words if w in NEGATIVE_WORDS)
+    if pos == 0 and neg == 0:
+        return 50.0
+    return round(100 * pos / max(pos + neg, 1), 1)
+
+
+def record_history(topic, posts):
+    """Append today's point to the sentiment time series (lexicon scores, keyed like the API's topics)"""
+    scored = [{'source': 'reddit' if p['source'] == 'Reddit' else 'hn',
+               'sentiment': lexicon_score(f"{p['title']} {p['text']}")} for p in posts]
+    if not scored:
+        return
+    try:
+        key = sentiment_history.normalize_topic(topic)
+    except ValueError as e:
+        print(f"⚠️ History point skipped: {e}")
+        return
+    point = sentiment_history.point_from_posts(key, scored, 'lexicon')
+    if sentiment_history.append(point):
+        print(f"📈 History point recorded: avg {point['avg']} over {point['posts']} posts")
+
+
+def analyze_sentiment(posts, topic=DEFAULT_TOPIC):
     """Use OpenAI to analyze sentiment of posts"""
     print(f"🤖 Analyzing sentiment with OpenAI...")
 
@@ -106,7 +165,7 @@ def analyze_sentiment(posts):
             messages=[
                 {
                     "role": "system",
-                    "content": "You are a sentiment analyst. Analyze the following social media posts about NVIDIA and provide: 1) Overall sentiment (positive/negative/neutral), 2) Key themes (3-5 bullet points), 3) Brief summary (2-3 sentences)."
+                    "content": f"You are a sentiment analyst. Analyze the following social media posts about {topic} and provide: 1) Overall sentiment (positive/negative/neutral), 2) Key themes (3-5 bullet points), 3) Brief summary (2-3 sentences)."
                 },
                 {
                     "role": "user",
@@ -146,24 +205,29 @@ def analyze_sentiment(posts):
 
 def main():
     """Main execution"""
+    parser = argparse.ArgumentParser(description='Scrape Reddit/HN and analyze sentiment for a topic')
+    parser.add_argument('--topic', default=DEFAULT_TOPIC)
+    topic = ' '.join(parser.parse_args().topic.split()) or DEFAULT_TOPIC
+
     print("=" * 60)
     print("🚀 Starting Daily Sentiment Scraper")
     print(f"⏰ Timestamp: {datetime.utcnow().isoformat()}")
+    print(f"🏷️ Topic: {topic}")
     print("=" * 60)
 
     # Scrape data
-    reddit_posts = scrape_reddit("NVIDIA", limit=10)
-    hn_posts = scrape_hackernews("NVIDIA", limit=10)
+    reddit_posts = scrape_reddit(topic, limit=10)
+    hn_posts = scrape_hackernews(topic, limit=10)
 
     all_posts = reddit_posts + hn_posts
 
     # Analyze sentiment
-    analysis = analyze_sentiment(all_posts)
+    analysis = analyze_sentiment(all_posts, topic)
 
     # Prepare report
     report = {
         'timestamp': datetime.utcnow().isoformat(),
-        'query': 'NVIDIA',
+        'query': topic,
         'total_posts': len(all_posts),
         'reddit_posts': len(reddit_posts),
         'hackernews_posts': len(hn_posts),
@@ -176,15 +240,30 @@ def main():
                 'url': p['url']
             }
             for p in all_posts[:5]  # Include top 5 posts
+        ],
+        # Full posts in the API's shape, so a cold-started API can serve them
+        # before its first live scrape (see restore_snapshot in app.py)
+        'posts': [
+            {
+                'source': 'reddit' if p['source'] == 'Reddit' else 'hn',
+                'title': (p['title'] or '').strip(),
+                'text': (p['text'] or '').strip()[:400],
+                'score': p['score'] or 0,
+                'num_comments': 0,
+                'url': p['url']
+            }
+            for p in all_posts if p['title']
         ]
     }
 
     # Save to file
-    output_path = 'railway-api/latest_report.json'
+    output_path = report_path(topic)
     with open(output_path, 'w') as f:
         json.dump(report, f, indent=2)
 
     print("=" * 60)
+    record_history(topic, all_posts)
+
     print(f"✅ Report saved to {output_path}")
     print(f"📊 Total posts analyzed: {len(all_posts)}")
     print(f"😊 Overall sentiment: {analysis.get('sentiment', 'unknown')}")
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Canonical song identities for lyric lookups.
+
+The same song shows up under several names across the top_songs shards:
+"Song", "Song - Remastered 2011", "Song (feat. X)", or a second Spotify URI
+for a re-release. All of them resolve to one canonical id. A song's URI is
+tried first, then its normalized primary artist + title (name_key). Each id
+owns one lyrics record, so a real song is fetched once per history rather
+than once per variant and year.
+
+spotify-trends/wordclouds/songs_index.json:
+    {"format": 1,
+     "uris":  {"spotify:track:...": "<id>"},
+     "names": {"ariana grande||jason s song": "<id>"},
+     "songs": {"<id>": {"artist": ..., "track": ..., "found": true,
+                        "source": "genius", "bag": "<song_key>",
+                        "checked_at": 1760000000}}}
+
+A found record points at a word bag (by wordbag_store.song_key) in the
+per-year bag files rather than holding the words itself. When that bag is
+gone, the record counts as a miss and the song is fetched again. Songs
+whose lyrics were not found are retried after MISS_RETRY_DAYS.
+
+Usage:
+    python song_identity.py stats
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+import time
+from threading import Lock
+from typing import Optional
+
+import json_store
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_PATH = os.path.join(BASE_DIR, 'spotify-trends', 'wordclouds', 'songs_index.json')
+
+FORMAT = 1
+MISS_RETRY_DAYS = 30
+
+_BRACKETS = re.compile(r'\s*[\[(].*?[\])]\s*')
+_SUFFIX = re.compile(
+    r'\s+[-–—]\s+.*\b(remaster(ed)?|version|edit|live|mono|stereo|mix|feat\.?|featuring'
+    r'|acoustic|demo|bonus|deluxe|single|recorded|from)\b.*$', re.I)
+_ARTIST_SPLIT = re.compile(r'\s*(?:,|&|\+|;|/|\b(?:feat\.?|ft\.?|featuring|with|x|vs\.?)\s)\s*', re.I)
+_NON_WORD = re.compile(r'[^\w]+')
+
+
+def normalize_title(title: str) -> str:
+    t = _SUFFIX.sub('', title or '')
+    t = _BRACKETS.sub(' ', t)
+    return _NON_WORD.sub(' ', t.lower()).strip() or (title or '').lower().strip()
+
+
+def primary_artist(artist: str) -> str:
+    first = _ARTIST_SPLIT.split(artist or '', maxsplit=1)[0]
+    return _NON_WORD.sub(' ', first.lower()).strip() or (artist or '').lower().strip()
+
+
+def name_key(artist: str, track: str) -> str:
+    return f'{primary_artist(artist)}||{normalize_title(track)}'
+
+
+class SongIdentityIndex:
+    """Variant -> canonical id -> lyrics record. Thread-safe; save() persists."""
+
+    def __init__(self, data: Optional[dict] = None, bags: Optional[dict] = None,
+                 path: str = INDEX_PATH):
+        data = data or {}
+        self.path = path
+        self.uris: dict[str, str] = data.get('uris') or {}
+        self.names: dict[str, str] = data.get('names') or {}
+        self.songs: dict[str, dict] = data.get('songs') or {}
+        # song_key -> {artist, track, words}; the union of the bag files.
+        self.bags: dict[str, dict] = bags if bags is not None else {}
+        self.stats = {'hits': 0, 'misses': 0, 'cached_not_found': 0}
+        self._lock = Lock()
+
+    @classmethod
+    def load(cls, bags: Optional[dict] = None, path: str = INDEX_PATH) -> 'SongIdentityIndex':
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if data and data.get('format') != FORMAT:
+            data = None
+        return cls(data, bags, path)
+
+    def resolve(self, artist: str, track: str, uri: str = '') -> str:
+        """Canonical id for a variant, registering the variant under it."""
+        nk = name_key(artist, track)
+        with self._lock:
+            cid = (self.uris.get(uri) if uri else None) or self.names.get(nk) or nk
+            if uri:
+                self.uris.setdefault(uri, cid)
+            self.names.setdefault(nk, cid)
+            return cid
+
+    def _usable(self, rec: Optional[dict], now: float) -> Optional[str]:
+        # 'found' / 'not_found' when `rec` settles the song, None when it needs fetching.
+        if rec and rec.get('found'):
+            bag = self.bags.get(rec.get('bag') or '')
+            return 'found' if bag and bag.get('words') else None
+        if rec and now - rec.get('checked_at', 0) < MISS_RETRY_DAYS * 86400:
+            return 'not_found'
+        return None
+
+    def needs_fetch(self, cid: str, now: Optional[float] = None) -> bool:
+        with self._lock:
+            return self._usable(self.songs.get(cid), time.time() if now is None else now) is None
+
+    def cached(self, cid: str, now: Optional[float] = None) -> Optional[dict]:
+        """The usable record for `cid`, or None when the song needs fetching.
+
+        A found record comes back with its bag's `words`. A recent miss
+        comes back as is.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            rec = self.songs.get(cid)
+            usable = self._usable(rec, now)
+            if usable == 'found':
+                self.stats['hits'] += 1
+                return dict(rec, words=self.bags[rec['bag']]['words'])
+            if usable == 'not_found':
+                self.stats['cached_not_found'] += 1
+                return rec
+            self.stats['misses'] += 1
+            return None
+
+    def record(self, cid: str, artist: str, track: str, source: Optional[str],
+               words: Optional[dict] = None, bag_key: Optional[str] = None) -> None:
+        """Store the outcome of a fetch; `words` is None when nothing was found."""
+        rec = {'artist': artist, 'track': track, 'found': bool(words), 'source': source,
+               'checked_at': int(time.time())}
+        with self._lock:
+            if words:
+                rec['bag'] = bag_key
+                self.bags[bag_key] = {'artist': artist, 'track': track, 'words': words}
+            self.songs[cid] = rec
+
+    def save(self) -> bool:
+        with self._lock:
+            data = {'format': FORMAT, 'uris': dict(sorted(self.uris.items())),
+                    'names': dict(sorted(self.names.items())),
+                    'songs': dict(sorted(self.songs.items()))}
+        return json_store.write_json(self.path, data, indent=None)
+
+
+def main(argv: list[str]) -> int:
+    if argv[:1] != ['stats']:
+        print(__doc__)
+        return 2
+    idx = SongIdentityIndex.load()
+    found = sum(1 for r in idx.songs.values() if r.get('found'))
+    print(f'{len(idx.songs)} songs ({found} with lyrics), '
+          f'{len(idx.names)} name variants, {len(idx.uris)} URIs')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -14,8 +14,10 @@ import subprocess
 
 # Paths
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.join(SCRIPT_DIR, "spotify-trends")
-ANALYZER_SCRIPT = os.path.join(os.path.dirname(SCRIPT_DIR), "spotify_trends_analyzer.py")
+DATA_DIR = SCRIPT_DIR
+# The repo-root updater now folds new plays into monthly_trends.json and
+# basic_stats.json incrementally, so there is no separate full-history analyzer.
+ANALYZER_SCRIPT = os.path.join(os.path.dirname(SCRIPT_DIR), "update_spotify_data.py")
 
 def log(message):
     """Print timestamped log message"""
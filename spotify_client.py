@@ -0,0 +1,166 @@
+"""
+Spotify Web API client used by update_spotify_data.py.
+
+- One pooled requests.Session (keep-alive across every call)
+- Access token cached until shortly before it expires, refreshed on 401
+- Timeouts on every request; 429 honours Retry-After, 5xx and connection
+  errors back off exponentially
+- paginate() follows `next` links (offset- or cursor-based)
+- fetch_many() issues independent endpoint calls concurrently. The daily
+  updater needs only recently-played, so it doesn't use it; it is
+  measured by `spotify_stub.py --bench`.
+
+SPOTIFY_API_BASE / SPOTIFY_TOKEN_URL can point the client at the offline
+stand-in server in spotify_stub.py.
+"""
+from __future__ import annotations
+
+import base64
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_BASE = os.environ.get("SPOTIFY_API_BASE", "https://api.spotify.com/v1")
+TOKEN_URL = os.environ.get("SPOTIFY_TOKEN_URL", "https://accounts.spotify.com/api/token")
+
+REQUEST_TIMEOUT = 15
+MAX_RETRIES = 4
+MAX_WORKERS = 6
+TOKEN_EXPIRY_MARGIN = 60  # refresh this many seconds before the token expires
+
+
+class SpotifyError(RuntimeError):
+    pass
+
+
+class SpotifyClient:
+    def __init__(self, client_id, client_secret, refresh_token,
+                 api_base=API_BASE, token_url=TOKEN_URL,
+                 timeout=REQUEST_TIMEOUT, max_retries=MAX_RETRIES, max_workers=MAX_WORKERS):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_token = refresh_token
+        self.api_base = api_base.rstrip("/")
+        self.token_url = token_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(max_workers, 4))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._token = None
+        self._token_expires = 0.0
+        self._token_lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "token_refreshes": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    # -- auth ---------------------------------------------------------------
+
+    def token(self, force=False):
+        """Return a valid access token, refreshing only when it is about to expire."""
+        with self._token_lock:
+            if not force and self._token and time.time() < self._token_expires:
+                return self._token
+            auth = base64.b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
+            resp = self.session.post(
+                self.token_url,
+                headers={"Authorization": f"Basic {auth}",
+                         "Content-Type": "application/x-www-form-urlencoded"},
+                data={"grant_type": "refresh_token", "refresh_token": self.refresh_token},
+                timeout=self.timeout,
+            )
+            if resp.status_code != 200:
+                raise SpotifyError(f"token refresh failed: {resp.status_code} {resp.text[:200]}")
+            body = resp.json()
+            self._token = body["access_token"]
+            self._token_expires = time.time() + int(body.get("expires_in", 3600)) - TOKEN_EXPIRY_MARGIN
+            self._count("token_refreshes")
+            return self._token
+
+    # -- requests -----------------------------------------------------------
+
+    def _url(self, endpoint):
+        if endpoint.startswith("http://") or endpoint.startswith("https://"):
+            return endpoint
+        return f"{self.api_base}/{endpoint.lstrip('/')}"
+
+    def get(self, endpoint, params=None):
+        """GET an endpoint (path or absolute `next` URL) and return parsed JSON.
+
+        Returns None on a non-retryable error so callers can skip that update,
+        matching how the updater has always treated a failed endpoint.
+        """
+        url = self._url(endpoint)
+        refreshed = False
+        for attempt in range(self.max_retries + 1):
+            self._count("requests")
+            try:
+                resp = self.session.get(url, params=params, timeout=self.timeout,
+                                        headers={"Authorization": f"Bearer {self.token()}"})
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    print(f"Error fetching {endpoint}: {e}")
+                    return None
+                self._count("retries")
+                time.sleep(min(2 ** attempt, 30))
+                continue
+            if resp.status_code == 200:
+                return resp.json()
+            if resp.status_code == 401 and not refreshed:
+                refreshed = True
+                self.token(force=True)
+                continue
+            if resp.status_code == 429 or resp.status_code >= 500:
+                if attempt == self.max_retries:
+                    break
+                self._count("retries")
+                retry_after = resp.headers.get("Retry-After")
+                delay = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt
+                time.sleep(min(delay, 60))
+                continue
+            break
+        print(f"Error fetching {endpoint}: {resp.status_code}")
+        print(resp.text[:500])
+        return None
+
+    def paginate(self, endpoint, params=None, max_items=None):
+        """Collect `items` across pages by following `next` links."""
+        items = []
+        page = self.get(endpoint, params)
+        while page and "items" in page:
+            items.extend(page["items"])
+            if max_items is not None and len(items) >= max_items:
+                return items[:max_items]
+            nxt = page.get("next")
+            if not nxt or not page["items"]:
+                break
+            page = self.get(nxt)
+        return items if page is not None or items else None
+
+    def fetch_many(self, calls):
+        """Run independent calls concurrently.
+
+        `calls` maps a name to (endpoint, params) for a single get() or to
+        (endpoint, params, max_items) for paginate(). Returns name -> result.
+        """
+        def run(spec):
+            if len(spec) == 3:
+                return self.paginate(spec[0], spec[1], spec[2])
+            return self.get(spec[0], spec[1])
+
+        self.token()  # refresh once up front instead of racing in every worker
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(len(calls), 1))) as pool:
+            futures = {name: pool.submit(run, spec) for name, spec in calls.items()}
+            return {name: fut.result() for name, fut in futures.items()}
+
+    def close(self):
+        self.session.close()
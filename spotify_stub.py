@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for the Spotify Web API.
+
+Serves just enough of the token endpoint, me/top/{artists,tracks} and
+me/player/recently-played (with offset/cursor pagination) to exercise
+spotify_client.SpotifyClient and update_spotify_data.py without network
+access or credentials. Every response waits `latency` seconds, and every
+`throttle_every`-th request answers 429 with Retry-After: 1.
+
+Usage:
+    python spotify_stub.py [--port 8765]      # serve until Ctrl-C
+    python spotify_stub.py --bench            # sequential vs concurrent fetch timing
+
+To run the updater against it:
+    SPOTIFY_API_BASE=http://127.0.0.1:8765/v1 \\
+    SPOTIFY_TOKEN_URL=http://127.0.0.1:8765/api/token \\
+    SPOTIFY_CLIENT_ID=x SPOTIFY_CLIENT_SECRET=x SPOTIFY_REFRESH_TOKEN=x \\
+    python update_spotify_data.py
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _track(i: int) -> dict:
+    return {
+        'name': f'Stub Track {i}',
+        'uri': f'spotify:track:stub{i:05d}',
+        'duration_ms': 150_000 + (i % 7) * 10_000,
+        'artists': [{'name': f'Stub Artist {i % 13}'}],
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: 'StubServer'
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status: int, body: dict, headers: dict | None = None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _throttled(self) -> bool:
+        srv = self.server
+        with srv.lock:
+            srv.request_count += 1
+            n = srv.request_count
+        time.sleep(srv.latency)
+        if srv.throttle_every and n % srv.throttle_every == 0:
+            self._send(429, {'error': {'status': 429, 'message': 'rate limited'}}, {'Retry-After': '1'})
+            return True
+        return False
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/api/token':
+            return self._send(404, {'error': 'not found'})
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        self.server.token_requests += 1
+        self._send(200, {'access_token': f'stub-token-{self.server.token_requests}',
+                         'token_type': 'Bearer', 'expires_in': 3600})
+
+    def do_GET(self):
+        if self._throttled():
+            return
+        url = urllib.parse.urlsplit(self.path)
+        q = dict(urllib.parse.parse_qsl(url.query))
+        if not (self.headers.get('Authorization') or '').startswith('Bearer stub-token-'):
+            return self._send(401, {'error': {'status': 401, 'message': 'bad token'}})
+        limit = int(q.get('limit') or 20)
+        offset = int(q.get('offset') or 0)
+        base = f'http://{self.headers.get("Host")}{url.path}'
+        if url.path == '/v1/me/top/artists':
+            items = [{'name': f'Stub Artist {i}'} for i in range(offset, min(offset + limit, 50))]
+            nxt = f'{base}?limit={limit}&offset={offset + limit}' if offset + limit < 50 else None
+            return self._send(200, {'items': items, 'next': nxt, 'total': 50})
+        if url.path == '/v1/me/top/tracks':
+            shift = {'short_term': 0, 'medium_term': 100, 'long_term': 200}.get(q.get('time_range'), 0)
+            items = [_track(shift + i) for i in range(offset, min(offset + limit, 50))]
+            nxt = f'{base}?limit={limit}&offset={offset + limit}&time_range={q.get("time_range", "")}' \
+                if offset + limit < 50 else None
+            return self._send(200, {'items': items, 'next': nxt, 'total': 50})
+        if url.path == '/v1/me/player/recently-played':
+            return self._send(200, self._recently_played(base, limit, int(q.get('after') or 0)))
+        self._send(404, {'error': {'status': 404, 'message': 'not found'}})
+
+    def _recently_played(self, base: str, limit: int, after: int) -> dict:
+        # Plays every 4 minutes over the last `history` plays, oldest first.
+        srv = self.server
+        start = srv.now - timedelta(minutes=4 * srv.history)
+        plays = []
+        for i in range(srv.history):
+            ts = start + timedelta(minutes=4 * i)
+            ms = int(ts.timestamp() * 1000)
+            if ms > after:
+                plays.append((ms, ts, i))
+            if len(plays) == limit:
+                break
+        items = [{'played_at': ts.isoformat().replace('+00:00', 'Z'), 'track': _track(i % 120)}
+                 for _, ts, i in reversed(plays)]
+        newest = plays[-1][0] if plays else after
+        more = bool(plays) and plays[-1][2] + 1 < srv.history
+        return {'items': items, 'cursors': {'after': str(newest)} if plays else None,
+                'next': f'{base}?limit={limit}&after={newest}' if more else None}
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded stub server; use as a context manager to run it in the background."""
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0.05, throttle_every: int = 0, history: int = 300):
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.history = history
+        self.now = datetime.now(timezone.utc).replace(microsecond=0)
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.token_requests = 0
+        self._thread: threading.Thread | None = None
+
+    @property
+    def api_base(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/v1'
+
+    @property
+    def token_url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/api/token'
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def bench(latency: float, throttle_every: int) -> None:
+    from spotify_client import SpotifyClient
+
+    # The updater's endpoints, as fetch_many() specs: (endpoint, params) for a
+    # single get(), (endpoint, params, max_items) for paginate().
+    calls = {'top_artists': ('me/top/artists', {'time_range': 'medium_term', 'limit': 10})}
+    for r in ('short_term', 'medium_term', 'long_term'):
+        calls[r] = ('me/top/tracks', {'time_range': r, 'limit': 10})
+    calls['recent'] = ('me/player/recently-played', {'limit': 50}, 1000)
+
+    with StubServer(latency=latency, throttle_every=throttle_every) as srv:
+        client = SpotifyClient('id', 'secret', 'refresh', api_base=srv.api_base, token_url=srv.token_url)
+        client.token()  # both timings start with a valid token
+        t0 = time.perf_counter()
+        seq = {}
+        for name, spec in calls.items():
+            seq[name] = client.paginate(*spec) if len(spec) == 3 else client.get(*spec)
+        t_seq = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        conc = client.fetch_many(calls)
+        t_conc = time.perf_counter() - t0
+        client.close()
+
+    print(f'latency {latency * 1000:.0f}ms/request, 429 every {throttle_every or "never"}')
+    print(f'sequential: {t_seq:.2f}s  concurrent: {t_conc:.2f}s  '
+          f'(recently-played items {len(seq["recent"] or [])} / {len(conc["recent"] or [])})')
+    print(f'client stats: {client.stats}, token requests served: {srv.token_requests}')
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--port', type=int, default=8765)
+    ap.add_argument('--latency', type=float, default=0.05)
+    ap.add_argument('--throttle-every', type=int, default=0)
+    ap.add_argument('--bench', action='store_true')
+    args = ap.parse_args()
+    if args.bench:
+        bench(args.latency, args.throttle_every)
+        return
+    srv = StubServer(args.port, args.latency, args.throttle_every)
+    print(f'Spotify stub on {srv.api_base} (token: {srv.token_url})')
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Sharded storage for the per-month top songs.
+
+top_songs_by_period.json used to hold every month in one ~730KB document
+that the dashboard downloaded whole and the daily tools re-serialized whole.
+It now lives as one compact shard per year plus a small manifest:
+
+    spotify-trends/top_songs/manifest.json
+        {"format": 1, "columns": [...], "shards": {"2020": {"file": ...,
+         "periods": [...], "rows": N}}}
+    spotify-trends/top_songs/<year>.json
+        {"year": "2020", "strings": [...],
+         "periods": {"2020-01": [[track, artist, uri, play_count, total_minutes], ...]}}
+
+track/artist/uri are indexes into the shard's own string table, so a daily
+update of the current month rewrites one shard and the manifest only.
+
+Usage:
+    python top_songs_shards.py build    # shard spotify-trends/top_songs_by_period.json
+    python top_songs_shards.py export   # write the legacy single-file layout back out
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+
+import json_store
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, 'spotify-trends')
+SHARDS_DIR = os.path.join(DATA_DIR, 'top_songs')
+MANIFEST_PATH = os.path.join(SHARDS_DIR, 'manifest.json')
+LEGACY_PATH = os.path.join(DATA_DIR, 'top_songs_by_period.json')
+
+FORMAT = 1
+COLUMNS = ['track', 'artist', 'spotify_uri', 'play_count', 'total_minutes']
+
+
+def encode_shard(year: str, periods: dict[str, list[dict]]) -> dict:
+    strings: list[str] = []
+    ids: dict[str, int] = {}
+
+    def sid(s: str) -> int:
+        i = ids.get(s)
+        if i is None:
+            i = ids[s] = len(strings)
+            strings.append(s)
+        return i
+
+    out = {}
+    for period in sorted(periods):
+        out[period] = [
+            [sid(it.get('track') or ''), sid(it.get('artist') or ''), sid(it.get('spotify_uri') or ''),
+             int(it.get('play_count') or 0), round(float(it.get('total_minutes') or 0.0), 4)]
+            for it in periods[period] or []
+        ]
+    return {'year': year, 'strings': strings, 'periods': out}
+
+
+def decode_shard(shard: dict) -> dict[str, list[dict]]:
+    strings = shard['strings']
+    return {
+        period: [
+            {'track': strings[t], 'artist': strings[a], 'spotify_uri': strings[u],
+             'play_count': plays, 'total_minutes': minutes}
+            for t, a, u, plays, minutes in rows
+        ]
+        for period, rows in shard['periods'].items()
+    }
+
+
+def load_manifest() -> dict:
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'format': FORMAT, 'columns': COLUMNS, 'shards': {}}
+
+
+def load_year(year: str) -> dict[str, list[dict]]:
+    path = os.path.join(SHARDS_DIR, f'{year}.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return decode_shard(json.load(f))
+
+
+def load_top_songs() -> dict[str, list[dict]]:
+    """Every period across all shards, in the legacy {period: [row, ...]} shape.
+
+    Falls back to the legacy single file when no shards have been built yet.
+    """
+    manifest = load_manifest()
+    if not manifest['shards'] and os.path.exists(LEGACY_PATH):
+        with open(LEGACY_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    out: dict[str, list[dict]] = {}
+    for year in sorted(manifest['shards']):
+        out.update(load_year(year))
+    return out
+
+
+def save_year(year: str, periods: dict[str, list[dict]], manifest: dict | None = None) -> bool:
+    """Write one year's shard. Returns False if the shard was unchanged."""
+    own_manifest = manifest is None
+    if own_manifest:
+        manifest = load_manifest()
+    changed = json_store.write_json(os.path.join(SHARDS_DIR, f'{year}.json'),
+                                    encode_shard(year, periods), indent=None)
+    manifest['shards'][year] = {
+        'file': f'top_songs/{year}.json',
+        'periods': sorted(periods),
+        'rows': sum(len(v or []) for v in periods.values()),
+    }
+    if own_manifest:
+        _write_manifest(manifest)
+    return changed
+
+
+def _write_manifest(manifest: dict) -> None:
+    manifest['shards'] = dict(sorted(manifest['shards'].items()))
+    json_store.write_json(MANIFEST_PATH, manifest)
+
+
+def save_period(period: str, rows: list[dict]) -> bool:
+    """Replace one YYYY-MM period; only that year's shard is rewritten."""
+    year = period[:4]
+    periods = load_year(year)
+    periods[period] = rows
+    return save_year(year, periods)
+
+
+def save_all(top_songs: dict[str, list[dict]]) -> None:
+    by_year: dict[str, dict[str, list[dict]]] = {}
+    for period, rows in top_songs.items():
+        by_year.setdefault(period[:4], {})[period] = rows
+    manifest = {'format': FORMAT, 'columns': COLUMNS, 'shards': {}}
+    for year, periods in by_year.items():
+        save_year(year, periods, manifest)
+    _write_manifest(manifest)
+
+
+def main(argv: list[str]) -> int:
+    cmd = argv[0] if argv else ''
+    if cmd == 'build':
+        with open(LEGACY_PATH, 'r', encoding='utf-8') as f:
+            top_songs = json.load(f)
+        save_all(top_songs)
+        print(f'Wrote {len(load_manifest()["shards"])} shards to {SHARDS_DIR}')
+        return 0
+    if cmd == 'export':
+        json_store.write_json(LEGACY_PATH, load_top_songs())
+        print(f'Wrote {LEGACY_PATH}')
+        return 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -11,10 +11,15 @@ import os
 import sys
 import re
 import json
-import requests
-import base64
+from collections import Counter
 from datetime import datetime
 
+import json_store
+import play_aggregates
+import play_log
+import top_songs_shards
+from spotify_client import SpotifyClient, SpotifyError
+
 # Get credentials from environment (GitHub Secrets)
 CLIENT_ID = os.environ.get("SPOTIFY_CLIENT_ID")
 CLIENT_SECRET = os.environ.get("SPOTIFY_CLIENT_SECRET")
@@ -26,41 +31,6 @@ DATA_DIR = os.path.join(BASE_DIR, "spotify-trends")
 INDEX_HTML = os.path.join(BASE_DIR, "index.html")
 
 
-def get_access_token():
-    """Use refresh token to get a fresh access token."""
-    auth_header = base64.b64encode(f"{CLIENT_ID}:{CLIENT_SECRET}".encode()).decode()
-    response = requests.post(
-        "https://accounts.spotify.com/api/token",
-        headers={
-            "Authorization": f"Basic {auth_header}",
-            "Content-Type": "application/x-www-form-urlencoded"
-        },
-        data={
-            "grant_type": "refresh_token",
-            "refresh_token": REFRESH_TOKEN
-        }
-    )
-    if response.status_code != 200:
-        print(f"Error refreshing token: {response.status_code}")
-        print(response.text)
-        sys.exit(1)
-    return response.json()["access_token"]
-
-
-def spotify_get(endpoint, token, params=None):
-    """Make an authenticated GET request to Spotify API."""
-    response = requests.get(
-        f"https://api.spotify.com/v1/{endpoint}",
-        headers={"Authorization": f"Bearer {token}"},
-        params=params
-    )
-    if response.status_code != 200:
-        print(f"Error fetching {endpoint}: {response.status_code}")
-        print(response.text)
-        return None
-    return response.json()
-
-
 def load_json(filename):
     """Load a JSON file from the data directory."""
     filepath = os.path.join(DATA_DIR, filename)
@@ -69,74 +39,115 @@ def load_json(filename):
 
 
 def save_json(filename, data):
-    """Save data to a JSON file in the data directory."""
+    """Atomically save data to a JSON file in the data directory."""
     filepath = os.path.join(DATA_DIR, filename)
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    print(f"  Updated {filename}")
+    if json_store.write_json(filepath, data):
+        print(f"  Updated {filename}")
+    else:
+        print(f"  {filename} unchanged")
 
 
-def update_artist_evolution(token):
-    """Update artist_evolution.json with current top artists."""
-    print("Updating artist_evolution.json...")
-    top_artists = spotify_get("me/top/artists", token, {
-        "time_range": "medium_term",
-        "limit": 10
-    })
-    if not top_artists or "items" not in top_artists:
-        print("  Could not fetch top artists, skipping")
-        return False
+def patch_json(filename, key, value):
+    """Atomically replace one top-level key, leaving the rest of the file as-is."""
+    filepath = os.path.join(DATA_DIR, filename)
+    if json_store.patch_json_key(filepath, key, value):
+        print(f"  Updated {filename} [{key}]")
+    else:
+        print(f"  {filename} [{key}] unchanged")
 
-    artist_data = load_json("artist_evolution.json")
-    current_year = str(datetime.now().year)
 
-    new_artists = []
-    base_count = 200
-    for i, artist in enumerate(top_artists["items"]):
-        new_artists.append({
-            "artist": artist["name"],
-            "play_count": max(base_count - (i * 20), 10)
-        })
+TOP_SONGS_PER_MONTH = 25
+TOP_ARTISTS_PER_YEAR = 10
 
-    artist_data[current_year] = new_artists
-    save_json("artist_evolution.json", artist_data)
-    return True
 
+def fetch_all(client, cursor_after):
+    """Fetch what the updater needs: the plays after `cursor_after`.
 
-def update_top_songs(token):
-    """Update top_songs_by_period.json with current month's top tracks."""
-    print("Updating top_songs_by_period.json...")
-    top_tracks = spotify_get("me/top/tracks", token, {
-        "time_range": "short_term",
-        "limit": 10
-    })
-    if not top_tracks or "items" not in top_tracks:
-        print("  Could not fetch top tracks, skipping")
+    Everything else is derived from the play log, so this is a single
+    cursor-paginated endpoint; its pages depend on each other and are
+    fetched in order (no concurrent batch).
+    """
+    recent_params = {"limit": 50}
+    if cursor_after:
+        recent_params["after"] = cursor_after
+    return {"recently_played": client.paginate("me/player/recently-played", recent_params, 1000)}
+
+
+def fetch_cursor():
+    """Oldest of the play log's and the aggregates' high-water marks.
+
+    Both consumers deduplicate on their own, so refetching from the older one
+    lets whichever fell behind (e.g. after a crashed run) catch up.
+    """
+    marks = [m for m in (play_log.high_water_mark(),
+                         int(play_aggregates.load_cursor().get("after") or 0)) if m]
+    return min(marks) if marks else 0
+
+
+def ingest_plays(items):
+    """Append fetched plays to the play log and return them all."""
+    print("Appending to play log...")
+    plays = play_aggregates.plays_from_recently_played(items or [])
+    new_plays = play_log.append(plays)
+    print(f"  {len(new_plays)} new plays ({len(plays) - len(new_plays)} already logged)")
+    return plays
+
+
+def update_artist_evolution():
+    """Update the current year in artist_evolution.json with real play counts.
+
+    Months covered by the play log use its exact counts; earlier months of the
+    year fall back to the artist totals in that month's top-songs shard.
+    """
+    print("Updating artist_evolution.json...")
+    current_year = str(datetime.now().year)
+    logged = {m for m in play_log.months() if m.startswith(current_year)}
+    if not logged:
+        print("  No logged plays this year yet, skipping")
         return False
 
-    songs_data = load_json("top_songs_by_period.json")
+    counts = Counter()
+    for month in sorted(logged):
+        counts.update(play_log.artist_counts_for_month(month))
+    for period, rows in top_songs_shards.load_year(current_year).items():
+        if period in logged:
+            continue
+        for row in rows:
+            counts[row["artist"]] += int(row.get("play_count") or 0)
+
+    new_artists = [{"artist": name, "play_count": plays}
+                   for name, plays in counts.most_common(TOP_ARTISTS_PER_YEAR)]
+    patch_json("artist_evolution.json", current_year, new_artists)
+    return True
+
+
+def update_top_songs():
+    """Update the current month in the top_songs/ year shard from the play log."""
+    print("Updating top songs shard...")
     current_period = datetime.now().strftime("%Y-%m")
+    new_tracks = play_log.top_songs_for_month(current_period, TOP_SONGS_PER_MONTH)
+    if not new_tracks:
+        print(f"  No logged plays for {current_period} yet, skipping")
+        return False
 
-    new_tracks = []
-    base_count = 30
-    for i, track in enumerate(top_tracks["items"]):
-        artist_name = track["artists"][0]["name"] if track["artists"] else "Unknown"
-        duration_ms = track.get("duration_ms", 180000)
-        play_count = max(base_count - (i * 3), 3)
-        total_minutes = round((duration_ms / 60000) * play_count, 3)
-        new_tracks.append({
-            "track": track["name"],
-            "artist": artist_name,
-            "spotify_uri": track.get("uri", ""),
-            "play_count": play_count,
-            "total_minutes": total_minutes
-        })
-
-    songs_data[current_period] = new_tracks
-    save_json("top_songs_by_period.json", songs_data)
+    if top_songs_shards.save_period(current_period, new_tracks):
+        print(f"  Updated top_songs/{current_period[:4]}.json")
+    else:
+        print(f"  top_songs/{current_period[:4]}.json unchanged")
     return True
 
 
+def update_play_aggregates(plays):
+    """Fold plays newer than the aggregates' cursor into monthly_trends.json and basic_stats.json."""
+    print("Updating monthly_trends.json and basic_stats.json...")
+    months = play_aggregates.apply_plays(plays)
+    if months:
+        print(f"  Folded new plays into {', '.join(months)}")
+    else:
+        print("  No new plays since last run")
+    return bool(months)
+
+
 def update_last_updated():
     """Update last_updated.json with current timestamp."""
     print("Updating last_updated.json...")
@@ -162,8 +173,7 @@ def update_date_in_html():
     new_html = re.sub(pattern, replacement, html)
 
     if new_html != html:
-        with open(INDEX_HTML, "w", encoding="utf-8") as f:
-            f.write(new_html)
+        json_store.write_text(INDEX_HTML, new_html)
         print(f"  Updated date to: Data through {new_date} | 2012-{now.year}")
     else:
         print("  No date change needed")
@@ -175,12 +185,22 @@ def main():
         print("Make sure SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET, and SPOTIFY_REFRESH_TOKEN are set")
         sys.exit(1)
 
-    print("Fetching fresh access token...")
-    token = get_access_token()
-
-    print("\nFetching and updating Spotify data...")
-    artists_updated = update_artist_evolution(token)
-    songs_updated = update_top_songs(token)
+    client = SpotifyClient(CLIENT_ID, CLIENT_SECRET, REFRESH_TOKEN)
+    print("Fetching Spotify data...")
+    try:
+        results = fetch_all(client, fetch_cursor())
+    except SpotifyError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        client.close()
+    print(f"  {client.stats['requests']} requests, {client.stats['retries']} retries")
+
+    print("\nUpdating Spotify data...")
+    plays = ingest_plays(results["recently_played"])
+    update_play_aggregates(plays)
+    artists_updated = update_artist_evolution()
+    songs_updated = update_top_songs()
     update_last_updated()
     update_date_in_html()
 
@@ -192,8 +212,8 @@ def main():
             print(f"\n  Top Artists ({current_year}): {', '.join(names)}")
 
     if songs_updated:
-        data = load_json("top_songs_by_period.json")
         current_period = datetime.now().strftime("%Y-%m")
+        data = top_songs_shards.load_year(current_period[:4])
         if current_period in data:
             tracks = [f"{t['track']} - {t['artist']}" for t in data[current_period][:3]]
             print(f"  Top Tracks ({current_period}): {', '.join(tracks)}")
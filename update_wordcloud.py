@@ -2,40 +2,67 @@
 """
 Word Cloud Precomputer (multi-source).
 
-For each year in spotify-trends/top_songs_by_period.json:
-  1. Aggregate top songs of that year.
+For each year in the spotify-trends/top_songs/ shards:
+  1. Aggregate top songs of that year, merging variants of the same song
+     (remasters, features, re-release URIs; see song_identity.py).
   2. Fetch lyrics from LyricsOVH, LyricFind, Genius, AZLyrics, Lyrics.com,
      SongLyrics, STLyrics (musicals), AllMusicals (musicals), and a generic
-     DDG HTML search fallback. First hit wins.
+     DDG HTML search fallback. First hit wins, and its page URL is kept in
+     wordclouds/lyrics_urls.json so a refetch is one request. Songs already
+     resolved in an earlier year or run reuse their stored word bag
+     instead. The rest are fetched from one queue across all years,
+     most-played first, until WORDCLOUD_TIME_BUDGET seconds have passed;
+     songs not reached are written as pending and fetched by the next run.
   3. Count words (stopword-filtered) weighted by play count.
-  4. Write spotify-trends/wordclouds/<year>.json plus an index.json.
+  4. Write spotify-trends/wordclouds/<year>.json plus an index.json, and the
+     per-song word bags to spotify-trends/wordclouds/bags/<year>.json so the
+     API can compose clouds for arbitrary song sets without refetching.
+  5. Rebuild the memory-mapped word-bag store (see wordbag_store.py) and
+     refresh the monthly / rolling clouds (see monthly_wordclouds.py).
 
 Output never includes raw lyrics; only aggregated word counts and per-song
-metadata (artist/track/plays/found/word_count/source).
+metadata (artist/track/plays/found/word_count/source/emotions).
 """
 from __future__ import annotations
 
+import heapq
 import html
 import json
 import logging
 import os
 import re
 import sys
+import threading
 import time
+import urllib.error
 import urllib.parse
 import urllib.request
 from collections import Counter
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime, timezone
 from typing import Optional
 
+import numpy as np
+
+import emotion_index
+import json_store
+import monthly_wordclouds
+import song_identity
+import top_songs_shards
+import wordbag_store
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'railway-api'))
+from word_tally import ExactTally, SpaceSaving, compare_topk  # noqa: E402
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
 log = logging.getLogger('wordcloud-updater')
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, 'spotify-trends')
 OUT_DIR = os.path.join(DATA_DIR, 'wordclouds')
-TOP_SONGS_PATH = os.path.join(DATA_DIR, 'top_songs_by_period.json')
+BAGS_DIR = os.path.join(OUT_DIR, 'bags')
+RESOLUTION_CACHE_PATH = os.path.join(OUT_DIR, 'lyrics_urls.json')
+GENIUS_CACHE_PATH = os.path.join(OUT_DIR, 'genius_search.json')
 
 USER_AGENT = (
     'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_0) AppleWebKit/605.1.15 '
@@ -46,13 +73,145 @@ TOP_N_PER_YEAR = 500  # effectively "all" songs per year
 MAX_WORKERS = 6
 REQUEST_TIMEOUT = 12
 TOP_WORDS_OUT = 80
+# Word aggregation (railway-api/word_tally.py): 'exact' keeps every distinct
+# word, 'bounded' keeps a fixed-size Space-Saving summary, 'verify' runs both
+# and logs the diff. Only the cross-song tally is bounded; each song's bag is
+# still held in full, since it is written to the bag files.
+TOPK_MODE = os.environ.get('WORDCLOUD_TOPK_MODE', 'exact').strip().lower()
+TOPK_ERROR = float(os.environ.get('WORDCLOUD_TOPK_ERROR', '0.0005'))
+# Overall seconds to spend fetching lyrics per run (0 = no limit); songs
+# not reached stay in the backlog for the next run.
+TIME_BUDGET = float(os.environ.get('WORDCLOUD_TIME_BUDGET', '1200'))
+# Per-host circuit breakers (see CircuitBreaker).
+BREAKER_STATUSES = (403, 429)
+BREAKER_CONSECUTIVE = 5
+BREAKER_WINDOW = 20
+BREAKER_ERROR_RATE = 0.5
+BREAKER_COOLDOWN = 60.0
+BREAKER_MAX_COOLDOWN = 900.0
+# Genius "no result" answers are trusted for this long before searching again.
+GENIUS_NEGATIVE_TTL_DAYS = 14
 
 
 # ---------------------------------------------------------------------------
 # HTTP + slug helpers
 # ---------------------------------------------------------------------------
 
+class CircuitBreaker:
+    """Stops calling a host that keeps failing, then probes it after a cooldown.
+
+    closed -> open after BREAKER_CONSECUTIVE failures in a row, or when at
+    least BREAKER_ERROR_RATE of the last BREAKER_WINDOW calls failed. open ->
+    half_open once the cooldown has passed; the next call is a probe that
+    closes the breaker on success or reopens it (with a doubled cooldown,
+    up to BREAKER_MAX_COOLDOWN) on failure. Calls refused while open are
+    counted as skipped.
+    """
+
+    def __init__(self, host: str):
+        self.host = host
+        self.state = 'closed'
+        self.cooldown = BREAKER_COOLDOWN
+        self.opened_at = 0.0
+        self.consecutive = 0
+        self.recent: list[bool] = []  # True = failure, newest last
+        self.probing = False
+        self.counts = {'calls': 0, 'failures': 0, 'skipped': 0, 'trips': 0}
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = 'half_open'
+            if self.state == 'open' or (self.state == 'half_open' and self.probing):
+                self.counts['skipped'] += 1
+                return False
+            self.probing = self.state == 'half_open'
+            self.counts['calls'] += 1
+            return True
+
+    def record(self, failed: bool) -> bool:
+        """Record a call's outcome; True if it tripped the breaker."""
+        with self._lock:
+            self.probing = False
+            self.recent = (self.recent + [failed])[-BREAKER_WINDOW:]
+            if not failed:
+                self.consecutive = 0
+                if self.state == 'half_open':
+                    self.state, self.cooldown, self.recent = 'closed', BREAKER_COOLDOWN, []
+                return False
+            self.counts['failures'] += 1
+            self.consecutive += 1
+            if self.state == 'half_open':
+                self.cooldown = min(self.cooldown * 2, BREAKER_MAX_COOLDOWN)
+                self._trip()
+                return True
+            if self.state == 'closed' and (
+                    self.consecutive >= BREAKER_CONSECUTIVE
+                    or (len(self.recent) >= BREAKER_WINDOW // 2
+                        and sum(self.recent) / len(self.recent) >= BREAKER_ERROR_RATE)):
+                self._trip()
+                return True
+            return False
+
+    def _trip(self) -> None:
+        self.state = 'open'
+        self.opened_at = time.monotonic()
+        self.counts['trips'] += 1
+        log.warning('circuit open for %s (%d failures, cooldown %.0fs)',
+                    self.host, self.counts['failures'], self.cooldown)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.counts, state=self.state)
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+# Per-host counts for the song the current thread is fetching (see
+# _fetch_song_tallied), so breaker activity can be charged to its years.
+_call_tally = threading.local()
+
+
+def _tally(host: str, key: str) -> None:
+    counts = getattr(_call_tally, 'counts', None)
+    if counts is not None:
+        host_counts = counts.setdefault(host, {'calls': 0, 'failures': 0, 'skipped': 0, 'trips': 0})
+        host_counts[key] += 1
+
+
+def _breaker(host: str) -> CircuitBreaker:
+    with _breakers_lock:
+        b = _breakers.get(host)
+        if b is None:
+            b = _breakers[host] = CircuitBreaker(host)
+        return b
+
+
+def breaker_stats() -> dict[str, dict]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.host: b.snapshot() for b in sorted(breakers, key=lambda b: b.host)}
+
+
+def breaker_delta(before: dict[str, dict]) -> dict[str, dict]:
+    """Per-host counts since `before` (an earlier breaker_stats()), with current state."""
+    out = {}
+    for host, now in breaker_stats().items():
+        prev = before.get(host) or {}
+        d = {k: now[k] - prev.get(k, 0) for k in ('calls', 'failures', 'skipped', 'trips')}
+        if any(d.values()) or now['state'] != 'closed':
+            out[host] = dict(d, state=now['state'])
+    return out
+
+
 def _http_get(url: str, timeout: int = REQUEST_TIMEOUT) -> Optional[str]:
+    breaker = _breaker(urllib.parse.urlsplit(url).hostname or '')
+    if not breaker.allow():
+        _tally(breaker.host, 'skipped')
+        return None
+    _tally(breaker.host, 'calls')
+    failed = False
     try:
         req = urllib.request.Request(url, headers={
             'User-Agent': USER_AGENT,
@@ -61,9 +220,47 @@ def _http_get(url: str, timeout: int = REQUEST_TIMEOUT) -> Optional[str]:
         })
         with urllib.request.urlopen(req, timeout=timeout) as r:
             return r.read().decode('utf-8', errors='replace')
+    except urllib.error.HTTPError as e:
+        # 404 and friends mean "no such song", not a struggling host.
+        failed = e.code in BREAKER_STATUSES or e.code >= 500
+        log.debug('GET %s failed: %s', url, e)
+        return None
     except Exception as e:
+        failed = True  # timeouts, resets, DNS
         log.debug('GET %s failed: %s', url, e)
         return None
+    finally:
+        if failed:
+            _tally(breaker.host, 'failures')
+        if breaker.record(failed):
+            _tally(breaker.host, 'trips')
+
+
+class _JsonCache:
+    """A dict persisted as {"entries": {...}} under wordclouds/; thread-safe."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: dict[str, dict] = {}
+        self.stats: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('entries') or {}
+        except (OSError, ValueError):
+            self.entries = {}
+        return self
+
+    def count(self, stat: str) -> None:
+        with self._lock:
+            self.stats[stat] = self.stats.get(stat, 0) + 1
+
+    def save(self) -> bool:
+        with self._lock:
+            data = {'entries': dict(sorted(self.entries.items()))}
+        return json_store.write_json(self.path, data, indent=None)
 
 
 def _slug(s: str) -> str:
@@ -87,16 +284,12 @@ def _strip_html(text: str) -> str:
 
 
 # ---------------------------------------------------------------------------
-# Sources
+# Page extractors: lyrics text out of a fetched page, one per host. Sources
+# only work out *which* URL to fetch; fetch_page() does the fetching and
+# extraction, and remembers the URL so fetch_lyrics can cache it.
 # ---------------------------------------------------------------------------
 
-def source_lyricsovh(artist: str, title: str) -> Optional[str]:
-    url = ('https://api.lyrics.ovh/v1/'
-           + urllib.parse.quote(artist, safe='')
-           + '/' + urllib.parse.quote(title, safe=''))
-    body = _http_get(url)
-    if not body:
-        return None
+def _extract_lyricsovh(body: str) -> Optional[str]:
     try:
         data = json.loads(body)
     except Exception:
@@ -105,11 +298,7 @@ def source_lyricsovh(artist: str, title: str) -> Optional[str]:
     return text or None
 
 
-def source_lyricfind(artist: str, title: str) -> Optional[str]:
-    slug = f'{_slug(artist)}-{_slug(title)}'
-    body = _http_get(f'https://lyrics.lyricfind.com/lyrics/{slug}')
-    if not body:
-        return None
+def _extract_lyricfind(body: str) -> Optional[str]:
     m = re.search(r'"lyrics"\s*:\s*"((?:\\.|[^"\\])+)"', body)
     if m:
         raw = m.group(1).encode('utf-8').decode('unicode_escape', errors='replace')
@@ -124,32 +313,7 @@ def source_lyricfind(artist: str, title: str) -> Optional[str]:
     return None
 
 
-def _genius_find_url(artist: str, title: str) -> Optional[str]:
-    q = urllib.parse.quote_plus(f'{title} {artist}')
-    body = _http_get(f'https://genius.com/api/search/multi?q={q}')
-    if not body:
-        return None
-    try:
-        data = json.loads(body)
-    except Exception:
-        return None
-    sections = (data.get('response') or {}).get('sections') or []
-    for sec in sections:
-        for hit in (sec.get('hits') or []):
-            res = hit.get('result') or {}
-            url = res.get('url')
-            if url and 'genius.com' in url:
-                return url
-    return None
-
-
-def source_genius(artist: str, title: str) -> Optional[str]:
-    url = _genius_find_url(artist, title)
-    if not url:
-        return None
-    body = _http_get(url)
-    if not body:
-        return None
+def _extract_genius(body: str) -> Optional[str]:
     matches = re.findall(r'(?is)<div[^>]+data-lyrics-container="true"[^>]*>(.*?)</div>', body)
     if matches:
         joined = '\n'.join(_strip_html(m) for m in matches).strip()
@@ -163,11 +327,7 @@ def source_genius(artist: str, title: str) -> Optional[str]:
     return None
 
 
-def source_azlyrics(artist: str, title: str) -> Optional[str]:
-    url = f'https://www.azlyrics.com/lyrics/{_azlyrics_slug(artist)}/{_azlyrics_slug(title)}.html'
-    body = _http_get(url)
-    if not body:
-        return None
+def _extract_azlyrics(body: str) -> Optional[str]:
     m = re.search(r'(?is)<!--\s*Usage of azlyrics\.com.*?-->\s*<div>(.*?)</div>', body)
     if m:
         text = _strip_html(m.group(1)).strip()
@@ -176,30 +336,16 @@ def source_azlyrics(artist: str, title: str) -> Optional[str]:
     return None
 
 
-def source_lyricscom(artist: str, title: str) -> Optional[str]:
-    q = urllib.parse.quote_plus(f'{title} {artist}')
-    search = _http_get(f'https://www.lyrics.com/lyrics/{q}')
-    if not search:
-        return None
-    m = re.search(r'href="(/lyric/\d+/[^"]+)"', search)
+def _extract_lyricscom(body: str) -> Optional[str]:
+    m = re.search(r'(?is)<pre[^>]+id="lyric-body-text"[^>]*>(.*?)</pre>', body)
     if not m:
         return None
-    page = _http_get('https://www.lyrics.com' + m.group(1))
-    if not page:
-        return None
-    m2 = re.search(r'(?is)<pre[^>]+id="lyric-body-text"[^>]*>(.*?)</pre>', page)
-    if not m2:
-        return None
-    text = _strip_html(m2.group(1)).strip()
+    text = _strip_html(m.group(1)).strip()
     return text if len(text) > 50 else None
 
 
-def source_songlyrics(artist: str, title: str) -> Optional[str]:
-    url = f'https://www.songlyrics.com/{_slug(artist)}/{_slug(title)}-lyrics/'
-    page = _http_get(url)
-    if not page:
-        return None
-    m = re.search(r'(?is)<p[^>]+id="songLyricsDiv"[^>]*>(.*?)</p>', page)
+def _extract_songlyrics(body: str) -> Optional[str]:
+    m = re.search(r'(?is)<p[^>]+id="songLyricsDiv"[^>]*>(.*?)</p>', body)
     if not m:
         return None
     text = _strip_html(m.group(1)).strip()
@@ -208,6 +354,160 @@ def source_songlyrics(artist: str, title: str) -> Optional[str]:
     return text
 
 
+def _extract_stlyrics(body: str) -> Optional[str]:
+    m = re.search(r'(?is)<div[^>]+id="lyrics"[^>]*>(.*?)</div>', body)
+    if m:
+        text = _strip_html(m.group(1)).strip()
+        if len(text) > 50:
+            return text
+    return None
+
+
+def _extract_allmusicals(body: str) -> Optional[str]:
+    m = re.search(r'(?is)<div[^>]+class="[^"]*entry-content[^"]*"[^>]*>(.*?)</div>', body)
+    if not m:
+        m = re.search(r'(?is)<pre[^>]*>(.*?)</pre>', body)
+    if m:
+        text = _strip_html(m.group(1)).strip()
+        if len(text) > 50:
+            return text
+    return None
+
+
+# host -> (source name, extractor)
+PAGE_EXTRACTORS = {
+    'api.lyrics.ovh': ('lyricsovh', _extract_lyricsovh),
+    'lyrics.lyricfind.com': ('lyricfind', _extract_lyricfind),
+    'genius.com': ('genius', _extract_genius),
+    'www.azlyrics.com': ('azlyrics', _extract_azlyrics),
+    'www.lyrics.com': ('lyricscom', _extract_lyricscom),
+    'www.songlyrics.com': ('songlyrics', _extract_songlyrics),
+    'www.stlyrics.com': ('stlyrics', _extract_stlyrics),
+    'www.allmusicals.com': ('allmusicals', _extract_allmusicals),
+}
+
+_resolved = threading.local()
+
+
+def fetch_page(url: str) -> Optional[str]:
+    """Fetch a lyrics page on a known host and extract its lyrics."""
+    entry = PAGE_EXTRACTORS.get(urllib.parse.urlsplit(url).hostname or '')
+    if entry is None:
+        return None
+    body = _http_get(url)
+    text = entry[1](body) if body else None
+    if text:
+        _resolved.url = url
+    return text
+
+
+# ---------------------------------------------------------------------------
+# Sources
+# ---------------------------------------------------------------------------
+
+def source_lyricsovh(artist: str, title: str) -> Optional[str]:
+    return fetch_page('https://api.lyrics.ovh/v1/'
+                      + urllib.parse.quote(artist, safe='')
+                      + '/' + urllib.parse.quote(title, safe=''))
+
+
+def source_lyricfind(artist: str, title: str) -> Optional[str]:
+    return fetch_page(f'https://lyrics.lyricfind.com/lyrics/{_slug(artist)}-{_slug(title)}')
+
+
+class SearchCache(_JsonCache):
+    """Normalized search query -> result URL, or null for "no result".
+
+    Shared by every year, variant and run. A "no result" entry expires
+    after `negative_ttl` seconds so songs Genius adds later are found; a
+    failed request (blocked host, timeout) is not cached at all.
+    """
+
+    def __init__(self, path: str, negative_ttl: float):
+        super().__init__(path)
+        self.negative_ttl = negative_ttl
+        self.stats = {'hits': 0, 'negative_hits': 0, 'misses': 0}
+
+    def get(self, key: str) -> tuple[bool, Optional[str]]:
+        """(known, url); known is False when the query has to be run."""
+        with self._lock:
+            e = self.entries.get(key)
+            if e and e.get('url'):
+                self.stats['hits'] += 1
+                return True, e['url']
+            if e and time.time() - e.get('at', 0) < self.negative_ttl:
+                self.stats['negative_hits'] += 1
+                return True, None
+            self.stats['misses'] += 1
+            return False, None
+
+    def put(self, key: str, url: Optional[str]) -> None:
+        with self._lock:
+            self.entries[key] = {'url': url, 'at': int(time.time())}
+
+    def hit_rate(self) -> float:
+        with self._lock:
+            lookups = sum(self.stats.values())
+            hits = self.stats['hits'] + self.stats['negative_hits']
+        return hits / lookups if lookups else 0.0
+
+
+GENIUS_SEARCHES = SearchCache(GENIUS_CACHE_PATH, GENIUS_NEGATIVE_TTL_DAYS * 86400)
+
+
+def _genius_search(artist: str, title: str) -> tuple[bool, Optional[str]]:
+    """(answered, url); answered is False when the request itself failed."""
+    q = urllib.parse.quote_plus(f'{title} {artist}')
+    body = _http_get(f'https://genius.com/api/search/multi?q={q}')
+    if not body:
+        return False, None
+    try:
+        data = json.loads(body)
+    except Exception:
+        return False, None
+    sections = (data.get('response') or {}).get('sections') or []
+    for sec in sections:
+        for hit in (sec.get('hits') or []):
+            res = hit.get('result') or {}
+            url = res.get('url')
+            if url and 'genius.com' in url:
+                return True, url
+    return True, None
+
+
+def _genius_find_url(artist: str, title: str) -> Optional[str]:
+    key = song_identity.name_key(artist, title)
+    known, url = GENIUS_SEARCHES.get(key)
+    if known:
+        return url
+    answered, url = _genius_search(artist, title)
+    if answered:
+        GENIUS_SEARCHES.put(key, url)
+    return url
+
+
+def source_genius(artist: str, title: str) -> Optional[str]:
+    url = _genius_find_url(artist, title)
+    return fetch_page(url) if url else None
+
+
+def source_azlyrics(artist: str, title: str) -> Optional[str]:
+    return fetch_page(f'https://www.azlyrics.com/lyrics/{_azlyrics_slug(artist)}/{_azlyrics_slug(title)}.html')
+
+
+def source_lyricscom(artist: str, title: str) -> Optional[str]:
+    q = urllib.parse.quote_plus(f'{title} {artist}')
+    search = _http_get(f'https://www.lyrics.com/lyrics/{q}')
+    if not search:
+        return None
+    m = re.search(r'href="(/lyric/\d+/[^"]+)"', search)
+    return fetch_page('https://www.lyrics.com' + m.group(1)) if m else None
+
+
+def source_songlyrics(artist: str, title: str) -> Optional[str]:
+    return fetch_page(f'https://www.songlyrics.com/{_slug(artist)}/{_slug(title)}-lyrics/')
+
+
 def _musical_name_from_artist(artist: str) -> Optional[str]:
     a = re.sub(r'\s*[\[(].*?[\])]\s*', ' ', artist).strip()
     a = re.sub(r'\s+(cast recording|original cast|broadway cast|musical|soundtrack|cast).*$', '', a, flags=re.I).strip()
@@ -216,48 +516,36 @@ def _musical_name_from_artist(artist: str) -> Optional[str]:
 
 def source_stlyrics(artist: str, title: str) -> Optional[str]:
     musical = _musical_name_from_artist(artist) or artist
-    direct = f'https://www.stlyrics.com/lyrics/{_slug(musical)}/{_slug(title)}.htm'
-    page = _http_get(direct)
-    if not page:
-        q = urllib.parse.quote_plus(f'{title} {musical}')
-        search = _http_get(f'https://www.stlyrics.com/cgi-bin/search.cgi?search={q}&cat=ml')
-        if not search:
-            return None
-        m = re.search(r'href="(/lyrics/[^"]+\.htm)"', search)
-        if not m:
-            return None
-        page = _http_get('https://www.stlyrics.com' + m.group(1))
-        if not page:
-            return None
-    m2 = re.search(r'(?is)<div[^>]+id="lyrics"[^>]*>(.*?)</div>', page)
-    if m2:
-        text = _strip_html(m2.group(1)).strip()
-        if len(text) > 50:
-            return text
-    return None
+    text = fetch_page(f'https://www.stlyrics.com/lyrics/{_slug(musical)}/{_slug(title)}.htm')
+    if text:
+        return text
+    q = urllib.parse.quote_plus(f'{title} {musical}')
+    search = _http_get(f'https://www.stlyrics.com/cgi-bin/search.cgi?search={q}&cat=ml')
+    if not search:
+        return None
+    m = re.search(r'href="(/lyrics/[^"]+\.htm)"', search)
+    return fetch_page('https://www.stlyrics.com' + m.group(1)) if m else None
 
 
 def source_allmusicals(artist: str, title: str) -> Optional[str]:
     musical = _musical_name_from_artist(artist) or artist
     if not musical:
         return None
-    url = f'https://www.allmusicals.com/lyrics/{_slug(musical)}/{_slug(title)}.htm'
-    page = _http_get(url)
-    if not page:
-        return None
-    m = re.search(r'(?is)<div[^>]+class="[^"]*entry-content[^"]*"[^>]*>(.*?)</div>', page)
-    if not m:
-        m = re.search(r'(?is)<pre[^>]*>(.*?)</pre>', page)
-    if m:
-        text = _strip_html(m.group(1)).strip()
-        if len(text) > 50:
-            return text
-    return None
+    return fetch_page(f'https://www.allmusicals.com/lyrics/{_slug(musical)}/{_slug(title)}.htm')
+
 
+DDG_MAX_PAGES = 3
 
-_KNOWN_LYRIC_HOSTS = ['genius.com', 'www.azlyrics.com', 'www.lyrics.com',
-                      'www.songlyrics.com', 'lyrics.lyricfind.com',
-                      'www.stlyrics.com', 'www.allmusicals.com']
+
+def _ddg_result_urls(body: str) -> list[str]:
+    urls = []
+    for href in re.findall(r'href="([^"]+)"', body):
+        href = html.unescape(href)
+        if 'duckduckgo.com/l/?' in href:  # result links go through a redirect
+            href = urllib.parse.parse_qs(urllib.parse.urlsplit(href).query).get('uddg', [''])[0]
+        if href.startswith(('http://', 'https://')) and href not in urls:
+            urls.append(href)
+    return urls
 
 
 def source_ddg(artist: str, title: str) -> Optional[str]:
@@ -265,32 +553,17 @@ def source_ddg(artist: str, title: str) -> Optional[str]:
     body = _http_get(f'https://duckduckgo.com/html/?q={q}')
     if not body:
         return None
-    hits = re.findall(r'href="(https?://[^"]+)"', body)
-    for h in hits:
-        for host in _KNOWN_LYRIC_HOSTS:
-            if host not in h:
-                continue
-            try:
-                if host == 'genius.com':
-                    text = source_genius(artist, title)
-                elif host == 'www.azlyrics.com':
-                    text = source_azlyrics(artist, title)
-                elif host == 'www.lyrics.com':
-                    text = source_lyricscom(artist, title)
-                elif host == 'www.songlyrics.com':
-                    text = source_songlyrics(artist, title)
-                elif host == 'lyrics.lyricfind.com':
-                    text = source_lyricfind(artist, title)
-                elif host == 'www.stlyrics.com':
-                    text = source_stlyrics(artist, title)
-                elif host == 'www.allmusicals.com':
-                    text = source_allmusicals(artist, title)
-                else:
-                    text = None
-                if text and len(text) > 50:
-                    return text
-            except Exception:
-                pass
+    # The search already found the page; fetch it directly rather than
+    # re-running that host's own slug guess or search.
+    hits = [u for u in _ddg_result_urls(body)
+            if (urllib.parse.urlsplit(u).hostname or '') in PAGE_EXTRACTORS]
+    for url in hits[:DDG_MAX_PAGES]:
+        try:
+            text = fetch_page(url)
+        except Exception:
+            text = None
+        if text and len(text) > 50:
+            return text
     return None
 
 
@@ -306,6 +579,13 @@ SOURCES = [
     ('ddg', source_ddg),
 ]
 
+# Search-based sources find the page themselves, so trying them once per
+# song beats once per artist/title variant; the rest build URLs from slugs.
+SEARCH_SOURCES = {'genius', 'lyricscom', 'ddg'}
+# Run once, after every other attempt.
+FALLBACK_SOURCES = {'ddg'}
+MAX_ATTEMPTS_PER_SONG = 16
+
 
 # ---------------------------------------------------------------------------
 # Artist / title variants + musical composer map
@@ -385,8 +665,85 @@ def _artist_variants(artist: str) -> list[str]:
     return out
 
 
+class ResolutionCache(_JsonCache):
+    """song name_key -> the lyrics page that worked, persisted across runs.
+
+    With an entry, fetch_lyrics fetches exactly that one page instead of
+    walking the sources again. Entries are only replaced, never dropped on
+    a failed fetch, since that is usually a blocked host rather than a
+    moved page.
+    """
+
+    def __init__(self, path: str = RESOLUTION_CACHE_PATH):
+        super().__init__(path)
+        self.stats = {'hits': 0, 'failed': 0, 'stored': 0}
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self.entries.get(key)
+
+    def put(self, key: str, url: str, source: str) -> None:
+        with self._lock:
+            if self.entries.get(key, {}).get('url') != url:
+                self.entries[key] = {'url': url, 'source': source}
+                self.stats['stored'] += 1
+
+
+RESOLUTIONS = ResolutionCache()
+
+
 def fetch_lyrics(artist: str, title: str) -> tuple[Optional[str], Optional[str]]:
-    seen = set()
+    song = song_identity.name_key(artist, title)
+    known = RESOLUTIONS.get(song)
+    if known:
+        text = fetch_page(known['url'])
+        if text and len(text.strip()) > 50:
+            RESOLUTIONS.count('hits')
+            return text, known['source']
+        RESOLUTIONS.count('failed')
+
+    plan, dropped = plan_lookups(artist, title)
+    executed = 0
+    try:
+        for name, fn, art, tit in plan:
+            executed += 1
+            _resolved.url = None
+            try:
+                text = fn(art, tit)
+            except Exception as e:
+                log.debug('%s error for %r/%r: %s', name, art, tit, e)
+                text = None
+            if text and len(text.strip()) > 50:
+                if _resolved.url:
+                    RESOLUTIONS.put(song, _resolved.url, name)
+                return text, name
+        return None, None
+    finally:
+        with _lookup_lock:
+            _lookup_stats['songs'] += 1
+            _lookup_stats['planned'] += len(plan)
+            _lookup_stats['executed'] += executed
+            _lookup_stats['dropped_by_cap'] += dropped
+
+
+_lookup_stats: Counter = Counter()
+_lookup_lock = threading.Lock()
+
+
+def lookup_stats() -> dict[str, int]:
+    with _lookup_lock:
+        return {k: _lookup_stats[k] for k in ('songs', 'planned', 'executed', 'dropped_by_cap')}
+
+
+def plan_lookups(artist: str, title: str) -> tuple[list[tuple], int]:
+    """Ordered (source, fn, artist, title) attempts for one song, and how many the cap dropped.
+
+    Slug sources are tried for every distinct artist/title variant; search
+    sources (and, for non-musicals, the musical sites) once, in the first
+    variant's pass; FALLBACK_SOURCES last. At most
+    MAX_ATTEMPTS_PER_SONG attempts are kept, trimming later slug variants
+    before the fallbacks.
+    """
     is_musical = bool(re.search(r'(cast recording|original cast|broadway cast|musical|soundtrack)', artist, re.I))
     ordered = list(SOURCES)
     if is_musical:
@@ -394,21 +751,39 @@ def fetch_lyrics(artist: str, title: str) -> tuple[Optional[str], Optional[str]]
         others = [s for s in ordered if s[0] not in ('stlyrics', 'allmusicals')]
         ordered = musical_prefs + others
 
-    for art in _artist_variants(artist):
-        for tit in _title_variants(title):
+    # The name as given first, then the most cleaned-up variants (primary
+    # artist, title without the remaster/feature suffix), so a capped plan
+    # still reaches the likeliest slugs.
+    pairs, seen = [], set()
+    for i, art in enumerate(_artist_variants(artist)):
+        for j, tit in enumerate(_title_variants(title)):
             key = (art.lower(), tit.lower())
-            if key in seen:
-                continue
-            seen.add(key)
-            for name, fn in ordered:
-                try:
-                    text = fn(art, tit)
-                except Exception as e:
-                    log.debug('%s error for %r/%r: %s', name, art, tit, e)
-                    text = None
-                if text and len(text.strip()) > 50:
-                    return text, name
-    return None, None
+            if key not in seen:
+                seen.add(key)
+                pairs.append((i + j, art, tit))
+    pairs = [(art, tit) for _, art, tit in sorted(pairs, key=lambda p: (p[0] > 0, -p[0]))]
+    titles = _title_variants(title)
+    search_title = titles[1] if len(titles) > 1 else title
+
+    # The musical-only sites are a long shot for anything else: one try.
+    once = set() if is_musical else {'stlyrics', 'allmusicals'}
+    plan, fallback = [], []
+    for i, (art, tit) in enumerate(pairs):
+        for name, fn in ordered:
+            if name in FALLBACK_SOURCES:
+                if i == 0:
+                    fallback.append((name, fn, artist, search_title))
+            elif name in SEARCH_SOURCES:
+                if i == 0:
+                    plan.append((name, fn, artist, search_title))
+            elif name in once:
+                if i == 0:
+                    plan.append((name, fn, art, tit))
+            else:
+                plan.append((name, fn, art, tit))
+    room = max(MAX_ATTEMPTS_PER_SONG - len(fallback), 0)
+    dropped = max(len(plan) - room, 0)
+    return plan[:room] + fallback, dropped
 
 
 # ---------------------------------------------------------------------------
@@ -448,7 +823,18 @@ def clean_lyrics_words(text: str) -> list[str]:
 # Aggregation
 # ---------------------------------------------------------------------------
 
-def collect_top_songs(top_songs_by_period, year, limit=TOP_N_PER_YEAR):
+def new_word_tally(mode=None):
+    return SpaceSaving(error=TOPK_ERROR) if (mode or TOPK_MODE) == 'bounded' else ExactTally()
+
+
+def collect_top_songs(top_songs_by_period, year, limit=TOP_N_PER_YEAR, identity=None):
+    """The year's songs by play count, one entry per canonical song.
+
+    Variants ("Song", "Song - Remastered 2011", a re-release URI) are merged
+    under the id `identity` resolves them to (see song_identity.py). Each
+    entry keeps the first-seen name plus every variant name in `variants`.
+    """
+    identity = identity or song_identity.SongIdentityIndex()
     bag = {}
     for period, items in top_songs_by_period.items():
         if not period.startswith(year):
@@ -458,25 +844,16 @@ def collect_top_songs(top_songs_by_period, year, limit=TOP_N_PER_YEAR):
             track = (it.get('track') or '').strip()
             if not artist or not track:
                 continue
-            key = (artist.lower(), track.lower())
-            rec = bag.get(key) or {'artist': artist, 'track': track, 'play_count': 0}
+            key = identity.resolve(artist, track, it.get('spotify_uri') or '')
+            rec = bag.get(key) or {'id': key, 'artist': artist, 'track': track,
+                                   'play_count': 0, 'variants': []}
             rec['play_count'] += int(it.get('play_count') or 1)
+            if [artist, track] not in rec['variants']:
+                rec['variants'].append([artist, track])
             bag[key] = rec
     return sorted(bag.values(), key=lambda x: x['play_count'], reverse=True)[:limit]
 
 
-EMOTION_LEXICON = {
-    'joy': {'happy','smile','smiling','laugh','laughing','fun','bright','shine','shining','alive','celebrate','light','sunny','glow','magic','good','better','best','loud','lit','happiness'},
-    'love': {'love','loving','lover','kiss','kisses','hold','held','heart','together','touch','arms','close','sweet','tender','darling','dear','yours','ours','us','romance'},
-    'melancholy': {'sad','tears','cry','crying','cried','blue','slow','quiet','quietly','grey','gray','empty','hurt','ache','aching','sore','sigh','low','tired','sleep','fade','faded'},
-    'longing': {'miss','missed','missing','wait','waiting','want','wanted','wanting','need','needed','gone','without','again','still','someday','maybe','hope','wish','wishing','somewhere'},
-    'anger': {'hate','hated','burn','burning','break','broken','scream','screaming','fight','fighting','rage','blood','cruel','mad','angry','wrong','punch','shout'},
-    'hope': {'rise','new','morning','believe','future','begin','beginning','start','starts','open','soon','tomorrow','gonna','someday','forward','light','sun','wake'},
-    'nostalgia': {'remember','remembering','used','back','home','young','old','always','forever','first','childhood','years','memory','memories','past','kid','teenage'},
-    'escape': {'run','running','leave','leaving','away','high','free','drive','driving','wild','road','gone','fly','flying','out','beyond'},
-    'loneliness': {'alone','lonely','without','empty','cold','silent','solo','myself','nobody','noone','solitary','abandoned'},
-}
-
 DIM_PRIMARY = {
     'joy': ['loud and mostly smiling', 'a pretty good time', 'lighter than expected', 'unbothered, mostly'],
     'love': ['mostly love', 'stuck on someone', 'tender in the way that leaves marks', 'soft around the edges'],
@@ -502,15 +879,6 @@ DIM_SECONDARY = {
 }
 
 
-def _compute_emotion_dimensions(word_freq_list):
-    dims = {k: 0 for k in EMOTION_LEXICON}
-    for w, f in word_freq_list:
-        for dim, vocab in EMOTION_LEXICON.items():
-            if w in vocab:
-                dims[dim] += f
-    return dims
-
-
 def _format_artists(artists):
     artists = [a for a in artists if a][:3]
     if not artists:
@@ -538,34 +906,154 @@ def _build_year_phrase(year, top_artists, dims):
     return f'{year} was {artist_str} — {p}.'
 
 
-def build_year_cloud(year, songs):
-    counts = Counter()
+def _fetch_song(s, identity=None):
+    """Fetch one collected song; records the outcome in `identity`. Returns (source, bag)."""
+    text, src = fetch_lyrics(s['artist'], s['track'])
+    bag = Counter(clean_lyrics_words(text)) if text else None
+    if identity is not None and s.get('id'):
+        identity.record(s['id'], s['artist'], s['track'], src,
+                        dict(bag.most_common()) if bag else None,
+                        wordbag_store.song_key(s['artist'], s['track']))
+    return src, bag
+
+
+def _fetch_song_tallied(s, identity):
+    """_fetch_song plus the per-host breaker counts of its requests: (id, result, counts)."""
+    _call_tally.counts = {}
+    try:
+        return s['id'], _fetch_song(s, identity), _call_tally.counts
+    finally:
+        _call_tally.counts = None
+
+
+def fetch_backlog(songs_by_year, identity, budget=TIME_BUDGET):
+    """Fetch every song `identity` has no record for, across all years.
+
+    One priority queue ordered by total play weight, so the songs that move
+    coverage_by_plays most go first. No new fetch starts once `budget`
+    seconds have passed (0 = no limit); what is left stays unrecorded in
+    `identity` and is picked up again by the next run.
+
+    Each fetch's per-host breaker counts are charged to every year the
+    song is in, returned as 'breakers_by_year'.
+    """
+    t0 = time.monotonic()
+    breakers_before = breaker_stats()
+    weight, rep, years_of = {}, {}, {}
+    for year, songs in songs_by_year.items():
+        for s in songs:
+            if identity.needs_fetch(s['id']):
+                weight[s['id']] = weight.get(s['id'], 0) + s['play_count']
+                rep.setdefault(s['id'], s)
+                years_of.setdefault(s['id'], []).append(year)
+    by_year: dict[str, dict[str, dict]] = {}
+    heap = [(-w, cid) for cid, w in weight.items()]
+    heapq.heapify(heap)
+    deadline = t0 + budget if budget > 0 else None
+    fetched = found = 0
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        running = set()
+        while heap or running:
+            while heap and len(running) < MAX_WORKERS and (deadline is None or time.monotonic() < deadline):
+                _, cid = heapq.heappop(heap)
+                running.add(pool.submit(_fetch_song_tallied, rep[cid], identity))
+            if not running:
+                break
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                fetched += 1
+                try:
+                    cid, (_src, bag), hosts = fut.result()
+                except Exception as e:
+                    log.warning('  fetch worker error: %s', e)
+                    continue
+                found += bag is not None
+                for year in years_of[cid]:
+                    for host, counts in hosts.items():
+                        acc = by_year.setdefault(year, {}).setdefault(host, dict.fromkeys(counts, 0))
+                        for k, v in counts.items():
+                            acc[k] += v
+    states = breaker_stats()
+    for hosts in by_year.values():
+        for host, counts in hosts.items():
+            counts['state'] = states[host]['state']
+    total_plays = sum(weight.values())
+    left_plays = sum(-w for w, _ in heap)
+    return {
+        'queued': len(weight), 'fetched': fetched, 'found': found,
+        'remaining': len(heap), 'remaining_plays': left_plays,
+        'queued_plays': total_plays,
+        'budget_s': budget, 'elapsed_s': round(time.monotonic() - t0, 1),
+        'exhausted': bool(heap),
+        'breakers': breaker_delta(breakers_before),
+        'breakers_by_year': by_year,
+    }
+
+
+def build_year_cloud(year, songs, bags=None, identity=None, fetch=True, breakers=None):
+    """Fetch lyrics for `songs` and aggregate the year's cloud.
+
+    If `bags` is a dict it is filled with song_key -> {artist, track, words}
+    for every song whose lyrics were found, under each of the song's variant
+    names. Found songs also carry an `emotions` vector (see emotion_index.py)
+    scored from their full bag. With an `identity` index, songs it already
+    has a record for are not fetched again; with fetch=False the rest are
+    left as pending (not found) instead of being fetched. stats['breakers']
+    is `breakers` when given (e.g. fetch_backlog's breakers_by_year entry),
+    otherwise the breaker activity of this call's own fetches.
+    """
+    counts = new_word_tally()
+    shadow = SpaceSaving(error=TOPK_ERROR) if TOPK_MODE == 'verify' else None
     per_song = []
+    breakers_before = breaker_stats()
 
     def do_one(s):
-        text, src = fetch_lyrics(s['artist'], s['track'])
-        if not text:
-            return {'artist': s['artist'], 'track': s['track'],
-                    'plays': s['play_count'], 'found': False}, []
-        words = clean_lyrics_words(text)
-        return {'artist': s['artist'], 'track': s['track'],
-                'plays': s['play_count'], 'found': True,
-                'word_count': len(words), 'source': src}, words
-
+        base = {'artist': s['artist'], 'track': s['track'], 'plays': s['play_count']}
+        cid = s.get('id')
+        rec = identity.cached(cid) if identity is not None and cid else None
+        if rec is not None and rec.get('found'):
+            bag = Counter(rec['words'])
+            src, cached = rec.get('source'), True
+        elif rec is not None:
+            return dict(base, found=False, cached=True), None
+        elif not fetch:
+            return dict(base, found=False, pending=True), None
+        else:
+            src, bag = _fetch_song(s, identity)
+            cached = False
+        if not bag:
+            return dict(base, found=False), None
+        info = dict(base, found=True, word_count=sum(bag.values()), source=src,
+                    emotions=[int(v) for v in emotion_index.INDEX.score(bag)])
+        if cached:
+            info['cached'] = True
+        return info, bag
+
+    variants = {(s['artist'], s['track']): s.get('variants') or [[s['artist'], s['track']]]
+                for s in songs}
     source_hits = Counter()
     with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
         futures = [pool.submit(do_one, s) for s in songs]
         for fut in as_completed(futures):
             try:
-                info, words = fut.result()
+                info, bag = fut.result()
             except Exception as e:
                 log.warning('  fetch worker error: %s', e)
                 continue
             per_song.append(info)
-            if words:
+            if bag:
                 plays = max(info.get('plays', 1), 1)
-                for w, c in Counter(words).items():
-                    counts[w] += c * plays
+                for w, c in bag.items():
+                    counts.add(w, c * plays)
+                    if shadow is not None:
+                        shadow.add(w, c * plays)
+                if bags is not None:
+                    words = dict(bag.most_common())
+                    for artist, track in variants.get((info['artist'], info['track']),
+                                                      [[info['artist'], info['track']]]):
+                        bags[wordbag_store.song_key(artist, track)] = {
+                            'artist': artist, 'track': track, 'words': words,
+                        }
                 if info.get('source'):
                     source_hits[info['source']] += 1
 
@@ -573,25 +1061,42 @@ def build_year_cloud(year, songs):
     found = [p for p in per_song if p.get('found')]
     total_plays = sum(p['plays'] for p in per_song)
     found_plays = sum(p['plays'] for p in found)
+    aggregation = {'mode': TOPK_MODE, 'max_error': counts.max_error}
+    if shadow is not None:
+        aggregation['verify'] = compare_topk(counts, shadow, TOP_WORDS_OUT)
+        log.info('  %s top-%d verify: %s', year, TOP_WORDS_OUT, aggregation['verify'])
 
-    return {
+    result = {
         'ok': True, 'year': year,
         'generated_at': datetime.now(timezone.utc).isoformat(),
         'words': counts.most_common(TOP_WORDS_OUT),
         'stats': {
             'songs_considered': len(per_song),
             'lyrics_found': len(found),
+            'lyrics_cached': sum(1 for p in found if p.get('cached')),
+            'pending': sum(1 for p in per_song if p.get('pending')),
+            'pending_plays': sum(p['plays'] for p in per_song if p.get('pending')),
             'coverage_by_plays': round(100 * found_plays / total_plays, 1) if total_plays else 0.0,
-            'total_words_counted': sum(counts.values()),
+            'total_words_counted': counts.total(),
             'unique_words': len(counts),
             'source_hits': dict(source_hits),
+            'aggregation': aggregation,
         },
         'songs': per_song,
-        'sentiment': _build_year_sentiment(year, per_song, counts),
+        'sentiment': _build_year_sentiment(year, per_song),
     }
+    result['stats']['breakers'] = breakers if breakers is not None else breaker_delta(breakers_before)
+    return result
 
 
-def _build_year_sentiment(year, per_song, counts):
+def _build_year_sentiment(year, per_song):
+    # The year's dimensions are the play-weighted sum of the song vectors,
+    # i.e. the whole weighted vocabulary rather than just the top words.
+    index = emotion_index.INDEX
+    vec = index.zeros()
+    for s in per_song:
+        if s.get('emotions'):
+            vec += max(s.get('plays', 1), 1) * np.asarray(s['emotions'], dtype=np.float64)
     top_artists_by_plays = {}
     for s in per_song:
         if not s.get('found'):
@@ -601,25 +1106,40 @@ def _build_year_sentiment(year, per_song, counts):
             continue
         top_artists_by_plays[a] = top_artists_by_plays.get(a, 0) + s.get('plays', 0)
     top_artists = [a for a, _ in sorted(top_artists_by_plays.items(), key=lambda x: -x[1])[:3]]
-    dims = _compute_emotion_dimensions(counts.most_common(200))
+    dims = index.as_dict(vec)
     phrase = _build_year_phrase(year, top_artists, dims)
-    ranked = sorted(dims.items(), key=lambda x: -x[1])
     return {
         'dimensions': dims,
-        'top_dimensions': [d[0] for d in ranked if d[1] > 0][:3],
+        'dimension_order': list(index.dimensions),
+        'top_dimensions': index.top(vec),
         'top_artists': top_artists,
         'phrase': phrase,
     }
 
 
+def _previous_stats(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('stats') or None
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _previous_bags(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('songs') or {}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
 def main():
-    if not os.path.exists(TOP_SONGS_PATH):
-        log.error('top_songs_by_period.json not found at %s', TOP_SONGS_PATH)
+    top_songs = top_songs_shards.load_top_songs()
+    if not top_songs:
+        log.error('no top songs found in %s', top_songs_shards.SHARDS_DIR)
         sys.exit(1)
     os.makedirs(OUT_DIR, exist_ok=True)
-
-    with open(TOP_SONGS_PATH, 'r', encoding='utf-8') as f:
-        top_songs = json.load(f)
+    os.makedirs(BAGS_DIR, exist_ok=True)
 
     years = sorted({p[:4] for p in top_songs.keys() if len(p) >= 4 and p[:4].isdigit()})
     log.info('Building word clouds for years: %s', years)
@@ -627,41 +1147,92 @@ def main():
     if only:
         years = [y for y in years if y == only]
 
+    identity = song_identity.SongIdentityIndex.load(bags=wordbag_store.load_bag_files(BAGS_DIR))
+    songs_by_year = {}
+    for year in years:
+        songs = collect_top_songs(top_songs, year, TOP_N_PER_YEAR, identity)
+        if songs:
+            songs_by_year[year] = songs
+
+    log.info('Fetching lyrics backlog (budget %s)...', f'{TIME_BUDGET:.0f}s' if TIME_BUDGET > 0 else 'none')
+    RESOLUTIONS.load()
+    GENIUS_SEARCHES.load()
+    backlog = fetch_backlog(songs_by_year, identity, TIME_BUDGET)
+    breakers_by_year = backlog.pop('breakers_by_year')
+    backlog['resolutions'] = dict(RESOLUTIONS.stats, known=len(RESOLUTIONS.entries))
+    backlog['genius_searches'] = dict(GENIUS_SEARCHES.stats, known=len(GENIUS_SEARCHES.entries),
+                                      hit_rate=round(GENIUS_SEARCHES.hit_rate(), 3))
+    identity.save()
+    RESOLUTIONS.save()
+    GENIUS_SEARCHES.save()
+    backlog['lookups'] = lookup_stats()
+    log.info('Lookups: %(executed)d of %(planned)d planned attempts run for %(songs)d songs '
+             '(%(dropped_by_cap)d dropped by the per-song cap)', backlog['lookups'])
+    log.info('Genius search cache: %.0f%% hit rate (%s)', 100 * GENIUS_SEARCHES.hit_rate(),
+             GENIUS_SEARCHES.stats)
+    log.info('Backlog: fetched %d/%d songs (%d found) in %.1fs; %d songs (%d plays) left for the next run',
+             backlog['fetched'], backlog['queued'], backlog['found'], backlog['elapsed_s'],
+             backlog['remaining'], backlog['remaining_plays'])
+    if backlog['breakers']:
+        log.info('Breakers: %s', backlog['breakers'])
+    if backlog['exhausted']:
+        log.info('Time budget reached; writing partial results')
+
     index = []
     grand = Counter()
-    for year in years:
-        songs = collect_top_songs(top_songs, year, TOP_N_PER_YEAR)
-        if not songs:
-            continue
-        t0 = time.time()
-        log.info('  %s: fetching lyrics for %d songs...', year, len(songs))
-        result = build_year_cloud(year, songs)
-        dt = time.time() - t0
+    for year, songs in songs_by_year.items():
+        bags = {}
+        result = build_year_cloud(year, songs, bags, identity, fetch=False,
+                                  breakers=breakers_by_year.get(year, {}))
         stats = result['stats']
-        log.info('  %s done in %.1fs: %d/%d songs (%.1f%% by plays), sources=%s',
-                 year, dt, stats['lyrics_found'], stats['songs_considered'],
+        log.info('  %s: %d/%d songs (%d pending, %.1f%% by plays), sources=%s',
+                 year, stats['lyrics_found'], stats['songs_considered'], stats['pending'],
                  stats['coverage_by_plays'], stats['source_hits'])
         grand.update(stats['source_hits'])
 
         out_path = os.path.join(OUT_DIR, f'{year}.json')
-        with open(out_path, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, separators=(',', ':'))
+        bags_path = os.path.join(BAGS_DIR, f'{year}.json')
+        previous = _previous_stats(out_path)
+        kept = bool(stats['pending'] and previous
+                    and previous.get('coverage_by_plays', 0) > stats['coverage_by_plays'])
+        if kept:
+            # The backlog hasn't caught up with what the published cloud
+            # already covers (e.g. the first budgeted run); keep it until it
+            # has, and add the new bags to the published ones rather than
+            # replacing them, so the store and the API keep that coverage.
+            log.info('  %s: keeping the published cloud (%.1f%% by plays) until the backlog drains',
+                     year, previous['coverage_by_plays'])
+            stats = previous
+            bags = {**_previous_bags(bags_path), **bags}
+        else:
+            json_store.write_json(out_path, result, indent=None)
+        json_store.write_json(bags_path, {'year': year, 'songs': bags}, indent=None)
         index.append({
             'year': year, 'file': f'wordclouds/{year}.json',
+            'bags_file': f'wordclouds/bags/{year}.json',
             'songs_considered': stats['songs_considered'],
             'lyrics_found': stats['lyrics_found'],
+            'pending': stats.get('pending', 0),
             'coverage_by_plays': stats['coverage_by_plays'],
             'unique_words': stats['unique_words'],
+            'kept_previous': kept,
+            'breakers': result['stats']['breakers'],
         })
 
-    with open(os.path.join(OUT_DIR, 'index.json'), 'w', encoding='utf-8') as f:
-        json.dump({
-            'generated_at': datetime.now(timezone.utc).isoformat(),
-            'years': index,
-            'source_hits_total': dict(grand),
-        }, f, ensure_ascii=False, indent=2)
+    n_store = wordbag_store.build_from_bag_files(BAGS_DIR)
+    log.info('Word-bag store: %d songs', n_store)
+    monthly = monthly_wordclouds.update_monthly_clouds(top_songs, wordbag_store.WordBagStore())
 
-    log.info('Done. Source totals: %s', dict(grand))
+    json_store.write_json(os.path.join(OUT_DIR, 'index.json'), {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'years': index,
+        'monthly': {'file': 'wordclouds/monthly/index.json', **monthly},
+        'source_hits_total': dict(grand),
+        'backlog': backlog,
+        'breakers': breaker_stats(),
+    })
+
+    log.info('Done. Source totals: %s; song index: %s', dict(grand), identity.stats)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Per-song word-bag store.
+
+A compact, memory-mappable term-frequency table for every song whose lyrics
+update_wordcloud.py has found, keyed by the normalized "artist||track" key.
+Any weighted set of songs can be turned into a word cloud with one sparse
+sum, without refetching lyrics. No raw lyrics are stored.
+
+Layout of spotify-trends/wordclouds/store/:
+    vocab.json    term_id -> word
+    songs.json    {"keys": [song_key, ...], "meta": [[artist, track], ...]}
+    offsets.npy   int64[n_songs + 1]; song i owns terms[offsets[i]:offsets[i+1]]
+    terms.npy     int32 term ids (sorted within each song)
+    counts.npy    int32 occurrences of the matching term in that song
+
+Usage:
+    python wordbag_store.py build              # rebuild from wordclouds/bags/*.json
+    python wordbag_store.py top 2020-01 [N]    # cloud for one month of top songs
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+from typing import Optional
+
+import numpy as np
+
+import json_store
+import top_songs_shards
+
+log = logging.getLogger('wordbag-store')
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, 'spotify-trends')
+BAGS_DIR = os.path.join(DATA_DIR, 'wordclouds', 'bags')
+STORE_DIR = os.path.join(DATA_DIR, 'wordclouds', 'store')
+
+
+def song_key(artist: str, track: str) -> str:
+    return f'{artist.lower().strip()}||{track.lower().strip()}'
+
+
+def _save_npy(path: str, arr: np.ndarray) -> None:
+    tmp = path + '.tmp.npy'
+    np.save(tmp, arr)
+    os.replace(tmp, path)
+
+
+def write_store(bags: dict[str, dict], store_dir: str = STORE_DIR) -> int:
+    """Write `bags` (song_key -> {artist, track, words}) as a fresh store.
+
+    Returns the number of songs written.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    vocab: dict[str, int] = {}
+    keys, meta = [], []
+    offsets = [0]
+    terms: list[int] = []
+    counts: list[int] = []
+    for key in sorted(bags):
+        rec = bags[key]
+        row = sorted((vocab.setdefault(w, len(vocab)), int(c))
+                     for w, c in (rec.get('words') or {}).items() if c > 0)
+        if not row:
+            continue
+        keys.append(key)
+        meta.append([rec.get('artist', ''), rec.get('track', '')])
+        terms.extend(t for t, _ in row)
+        counts.extend(c for _, c in row)
+        offsets.append(len(terms))
+
+    words = [None] * len(vocab)
+    for w, i in vocab.items():
+        words[i] = w
+    _save_npy(os.path.join(store_dir, 'offsets.npy'), np.asarray(offsets, dtype=np.int64))
+    _save_npy(os.path.join(store_dir, 'terms.npy'), np.asarray(terms, dtype=np.int32))
+    _save_npy(os.path.join(store_dir, 'counts.npy'), np.asarray(counts, dtype=np.int32))
+    json_store.write_json(os.path.join(store_dir, 'vocab.json'), words, indent=None)
+    json_store.write_json(os.path.join(store_dir, 'songs.json'), {'keys': keys, 'meta': meta}, indent=None)
+    return len(keys)
+
+
+def load_bag_files(bags_dir: str = BAGS_DIR) -> dict[str, dict]:
+    """Merge every wordclouds/bags/<year>.json; later years win."""
+    bags: dict[str, dict] = {}
+    if not os.path.isdir(bags_dir):
+        return bags
+    for name in sorted(os.listdir(bags_dir)):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(bags_dir, name), 'r', encoding='utf-8') as f:
+            bags.update(json.load(f).get('songs') or {})
+    return bags
+
+
+def build_from_bag_files(bags_dir: str = BAGS_DIR, store_dir: str = STORE_DIR) -> int:
+    return write_store(load_bag_files(bags_dir), store_dir)
+
+
+class WordBagStore:
+    """Read-only view over a store directory; arrays are memory-mapped."""
+
+    def __init__(self, store_dir: str = STORE_DIR):
+        with open(os.path.join(store_dir, 'vocab.json'), 'r', encoding='utf-8') as f:
+            self.vocab: list[str] = json.load(f)
+        with open(os.path.join(store_dir, 'songs.json'), 'r', encoding='utf-8') as f:
+            songs = json.load(f)
+        self.keys: list[str] = songs['keys']
+        self.meta: list[list[str]] = songs['meta']
+        self.row_of = {k: i for i, k in enumerate(self.keys)}
+        self.offsets = np.load(os.path.join(store_dir, 'offsets.npy'), mmap_mode='r')
+        self.terms = np.load(os.path.join(store_dir, 'terms.npy'), mmap_mode='r')
+        self.counts = np.load(os.path.join(store_dir, 'counts.npy'), mmap_mode='r')
+
+    @classmethod
+    def open(cls, store_dir: str = STORE_DIR) -> Optional['WordBagStore']:
+        if not os.path.exists(os.path.join(store_dir, 'songs.json')):
+            return None
+        return cls(store_dir)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.row_of
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def bag(self, key: str) -> dict[str, int]:
+        i = self.row_of.get(key)
+        if i is None:
+            return {}
+        lo, hi = int(self.offsets[i]), int(self.offsets[i + 1])
+        return {self.vocab[t]: int(c) for t, c in zip(self.terms[lo:hi], self.counts[lo:hi])}
+
+    def vector(self, weights: dict[str, float]) -> np.ndarray:
+        """Dense term-weight vector for a weighted set of song keys.
+
+        Unknown keys are ignored. The gather is done with index arithmetic so
+        the whole sum is a single np.bincount over the selected slices.
+        """
+        rows, w = [], []
+        for key, weight in weights.items():
+            i = self.row_of.get(key)
+            if i is not None and weight:
+                rows.append(i)
+                w.append(weight)
+        if not rows:
+            return np.zeros(len(self.vocab), dtype=np.float64)
+        rows_a = np.asarray(rows, dtype=np.int64)
+        starts = np.asarray(self.offsets[rows_a], dtype=np.int64)
+        lens = np.asarray(self.offsets[rows_a + 1], dtype=np.int64) - starts
+        total = int(lens.sum())
+        seg_start = np.cumsum(lens) - lens
+        pos = np.repeat(starts - seg_start, lens) + np.arange(total, dtype=np.int64)
+        weight_per_pos = np.repeat(np.asarray(w, dtype=np.float64), lens)
+        return np.bincount(self.terms[pos], weights=self.counts[pos] * weight_per_pos,
+                           minlength=len(self.vocab))
+
+    def top_words(self, vec: np.ndarray, n: int) -> list[tuple[str, int]]:
+        nz = int(np.count_nonzero(vec))
+        if nz == 0:
+            return []
+        n = min(n, nz)
+        idx = np.argpartition(-vec, n - 1)[:n]
+        idx = idx[np.argsort(-vec[idx], kind='stable')]
+        return [(self.vocab[i], int(round(vec[i]))) for i in idx]
+
+    def compose(self, weights: dict[str, float], n: int = 80) -> list[tuple[str, int]]:
+        return self.top_words(self.vector(weights), n)
+
+
+def weights_for_period(prefix: str) -> dict[str, float]:
+    """Song key -> plays over the top_songs periods starting with `prefix` (YYYY or YYYY-MM)."""
+    periods = top_songs_shards.load_year(prefix[:4])
+    weights: dict[str, float] = {}
+    for period, items in periods.items():
+        if not period.startswith(prefix):
+            continue
+        for it in items or []:
+            k = song_key(it.get('artist') or '', it.get('track') or '')
+            weights[k] = weights.get(k, 0) + int(it.get('play_count') or 1)
+    return weights
+
+
+def main(argv: list[str]) -> int:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    args = [a for a in argv if a]
+    if not args or args[0] not in ('build', 'top'):
+        print(__doc__)
+        return 2
+    if args[0] == 'build':
+        n = build_from_bag_files()
+        log.info('Wrote word-bag store with %d songs to %s', n, STORE_DIR)
+        return 0
+    store = WordBagStore.open()
+    if store is None:
+        log.error('No store at %s; run "build" first', STORE_DIR)
+        return 1
+    n = int(args[2]) if len(args) > 2 else 20
+    for word, count in store.compose(weights_for_period(args[1]), n):
+        print(f'{count:>8}  {word}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))